@@ -1,28 +1,35 @@
 # cc_scanner.py
 # Scan S&P 500 for highest % Premium Return from selling the nearest-expiry ATM call.
 # % Premium Return = ((Strike - Spot) + Premium) / Spot * 100
-
+# With --side put (or both), also cash-secured puts from the same chain fetch:
+# % Premium Return = Premium / Strike * 100 (return on the cash set aside).
+#
+# Interactive:  python 1cc_scanner.py
+# Batch:        python 1cc_scanner.py --expiry 2025-11-14 2025-11-21 --mode atm itm [--side both] \
+#                   [--universe nasdaq100 | --tickers AAPL MSFT | --tickers-file list.txt] [--exclude-earnings] \
+#                   [--out-dir scan_out] [--format csv json parquet]
+# A batch run fetches the universe, options lists, spots and earnings once and
+# each chain once per expiry, then evaluates every (expiry, mode, side) on that data.
+
+import argparse
+import os
+import sys
 import time
 import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 import pandas as pd
 import numpy as np
-import yfinance as yf
-
-import requests
-YF_SESSION = requests.Session()
-YF_SESSION.headers.update({"User-Agent": "Mozilla/5.0 (cc-scanner/1.0; macOS)"})
 
-# user-provided expiry (YYYY-MM-DD)
-EXP_STR = input("ENTER EXPIRATION (YYYY-MM-DD): ").strip()
-INCLUDE_EARN_BEF_EXP = input("Include tickers with earnings before expiry? (y/n): ").strip().lower().startswith("y")
-EXP_TS = pd.to_datetime(EXP_STR, errors="coerce")
-if pd.isna(EXP_TS):
-    raise SystemExit("Invalid date. Use format YYYY-MM-DD, e.g., 2025-10-24")
-
-OPTION_MODE = input("Which calls to scan? (atm/itm/both): ").strip().lower()
-if OPTION_MODE not in {"atm", "itm", "both"}:
-    OPTION_MODE = "atm"
+import cc_archive
+import cc_data
+import cc_liquidity
+import cc_metrics
+import cc_pick
+import cc_prof
+import cc_spot
+import cc_universe
+from cc_results import ResultSet, FLOAT, INT, BOOL, STR
 
 # -------- settings --------
 MIN_OI = 100          # open interest filter
@@ -35,70 +42,13 @@ SHOW_COLS = [
     "OpenInterest","Volume","Premium Return [%]","Next Earnings","Earnings Before Expiry"
 ]
 
-# -------- helpers --------
-def fetch_sp500_tickers(max_retries=3, sleep_s=2) -> list:
-    import io
-    import pandas as pd
-    import time
-
-    # 1) yfinance helper
-    try:
-        if hasattr(yf, "tickers_sp500"):
-            syms = yf.tickers_sp500()
-            if syms:
-                return sorted({s.replace(".", "-").strip().upper() for s in syms})
-    except Exception:
-        pass
-
-    # 2) Wikipedia (primary)
-    wiki_url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
-    for _ in range(max_retries):
-        try:
-            html = YF_SESSION.get(wiki_url, timeout=20).text
-            tables = pd.read_html(io.StringIO(html), flavor="lxml")
-            df = tables[0]
-            col = "Symbol" if "Symbol" in df.columns else df.columns[0]
-            syms = (
-                df[col]
-                .astype(str)
-                .str.strip()
-                .str.replace(".", "-", regex=False)
-                .str.upper()
-                .tolist()
-            )
-            out = [s for s in syms if s and s != "SYMBOL"]
-            if out:
-                return sorted(set(out))
-        except Exception:
-            time.sleep(sleep_s)
-
-    # 3) CSV mirror backup (best-effort)
-    gh_url = "https://raw.githubusercontent.com/datasets/s-and-p-500-companies/master/data/constituents.csv"
-    for _ in range(max_retries):
-        try:
-            csvtxt = YF_SESSION.get(gh_url, timeout=20).text
-            df = pd.read_csv(io.StringIO(csvtxt))
-            col = "Symbol" if "Symbol" in df.columns else df.columns[0]
-            syms = (
-                df[col]
-                .astype(str)
-                .str.strip()
-                .str.replace(".", "-", regex=False)
-                .str.upper()
-                .tolist()
-            )
-            if syms:
-                return sorted(set(syms))
-        except Exception:
-            time.sleep(sleep_s)
-
-    # 4) Last resort: small static subset so the script still runs
-    print("Warning: could not fetch S&P 500 list. Using a small fallback set.")
-    return [
-        "AAPL","MSFT","NVDA","AMZN","GOOGL","META","TSLA","BRK-B","JPM","XOM",
-        "UNH","V","JNJ","WMT","HD","MA","PG","LLY","AVGO","NFLX"
-    ]
+RESULT_SCHEMA = {
+    "Symbol": STR, "Spot": FLOAT, "Expiry": STR, "DTE": FLOAT, "Strike": FLOAT,
+    "Bid": FLOAT, "Ask": FLOAT, "Mid": FLOAT, "OpenInterest": INT, "Volume": INT,
+    "Premium Return [%]": FLOAT, "Next Earnings": STR, "Earnings Before Expiry": BOOL,
+}
 
+# -------- helpers --------
 def mid_price(bid, ask, last):
     vals = []
     if pd.notna(bid) and bid > 0:
@@ -234,6 +184,24 @@ def pick_call_row(calls_df: pd.DataFrame, spot: float, mode: str) -> pd.Series |
     # fallback
     return pick_atm_row(calls_df, spot)
 
+def pick_put_row(puts_df: pd.DataFrame, spot: float, mode: str) -> pd.Series | None:
+    """Pick a cash-secured put row: atm, otm (nearest strike at or below spot),
+    or both (higher mid / strike). Same liquidity rules as the calls."""
+    if mode == "otm":
+        return pick_itm_row(puts_df, spot)
+    if mode != "both":
+        return pick_atm_row(puts_df, spot)
+    best, best_ret = None, -1e9
+    for r in (pick_atm_row(puts_df, spot), pick_itm_row(puts_df, spot)):
+        if r is None:
+            continue
+        mid = mid_price(float(r.get("bid") or float("nan")), float(r.get("ask") or float("nan")),
+                        float(r.get("lastPrice") or float("nan")))
+        ret = mid / float(r["strike"]) * 100.0
+        if np.isfinite(ret) and ret > best_ret:
+            best, best_ret = r, ret
+    return best
+
 def get_universe() -> list:
     """
     Mode 1: S&P 500 (current scanner)
@@ -260,166 +228,133 @@ def get_universe() -> list:
             raise SystemExit("No tickers entered.")
         return out
     # default to S&P 500
-    return fetch_sp500_tickers()
+    return list(cc_universe.get("sp500"))
 
 # ---- helper: get spot price ----
-def get_spot(tkr: yf.Ticker) -> float | None:
-    # 1) fast_info last trade
-    try:
-        fi = tkr.fast_info
-        p = getattr(fi, "last_price", None)
-        if p is not None and np.isfinite(p) and p > 0:
-            return float(p)
-    except Exception:
-        pass
-
-    # 2) latest intraday close (may be empty after-hours)
-    try:
-        h = tkr.history(period="1d", interval="1m")
-        if h is not None and not h.empty:
-            v = float(h["Close"].dropna().iloc[-1])
-            if np.isfinite(v) and v > 0:
-                return v
-    except Exception:
-        pass
-
-    # 3) fallback: last regular daily close (works off-hours)
-    try:
-        d = tkr.history(period="5d", interval="1d")
-        if d is not None and not d.empty:
-            v = float(d["Close"].dropna().iloc[-1])
-            if np.isfinite(v) and v > 0:
-                return v
-    except Exception:
-        pass
-
-    return None
-
-def resolve_expiry(tkr: yf.Ticker, target_str: str) -> str | None:
-    """Return the exact target expiry if available, else the nearest future expiry,
-    else the nearest overall. Input format YYYY-MM-DD."""
-    exps = tkr.options or []
-    if not exps:
-        return None
+def get_spot(symbol: str) -> float | None:
+    # fast_info, 1-minute and daily close, hedged past each source's p95 (cc_spot)
+    return cc_spot.get(symbol)
 
-    # fast path: exact match
-    if target_str in exps:
-        return target_str
+# side -> chain side; the put picker's name for each strike mode
+SIDES = {"call": ("calls",), "put": ("puts",), "both": ("calls", "puts")}
+PUT_MODES = {"atm": "atm", "itm": "otm", "both": "both"}
 
-    target_ts = pd.to_datetime(target_str, errors="coerce")
-    if pd.isna(target_ts):
-        return None
+def fetch_quotes(symbol: str, expiration: str, spot: float, sides=("calls",)) -> dict:
+    """{side: frame} of strikes near spot (cc_data.CHAIN_WINDOW) with the
+    picker columns only, every side from one fetch. The full chain, puts
+    included, is fetched only for the chain archive."""
+    if cc_archive.ROOT:
+        full = cc_data.option_chain(symbol, expiration)
+        cc_archive.append(symbol, expiration, full, spot)
+        quotes = {s: cc_pick.reduce_calls(getattr(full, s), spot, cc_data.CHAIN_WINDOW) for s in sides}
+    else:
+        quotes = {s: cc_pick.quotes_from_rows(rows, spot, cc_data.CHAIN_WINDOW)
+                  for s, rows in cc_data.option_rows(symbol, expiration, sides).items()}
+    return {s: None if q is None else pd.DataFrame(dict(zip(cc_pick.COLUMNS, q))) for s, q in quotes.items()}
 
-    exp_ts = pd.to_datetime(exps, errors="coerce")
-    # future expiries relative to now
-    now_utc = pd.Timestamp.utcnow().normalize()
-    future_idx = [i for i, ts in enumerate(exp_ts) if pd.notna(ts) and ts >= now_utc]
-
-    # choose nearest future to target if possible
-    if future_idx:
-        future = exp_ts[future_idx]
-        deltas = (future - target_ts).abs()
-        pick = future_idx[int(deltas.argmin())]
-        return exps[pick]
-
-    # else choose nearest overall to target
-    deltas_all = (exp_ts - target_ts).abs()
-    pick = int(deltas_all.argmin())
-    return exps[pick]
-
-def resolve_expiry(tkr: yf.Ticker, target_str: str) -> str | None:
-    """Return exact target expiry if available, else the nearest future expiry, else nearest overall."""
-    exps = tkr.options or []
-    if not exps:
-        return None
-    if target_str in exps:
-        return target_str
 
-    target_ts = pd.to_datetime(target_str, errors="coerce")
-    if pd.isna(target_ts):
-        return None
+def _count(v) -> int:
+    # open interest / volume come back NaN for strikes nobody traded
+    return int(v) if pd.notna(v) else 0
 
-    exp_ts = pd.to_datetime(exps, errors="coerce")
-    now_utc = pd.Timestamp.utcnow().normalize()
-    future_idx = [i for i, ts in enumerate(exp_ts) if pd.notna(ts) and ts >= now_utc]
-
-    if future_idx:
-        future = exp_ts[future_idx]
-        pick = future_idx[int((future - target_ts).abs().argmin())]
-        return exps[pick]
-
-    pick = int((exp_ts - target_ts).abs().argmin())
-    return exps[pick]
 
 # ---- main scan for one symbol ----
-def scan_symbol(symbol: str) -> dict | None:
+def scan_symbol(symbol: str, expiries: list, modes: list, sides=("calls",)) -> dict:
+    """Return {(expiry, mode, side): result row} for one symbol.
+    Options list, spot and earnings are fetched once; each chain once per
+    expiry, calls and puts alike."""
+    out = {}
+    if cc_liquidity.should_skip(symbol, MIN_OI, MIN_VOL, fetches=len(expiries), sides=sides):
+        return out
     try:
-        tkr = yf.Ticker(symbol)
-
-        # only use the user-entered expiry; skip if this ticker does not have it
-        exps = tkr.options or []
-        if EXP_STR not in exps:
-            return None
-        exp_use = EXP_STR
-
-        spot = get_spot(tkr)
-        if spot is None or not np.isfinite(spot) or spot <= 0:
-            return None
-        
-        chain = tkr.option_chain(exp_use).calls
-        if chain is None or chain.empty:
-            return None
-
-        row = pick_call_row(chain, spot, OPTION_MODE)
-        if row is None:
-            return None
-        
-        # we have an ATM row; inspect pricing before premium check
-        strike = float(row["strike"])
-        bid = float(row.get("bid") or float("nan"))
-        ask = float(row.get("ask") or float("nan"))
-        last = float(row.get("lastPrice") or float("nan"))
-        oi  = int(row.get("openInterest") or 0)
-        vol = int(row.get("volume") or 0)
-        premium_mid = mid_price(bid, ask, last)
-        
-        if not np.isfinite(premium_mid):
-            return None
-
-
-        prem_ret_pct = ((strike - spot) + premium_mid) / spot * 100.0
+        # only use the requested expiries; skip those this ticker does not have
+        with cc_metrics.timed("options"):
+            exps = cc_data.options(symbol)
+        wanted = [e for e in expiries if e in exps]
+        if not wanted:
+            return out
+
+        with cc_metrics.timed("spot"):
+            spot = get_spot(symbol)
+    except Exception as e:
+        print(f"[scan] {symbol}: {type(e).__name__}: {e}")
+        return out
+    if spot is None or not np.isfinite(spot) or spot <= 0:
+        return out
 
+    earn, earn_done = None, False
+    for exp_use in wanted:
         try:
-            dte_days = int((pd.to_datetime(exp_use) - pd.Timestamp.utcnow()).ceil("D").days)
-        except Exception:
-            dte_days = np.nan
-
-        earn = get_next_earnings(tkr)
-        earn_dt = pd.to_datetime(earn) if earn and earn != "N/A" else pd.NaT
-        flag = "⚠️" if pd.notna(earn_dt) and pd.notna(pd.to_datetime(exp_use)) and earn_dt.date() <= pd.to_datetime(exp_use).date() else ""
-
-        return {
-            "Symbol": symbol,
-            "Spot": round(spot, 2),
-            "Expiry": exp_use,  # show the actual expiry used
-            "DTE": dte_days,
-            "Strike": round(strike, 2),
-            "Bid": round(bid, 2) if np.isfinite(bid) else np.nan,
-            "Ask": round(ask, 2) if np.isfinite(ask) else np.nan,
-            "Mid": round(premium_mid, 2),
-            "OpenInterest": oi,
-            "Volume": vol,
-            "Premium Return [%]": round(prem_ret_pct, 2),
-            "Next Earnings": earn or "N/A",
-            "Earnings Before Expiry": flag,
-        }
-    except Exception:
-        return None
-
-def get_next_earnings(tkr: yf.Ticker) -> str | None:
+            with cc_metrics.timed("chain"):
+                chains = fetch_quotes(symbol, exp_use, spot, sides)
+            for side, chain in chains.items():
+                cc_liquidity.observe(symbol, chain, spot, side)
+
+            for side, chain in chains.items():
+                if chain is None or chain.empty:
+                    continue
+                for mode in modes:
+                    with cc_metrics.timed("pick"):
+                        if side == "calls":
+                            row = pick_call_row(chain, spot, mode)
+                        else:
+                            row = pick_put_row(chain, spot, PUT_MODES[mode])
+                    if row is None:
+                        continue
+
+                    # we have a row; inspect pricing before premium check
+                    strike = float(row["strike"])
+                    bid = float(row.get("bid") or float("nan"))
+                    ask = float(row.get("ask") or float("nan"))
+                    last = float(row.get("lastPrice") or float("nan"))
+                    oi  = _count(row.get("openInterest"))
+                    vol = _count(row.get("volume"))
+                    premium_mid = mid_price(bid, ask, last)
+
+                    if not np.isfinite(premium_mid):
+                        continue
+
+                    if side == "calls":
+                        prem_ret_pct = ((strike - spot) + premium_mid) / spot * 100.0
+                    else:
+                        prem_ret_pct = premium_mid / strike * 100.0
+
+                    try:
+                        dte_days = int((pd.to_datetime(exp_use).tz_localize("UTC") - pd.Timestamp.now(tz="UTC")).ceil("D").days)
+                    except Exception:
+                        dte_days = np.nan
+
+                    if not earn_done:
+                        with cc_metrics.timed("earnings"):
+                            earn = get_next_earnings(symbol)
+                        earn_done = True
+                    earn_dt = pd.to_datetime(earn) if earn and earn != "N/A" else pd.NaT
+                    flag = bool(pd.notna(earn_dt) and pd.notna(pd.to_datetime(exp_use)) and earn_dt.date() <= pd.to_datetime(exp_use).date())
+
+                    out[(exp_use, mode, side)] = {
+                        "Symbol": symbol,
+                        "Spot": round(spot, 2),
+                        "Expiry": exp_use,  # show the actual expiry used
+                        "DTE": dte_days,
+                        "Strike": round(strike, 2),
+                        "Bid": round(bid, 2) if np.isfinite(bid) else np.nan,
+                        "Ask": round(ask, 2) if np.isfinite(ask) else np.nan,
+                        "Mid": round(premium_mid, 2),
+                        "OpenInterest": oi,
+                        "Volume": vol,
+                        "Premium Return [%]": round(prem_ret_pct, 2),
+                        "Next Earnings": earn or "N/A",
+                        "Earnings Before Expiry": flag,
+                    }
+        except Exception as e:
+            # one bad chain must not cost the symbol its other expiries
+            print(f"[scan] {symbol} {exp_use}: {type(e).__name__}: {e}")
+    return out
+
+def get_next_earnings(symbol: str) -> str | None:
     """Return the next earnings date if available."""
     try:
-        df = tkr.get_earnings_dates(limit=1)
+        df = cc_data.earnings_dates(symbol, limit=1)
         if df is not None and not df.empty:
             next_date = df.index[0]
             return pd.to_datetime(next_date).strftime("%Y-%m-%d")
@@ -428,34 +363,137 @@ def get_next_earnings(tkr: yf.Ticker) -> str | None:
     return None
 
 
-def main():
-    print("Fetching S&P 500 tickers...")
-    tickers = get_universe()
-    print(f"Scanning {len(tickers)} symbols for nearest-expiry ATM call premium...")
-
-    rows = []
-    for i, sym in enumerate(tickers, 1):
-        res = scan_symbol(sym)
-        if res:
-            rows.append(res)
-            print(f"[{i}/{len(tickers)}] {sym}  ->  {res['Premium Return [%]']}%")
+# ---- command line ----
+def parse_args(argv) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Covered-call premium scanner (batch mode).")
+    ap.add_argument("--expiry", "-e", nargs="+", required=True, help="one or more expiries, YYYY-MM-DD")
+    ap.add_argument("--mode", "-m", nargs="+", default=["atm"], choices=["atm", "itm", "otm", "both"],
+                    help="strike modes; itm calls pair with otm puts, so itm and otm are the same")
+    ap.add_argument("--side", "-s", default="call", choices=list(SIDES),
+                    help="covered calls, cash-secured puts, or both from the same chain fetch")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--universe", "-u", default="sp500",
+                     help=f"cc_universe list to scan: {', '.join(cc_universe.names())} (default: sp500)")
+    src.add_argument("--tickers", nargs="+", help="symbols to scan instead of a universe")
+    src.add_argument("--tickers-file", help="file with one symbol per line")
+    ap.add_argument("--exclude-earnings", action="store_true", help="drop names with earnings before expiry")
+    ap.add_argument("--out-dir", default="scan_out", help="where result files are written")
+    ap.add_argument("--format", nargs="+", default=["csv"], choices=["csv", "json", "parquet"])
+    ap.add_argument("--top", type=int, default=50, help="rows to print per result set (0 = none)")
+    ap.add_argument("--profile", choices=cc_prof.MODES, help="profile the scan (default: CC_PROFILE)")
+    args = ap.parse_args(argv)
+    args.mode = list(dict.fromkeys("itm" if m == "otm" else m for m in args.mode))
+    for e in args.expiry:
+        if pd.isna(pd.to_datetime(e, format="%Y-%m-%d", errors="coerce")):
+            ap.error(f"invalid expiry {e!r}; use YYYY-MM-DD, e.g., 2025-10-24")
+    return args
+
+def prompt_args() -> argparse.Namespace:
+    """The original interactive prompts; results are printed, not written."""
+    exp_str = input("ENTER EXPIRATION (YYYY-MM-DD): ").strip()
+    include_earn = input("Include tickers with earnings before expiry? (y/n): ").strip().lower().startswith("y")
+    if pd.isna(pd.to_datetime(exp_str, errors="coerce")):
+        raise SystemExit("Invalid date. Use format YYYY-MM-DD, e.g., 2025-10-24")
+
+    option_mode = input("Which calls to scan? (atm/itm/both): ").strip().lower()
+    if option_mode not in {"atm", "itm", "both"}:
+        option_mode = "atm"
+    return argparse.Namespace(expiry=[exp_str], mode=[option_mode], side="call", exclude_earnings=not include_earn,
+                              out_dir=None, format=[], top=50, profile=None)
+
+def load_tickers(args) -> list:
+    if args.tickers:
+        return cc_universe.clean(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file) as f:
+            return cc_universe.clean(f.read().split())
+    try:
+        return list(cc_universe.get(args.universe))
+    except KeyError as e:
+        raise SystemExit(f"{e.args[0]}; known: {', '.join(cc_universe.names())}")
+
+def write_results(rs, out_dir, expiry, mode, formats, side="calls") -> list:
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    name = f"cc_scan_{expiry}_{mode}" if side == "calls" else f"csp_scan_{expiry}_{PUT_MODES[mode]}"
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        if fmt == "csv":
+            rs.to_csv(path)
+        elif fmt == "json":
+            rs.to_json(path)
         else:
-            print(f"[{i}/{len(tickers)}] {sym}  ->  skipped")
+            rs.to_parquet(path)
+        paths.append(path)
+    return paths
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        args = parse_args(argv)
+        tickers = load_tickers(args)
+    else:
+        args = prompt_args()
+        print("Fetching S&P 500 tickers...")
+        tickers = get_universe()
+
+    sides = SIDES[args.side]
+    combos = [(e, m, s) for e in args.expiry for m in args.mode for s in sides]
+    print(f"Scanning {len(tickers)} symbols for {len(combos)} expiry/mode/side combination(s)...")
+
+    def one(sym):
+        t0 = time.perf_counter()
+        res = scan_symbol(sym, args.expiry, args.mode, sides)
+        cc_metrics.observe("cc_phase_seconds", time.perf_counter() - t0, phase="symbol")
+        cc_metrics.inc("cc_symbols_total", outcome="ok" if res else "skipped")
         time.sleep(SLEEP_BETWEEN)
-
-    if not rows:
-        print("No results. Try again later or relax filters.")
-        return
-
-    valid_count = sum(res is not None for res in rows)
-    print(f"\n{valid_count} tickers had the {EXP_STR} expiry available.")
-
-    df = pd.DataFrame(rows)
-    if not INCLUDE_EARN_BEF_EXP:
-        df = df[df["Earnings Before Expiry"] != "⚠️"]
-    df.sort_values("Premium Return [%]", ascending=False, inplace=True)
-    print("\nTop 50 by % Premium Return (nearest-expiry ATM calls):")
-    print(df[SHOW_COLS].head(50).to_string(index=False))
+        return res
+
+    rows = {c: [] for c in combos}
+    with cc_prof.profiled(f"scanner-{'_'.join(args.expiry)}-{len(tickers)}", args.profile), \
+            ThreadPoolExecutor(max_workers=cc_data.SCAN_WORKERS) as pool:
+        prof = cc_prof.current()
+        futures = {pool.submit(cc_prof.call, prof, one, sym): sym for sym in tickers}
+        for i, fut in enumerate(as_completed(futures), 1):
+            sym, res = futures[fut], fut.result()
+            for combo, row in res.items():
+                rows[combo].append(row)
+            if res:
+                rets = ", ".join(f"{r['Premium Return [%]']}%" if len(combos) == 1 else
+                                 f"{e} {m} {s} {r['Premium Return [%]']}%" for (e, m, s), r in res.items())
+                print(f"[{i}/{len(tickers)}] {sym}  ->  {rets}")
+            else:
+                print(f"[{i}/{len(tickers)}] {sym}  ->  skipped")
+
+    cc_liquidity.save()
+    cc_archive.flush()
+    print(f"\nLiquidity prefilter: {cc_liquidity.avoided()} chain fetches avoided"
+          + ("" if cc_liquidity.SKIP_FACTOR > 0 else " (off; set CC_LIQ_SKIP=1 to enable)"))
+
+    print("\nPer-phase timing:")
+    print(cc_metrics.format_summary())
+
+    for exp_str, mode, side in combos:
+        combo_rows = rows[(exp_str, mode, side)]
+        label = f"{mode.upper()} calls" if side == "calls" else f"{PUT_MODES[mode].upper()} cash-secured puts"
+        if not combo_rows:
+            print(f"\n{exp_str} {label}: no results. Try again later or relax filters.")
+            continue
+
+        print(f"\n{len(combo_rows)} tickers had the {exp_str} expiry available.")
+
+        rs = ResultSet.from_records(combo_rows, RESULT_SCHEMA)
+        if args.exclude_earnings:
+            rs = rs.filter(~rs["Earnings Before Expiry"])
+        rs = rs.sort("Premium Return [%]")
+        if args.out_dir:
+            for path in write_results(rs, args.out_dir, exp_str, mode, args.format, side):
+                print(f"Saved {path}")
+        if args.top:
+            print(f"\nTop {args.top} by % Premium Return ({exp_str}, {label}):")
+            top = rs.select(SHOW_COLS).head(args.top).to_frame()
+            top["Earnings Before Expiry"] = top["Earnings Before Expiry"].map({True: "⚠️", False: ""})
+            print(top.to_string(index=False))
 
 if __name__ == "__main__":
     main()
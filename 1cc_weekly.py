@@ -1,12 +1,30 @@
 # covered_call_weekly.py
 # Weekly covered-call backtest: sell ATM call each Friday, close next Friday, roll.
-# Uses Black-Scholes with rolling realized volatility as an IV proxy.
-
+# Uses Black-Scholes with rolling realized volatility as an IV proxy, or, with
+# --quotes DIR, real historical call quotes picked by the scanners' rules.
+#
+#   python 1cc_weekly.py                          # prompts for the ticker
+#   python 1cc_weekly.py AAPL --quotes data/      # CSV / Parquet files or a cc_archive dir
+#
+# Quote files need columns date, symbol, expiry, strike, bid, ask, oi, volume
+# (common aliases such as expiration / openInterest are accepted; an optional
+# side / type column keeps calls only). Only the requested symbol is kept and
+# it is indexed by (date, expiry, strike) in flat sorted arrays, so each week
+# costs two searchsorted lookups whatever the size of the dataset.
+
+import argparse
+import glob
 import math
+import os
+import sys
 import pandas as pd
-import yfinance as yf
 from datetime import timedelta
 
+import cc_archive
+import cc_data
+import cc_pick
+import cc_prof
+
 # ---------- helpers ----------
 def norm_cdf(x):
     return 0.5 * (1.0 + math.erf(x / math.sqrt(2.0)))
@@ -28,7 +46,6 @@ def nearest_strike(price, increment=1.0):
     return round(price / increment) * increment
 
 # ---------- inputs ----------
-SYMBOL = input("Enter stock ticker: ").strip().upper() or "AAPL"
 PERIOD = "10y"   # change to "20y" if you wish and have data
 RISK_FREE = 0.02 # 2% annual proxy; adjust as you like
 VOL_WIN = 21     # use 1-month realized vol as proxy for IV
@@ -38,130 +55,329 @@ SLIPPAGE = 0.0   # per-share slippage
 STOCK_FEE = 0.0  # per-share commission
 OPT_FEE = 0.0    # per-share option commission (contract is 100 shares; we model per share)
 
-print(f"Downloading {SYMBOL}...")
+# strike rules for --quotes, same as 1cc_scanner
+MIN_OI = 100
+MIN_VOL = 10
+ATM_TOL = 0.02
 
 import numpy as np  # add once near top if not already
 
-px = yf.download(
-    SYMBOL, period=PERIOD, interval="1d",
-    auto_adjust=False, group_by="column", progress=False
-).rename(columns=str.title)
-
-# keep only OHLCV
-px = px[["Open","High","Low","Close","Volume"]].dropna()
-
-# ensure Close is 1-D
-close = px["Close"]
-if isinstance(close, pd.DataFrame):
-    close = close.iloc[:, 0]
-
-# weekly schedule: Friday closes
-week_close = px["Close"].resample("W-FRI").last().dropna()
-# align to actual trading days for return calc
-close_on = px["Close"]
-
-weekly_rows = []
-equity = None
-equity_curve = []
-
-# build daily log returns for realized vol
-daily_ret = np.log(close).diff().dropna()
-
-# iterate week-by-week
-for i in range(len(week_close) - 1):
-    date_sell = week_close.index[i]
-    date_buy  = week_close.index[i+1]
-
-    # map to actual close prices on those dates (already aligned by resample)
-    if date_sell not in close_on.index or date_buy not in close_on.index:
-        continue
-
-    S0 = float(close_on.loc[date_sell])
-    S1 = float(close_on.loc[date_buy])
-
-    # realized vol proxy through the sell date
-    hist = daily_ret[daily_ret.index <= date_sell]
-    sigma = realized_vol_annualized(hist.values, VOL_WIN)
-    if sigma is None or not math.isfinite(sigma):
-        continue
-
-    # sell ATM call at Friday close
-    K = nearest_strike(S0, STRIKE_STEP)
-    premium = bs_call_price(S0, K, RISK_FREE, sigma, T_WEEK)
-
-    # one-week payoff per share for covered call
-    # long stock + short call
-    stock_pnl = (S1 - S0) - SLIPPAGE - STOCK_FEE
-    call_pnl  = premium - max(S1 - K, 0) - SLIPPAGE - OPT_FEE
-    pnl = stock_pnl + call_pnl
-
-    # initialize equity as 1 share notional to make returns interpretable
-    if equity is None:
-        equity = S0
-
-    weekly_ret = pnl / equity  # return on current equity base
-    equity += pnl
-    equity_curve.append({"date": date_buy, "equity": equity, "ret": weekly_ret})
-
-    weekly_rows.append({
-        "SellDate": date_sell.date(),
-        "BuyDate": date_buy.date(),
-        "S0": S0,
-        "S1": S1,
-        "K": K,
-        "Sigma": sigma,
-        "Premium": premium,
-        "StockPnL": stock_pnl,
-        "CallPnL": call_pnl,
-        "TotalPnL": pnl,
-        "WeeklyRet": weekly_ret,
-        "ExpiredOTM": 1 if S1 <= K else 0
-    })
-
-if not weekly_rows:
-    raise SystemExit("Not enough data to run weekly cycles. Try a shorter VOL_WIN or longer PERIOD.")
-
-wk = pd.DataFrame(weekly_rows)
-eq = pd.DataFrame(equity_curve).set_index("date")
-
-# Extra metrics
-initial_equity = wk.iloc[0]["S0"]
-final_equity = equity
-
-# average weekly premium as % of spot at sale
-avg_premium_pct = 100.0 * (wk["Premium"] / wk["S0"]).mean()
-
-
-# summary stats
-weeks = len(wk)
-wins = int((wk["TotalPnL"] > 0).sum())
-win_rate = 100.0 * wins / weeks
-total_return = 100.0 * ((equity / wk.iloc[0]["S0"]) - 1.0)
-avg_premium = wk["Premium"].mean()
-expired_otm = 100.0 * wk["ExpiredOTM"].mean()
-trades = weeks  # one option cycle per week
-
-# annualized return (CAGR) from weekly cycles
-annual_return_pct = ((final_equity / initial_equity) ** (52.0 / weeks) - 1.0) * 100.0
-
-# Sharpe on weekly returns
-if eq["ret"].std() and eq["ret"].std() > 0:
-    sharpe = (eq["ret"].mean() / eq["ret"].std()) * math.sqrt(52.0)
-else:
-    sharpe = float("nan")
-
-print("\n=== Weekly Covered Call Results ===")
-print(f"Symbol:           {SYMBOL}")
-print(f"Weeks:            {weeks}")
-print(f"Win Rate [%]:     {win_rate:.2f}")
-print(f"Return [%]:       {total_return:.2f}")
-print(f"Annual Return [%]: {annual_return_pct:.2f}")
-print(f"Sharpe (weekly):  {sharpe:.2f}")
-print(f"# Trades:         {trades}")
-print(f"Avg Premium ($):  {avg_premium:.2f}")
-print(f"Avg Premium [%]:  {avg_premium_pct:.2f}")
-print(f"% Expired OTM:    {expired_otm:.2f}")
-
-# save details
-wk.to_csv(f"{SYMBOL}_covered_call_weekly.csv", index=False)
-print(f"\nSaved trade log: {SYMBOL}_covered_call_weekly.csv")
+def load_prices(symbol, period=PERIOD):
+    px = cc_data.download(symbol, period=period, interval="1d").rename(columns=str.title)
+
+    # keep only OHLCV
+    return px[["Open","High","Low","Close","Volume"]].dropna()
+
+# ---------- historical quotes ----------
+def _day(d) -> int:
+    return int(np.datetime64(str(d)[:10], "D").astype(np.int64))
+
+
+class QuoteIndex:
+    """Call quotes for one symbol in flat arrays sorted by (date, expiry, strike).
+    A row's key is date << 16 | days to expiry, so one date's expiries and one
+    (date, expiry) chain are contiguous ranges found with searchsorted."""
+
+    def __init__(self, date, expiry, strike, bid, ask, oi, vol):
+        key = (date.astype(np.int64) << 16) | (expiry - date).astype(np.int64)
+        order = np.lexsort((strike, key))
+        self.key = key[order]
+        self.strike, self.bid, self.ask = strike[order], bid[order], ask[order]
+        self.oi, self.vol = oi[order], vol[order]
+        self.last = np.full(len(order), np.nan)
+
+    def __len__(self):
+        return len(self.key)
+
+    def expiries(self, date: str) -> list:
+        d = _day(date)
+        lo, hi = np.searchsorted(self.key, [d << 16, (d + 1) << 16])
+        return [str(np.datetime64(d + int(t), "D")) for t in np.unique(self.key[lo:hi] & 0xFFFF)]
+
+    def quotes(self, date: str, expiry: str) -> cc_pick.Quotes | None:
+        d = _day(date)
+        k = (d << 16) | (_day(expiry) - d)
+        lo, hi = np.searchsorted(self.key, [k, k + 1])
+        if lo == hi:
+            return None
+        return cc_pick.Quotes(self.strike[lo:hi], self.bid[lo:hi], self.ask[lo:hi],
+                              self.last[lo:hi], self.oi[lo:hi], self.vol[lo:hi])
+
+
+class ArchiveQuotes:
+    """Same interface over a cc_archive directory (last snapshot of each day)."""
+
+    def __init__(self, root, symbol):
+        self.reader = cc_archive.ArchiveReader(root)
+        self.symbol = symbol
+
+    def expiries(self, date: str) -> list:
+        return self.reader.expiries(date, self.symbol)
+
+    def quotes(self, date: str, expiry: str) -> cc_pick.Quotes | None:
+        q = self.reader.quotes(date, self.symbol, expiry, "C")
+        if q is None:
+            return None
+        last = np.r_[np.flatnonzero(np.diff(q["strike"])), len(q["strike"]) - 1]
+        return cc_pick.Quotes(*(np.asarray(q[c][last], dtype=float)
+                                for c in ("strike", "bid", "ask", "last", "oi", "volume")))
+
+
+_ALIASES = {
+    "date": ("date", "quote_date", "quotedate", "snapshot_date", "trade_date"),
+    "symbol": ("symbol", "underlying", "underlying_symbol", "ticker", "root"),
+    "expiry": ("expiry", "expiration", "expiration_date", "exdate", "exp"),
+    "strike": ("strike", "strike_price"),
+    "bid": ("bid",),
+    "ask": ("ask",),
+    "oi": ("oi", "openinterest", "open_interest"),
+    "volume": ("volume", "vol"),
+    "side": ("side", "type", "option_type", "call_put", "cp", "right"),
+}
+
+
+def _columns(names) -> dict:
+    """Our column -> the file's column name, matched case-insensitively."""
+    lower = {n.lower().replace(" ", "_"): n for n in names}
+    out = {}
+    for col, aliases in _ALIASES.items():
+        for a in aliases:
+            if a in lower:
+                out[col] = lower[a]
+                break
+    missing = [c for c in _ALIASES if c not in out and c != "side"]
+    if missing:
+        raise SystemExit(f"quote file is missing column(s): {', '.join(missing)}")
+    return out
+
+
+def _read_quote_file(path, symbol) -> pd.DataFrame:
+    """Rows of one CSV / Parquet file for symbol, with our column names."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise SystemExit("Parquet quote files need pyarrow: pip install pyarrow") from e
+        cols = _columns(pq.read_schema(path).names)
+        df = pd.read_parquet(path, columns=list(cols.values()), filters=[(cols["symbol"], "==", symbol)])
+    else:
+        cols = _columns(pd.read_csv(path, nrows=0).columns)
+        chunks = pd.read_csv(path, usecols=list(cols.values()), chunksize=1_000_000)
+        df = pd.concat([c[c[cols["symbol"]].astype(str).str.upper() == symbol] for c in chunks])
+    df = df.rename(columns={v: k for k, v in cols.items()})
+    if "side" in df:
+        df = df[df["side"].astype(str).str.upper().str[0] == "C"]
+    return df
+
+
+def load_quotes(path, symbol):
+    """QuoteIndex of symbol's calls from a directory (or file) of CSV / Parquet
+    quotes, or an ArchiveQuotes if path is a cc_archive directory."""
+    if glob.glob(os.path.join(path, "*", "*", "part-*.npz")):
+        return ArchiveQuotes(path, symbol)
+    files = [path] if os.path.isfile(path) else sorted(
+        glob.glob(os.path.join(path, "**", "*.csv"), recursive=True)
+        + glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True))
+    if not files:
+        raise SystemExit(f"no .csv / .parquet quote files under {path}")
+    df = pd.concat([_read_quote_file(f, symbol) for f in files], ignore_index=True)
+    date = pd.to_datetime(df["date"]).to_numpy("datetime64[D]").astype(np.int64)
+    expiry = pd.to_datetime(df["expiry"]).to_numpy("datetime64[D]").astype(np.int64)
+    keep = (expiry >= date) & (expiry - date < 1 << 16)
+
+    def num(c):
+        return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)[keep]
+    return QuoteIndex(date[keep], expiry[keep], num("strike"), num("bid"), num("ask"), num("oi"), num("volume"))
+
+
+def quote_week(book, date_sell, date_buy, S0, S1, mode="atm"):
+    """(expiry, strike, premium, cost to close) for one week from real quotes, or None.
+    Sells the first expiry on/after date_buy; closes at intrinsic if it expires
+    that day, else buys it back at the date_buy mid (intrinsic if unquoted)."""
+    sell, buy = date_sell.strftime("%Y-%m-%d"), date_buy.strftime("%Y-%m-%d")
+    exps = [e for e in book.expiries(sell) if e >= buy]
+    if not exps:
+        return None
+    exp = exps[0]
+    q = book.quotes(sell, exp)
+    i = cc_pick.pick(q, S0, mode, MIN_OI, MIN_VOL, ATM_TOL)
+    if i is None:
+        return None
+    K, premium = float(q.strike[i]), float(cc_pick.mids(q)[i])
+    if not math.isfinite(premium):
+        return None
+
+    close_cost = max(S1 - K, 0.0)
+    if exp > buy:
+        q1 = book.quotes(buy, exp)
+        if q1 is not None:
+            j = int(np.searchsorted(q1.strike, K))
+            if j < len(q1.strike) and q1.strike[j] == K:
+                mid1 = float(cc_pick.mids(q1)[j])
+                if math.isfinite(mid1):
+                    close_cost = mid1
+    return exp, K, premium, close_cost
+
+
+def run_backtest(px, book=None, mode="atm"):
+    """Sell an ATM call each Friday close, settle it the next Friday.
+    With book (load_quotes), strike and premium come from real quotes instead
+    of Black-Scholes, and weeks without a usable quote are skipped.
+    Returns (trade log DataFrame, equity curve DataFrame, final equity)."""
+    # ensure Close is 1-D
+    close = px["Close"]
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+
+    # weekly schedule: Friday closes
+    week_close = close.resample("W-FRI").last().dropna()
+    # align to actual trading days for return calc
+    close_on = close
+
+    weekly_rows = []
+    equity = None
+    equity_curve = []
+
+    # build daily log returns for realized vol
+    daily_ret = np.log(close).diff().dropna()
+
+    # iterate week-by-week
+    for i in range(len(week_close) - 1):
+        date_sell = week_close.index[i]
+        date_buy  = week_close.index[i+1]
+
+        # map to actual close prices on those dates (already aligned by resample)
+        if date_sell not in close_on.index or date_buy not in close_on.index:
+            continue
+
+        S0 = float(close_on.loc[date_sell])
+        S1 = float(close_on.loc[date_buy])
+
+        if book is not None:
+            # sell the quoted call picked by the scanner rules
+            week = quote_week(book, date_sell, date_buy, S0, S1, mode)
+            if week is None:
+                continue
+            expiry, K, premium, close_cost = week
+            sigma = float("nan")
+        else:
+            # realized vol proxy through the sell date
+            hist = daily_ret[daily_ret.index <= date_sell]
+            sigma = realized_vol_annualized(hist.values, VOL_WIN)
+            if sigma is None or not math.isfinite(sigma):
+                continue
+
+            # sell ATM call at Friday close
+            expiry = date_buy.date()
+            K = nearest_strike(S0, STRIKE_STEP)
+            premium = bs_call_price(S0, K, RISK_FREE, sigma, T_WEEK)
+            close_cost = max(S1 - K, 0)
+
+        # one-week payoff per share for covered call
+        # long stock + short call
+        stock_pnl = (S1 - S0) - SLIPPAGE - STOCK_FEE
+        call_pnl  = premium - close_cost - SLIPPAGE - OPT_FEE
+        pnl = stock_pnl + call_pnl
+
+        # initialize equity as 1 share notional to make returns interpretable
+        if equity is None:
+            equity = S0
+
+        weekly_ret = pnl / equity  # return on current equity base
+        equity += pnl
+        equity_curve.append({"date": date_buy, "equity": equity, "ret": weekly_ret})
+
+        weekly_rows.append({
+            "SellDate": date_sell.date(),
+            "BuyDate": date_buy.date(),
+            "Expiry": expiry,
+            "S0": S0,
+            "S1": S1,
+            "K": K,
+            "Sigma": sigma,
+            "Premium": premium,
+            "StockPnL": stock_pnl,
+            "CallPnL": call_pnl,
+            "TotalPnL": pnl,
+            "WeeklyRet": weekly_ret,
+            "ExpiredOTM": 1 if S1 <= K else 0
+        })
+
+    if not weekly_rows:
+        return None, None, equity
+
+    wk = pd.DataFrame(weekly_rows)
+    eq = pd.DataFrame(equity_curve).set_index("date")
+    return wk, eq, equity
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Weekly covered-call backtest.")
+    ap.add_argument("symbol", nargs="?", help="ticker (prompted for if omitted)")
+    ap.add_argument("--quotes", metavar="DIR", help="historical call quotes (CSV / Parquet / cc_archive dir)")
+    ap.add_argument("--mode", default="atm", choices=["atm", "itm", "both"], help="strike rule with --quotes")
+    ap.add_argument("--period", default=PERIOD, help="price history to download, e.g. 10y")
+    ap.add_argument("--profile", choices=cc_prof.MODES, help="profile the run (default: CC_PROFILE)")
+    args = ap.parse_args(sys.argv[1:] if argv is None else argv)
+    SYMBOL = (args.symbol or input("Enter stock ticker: ")).strip().upper() or "AAPL"
+
+    with cc_prof.profiled(f"backtest-{SYMBOL}", args.profile):
+        print(f"Downloading {SYMBOL}...")
+        px = load_prices(SYMBOL, period=args.period)
+
+        book = None
+        if args.quotes:
+            book = load_quotes(args.quotes, SYMBOL)
+            if isinstance(book, QuoteIndex):
+                print(f"Indexed {len(book):,} {SYMBOL} call quotes from {args.quotes}")
+
+        wk, eq, equity = run_backtest(px, book, args.mode)
+    if wk is None:
+        if book is not None:
+            raise SystemExit(f"No week had a usable {SYMBOL} quote in {args.quotes}.")
+        raise SystemExit("Not enough data to run weekly cycles. Try a shorter VOL_WIN or longer PERIOD.")
+
+    # Extra metrics
+    initial_equity = wk.iloc[0]["S0"]
+    final_equity = equity
+
+    # average weekly premium as % of spot at sale
+    avg_premium_pct = 100.0 * (wk["Premium"] / wk["S0"]).mean()
+
+
+    # summary stats
+    weeks = len(wk)
+    wins = int((wk["TotalPnL"] > 0).sum())
+    win_rate = 100.0 * wins / weeks
+    total_return = 100.0 * ((equity / wk.iloc[0]["S0"]) - 1.0)
+    avg_premium = wk["Premium"].mean()
+    expired_otm = 100.0 * wk["ExpiredOTM"].mean()
+    trades = weeks  # one option cycle per week
+
+    # annualized return (CAGR) from weekly cycles
+    annual_return_pct = ((final_equity / initial_equity) ** (52.0 / weeks) - 1.0) * 100.0
+
+    # Sharpe on weekly returns
+    if eq["ret"].std() and eq["ret"].std() > 0:
+        sharpe = (eq["ret"].mean() / eq["ret"].std()) * math.sqrt(52.0)
+    else:
+        sharpe = float("nan")
+
+    print("\n=== Weekly Covered Call Results ===")
+    print(f"Symbol:           {SYMBOL}")
+    print(f"Pricing:          {'quotes from ' + args.quotes + ' (' + args.mode + ')' if book is not None else 'Black-Scholes, realized vol'}")
+    print(f"Weeks:            {weeks}")
+    print(f"Win Rate [%]:     {win_rate:.2f}")
+    print(f"Return [%]:       {total_return:.2f}")
+    print(f"Annual Return [%]: {annual_return_pct:.2f}")
+    print(f"Sharpe (weekly):  {sharpe:.2f}")
+    print(f"# Trades:         {trades}")
+    print(f"Avg Premium ($):  {avg_premium:.2f}")
+    print(f"Avg Premium [%]:  {avg_premium_pct:.2f}")
+    print(f"% Expired OTM:    {expired_otm:.2f}")
+
+    # save details
+    wk.to_csv(f"{SYMBOL}_covered_call_weekly.csv", index=False)
+    print(f"\nSaved trade log: {SYMBOL}_covered_call_weekly.csv")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 # forward_cc_monte_carlo.py
 # Simulate 1 year of weekly ATM covered-call rolls using current option-chain IV.
+# The IV surface (moneyness x tenor) is built once from every listed expiry;
+# the weekly steps then look their vol up on that grid, all paths at once.
 # Outputs distribution of annual returns and key percentiles.
 
+import argparse
 import math, sys
 import numpy as np
 import pandas as pd
-import yfinance as yf
+
+import cc_data
+import cc_prof
 
 # ---------- Black–Scholes call ----------
 def _ncdf(x):  # standard normal CDF
@@ -18,20 +23,86 @@ def bs_call_price(S, K, r, sigma, T):
     d2 = d1 - sigma * math.sqrt(T)
     return S * _ncdf(d1) - K * math.exp(-r * T) * _ncdf(d2)
 
+def _ncdf_vec(x):
+    # Abramowitz & Stegun 7.1.26 erf (|error| < 1.5e-7); numpy has no erf and scipy is optional
+    z = np.abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+def bs_call_price_vec(S, K, r, sigma, T):
+    """bs_call_price over arrays S, K, sigma (sigma > 0, T > 0)."""
+    sq = sigma * math.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sq
+    return S * _ncdf_vec(d1) - K * math.exp(-r * T) * _ncdf_vec(d1 - sq)
+
 # ---------- inputs ----------
-SYMBOL = input("Ticker: ").strip().upper() or "AAPL"
-N_PATHS = int(input("Number of scenarios [e.g., 2000]: ") or "2000")
 WEEKS = 52
 DT = 1.0 / 52.0
 R = 0.02  # annual risk-free proxy
 STRIKE_STEP = 1.0  # nearest dollar
-np.random.seed(42)
 
-# ---------- pull spot and current ATM IV ----------
-tkr = yf.Ticker(SYMBOL)
-opts = tkr.options
-if not opts:
-    sys.exit("No option expiries found for this ticker.")
+# simple vol of vol to vary IV week to week
+vol_of_vol = 0.20  # 20% relative noise around base IV
+
+# IV surface grid: log-moneyness ln(K/S) x tenor (weekly out to one year)
+M_GRID = np.linspace(-0.4, 0.4, 33)
+T_GRID = np.arange(1, WEEKS + 1) * DT
+IV_MIN, IV_MAX = 0.01, 5.0  # quotes outside this are treated as bad
+
+# ---------- implied-vol surface ----------
+class IVSurface:
+    """IV on a uniform (log-moneyness, tenor) grid, built once from the chains.
+    Lookups are bilinear on the grid by index arithmetic, so O(1) per point
+    and vectorized over arrays; outside the grid the edge value is used."""
+
+    def __init__(self, iv):
+        self.iv = iv  # shape (len(T_GRID), len(M_GRID))
+        self._m0, self._dm = M_GRID[0], M_GRID[1] - M_GRID[0]
+        self._t0, self._dt = T_GRID[0], T_GRID[1] - T_GRID[0]
+
+    @classmethod
+    def flat(cls, sigma):
+        return cls(np.full((len(T_GRID), len(M_GRID)), float(sigma)))
+
+    @classmethod
+    def from_smiles(cls, smiles):
+        """smiles: [(tenor years, log-moneyness array, iv array), ...].
+        Each smile is interpolated onto M_GRID, then tenors are filled in
+        linearly in total variance (iv^2 * t), flat in vol past either end."""
+        smiles = sorted(smiles, key=lambda s: s[0])
+        tenors = np.array([t for t, _, _ in smiles])
+        rows = np.array([np.interp(M_GRID, m, iv) for _, m, iv in smiles])
+        var = rows ** 2 * tenors[:, None]
+        grid = np.empty((len(T_GRID), len(M_GRID)))
+        for j in range(len(M_GRID)):
+            w = np.interp(T_GRID, tenors, var[:, j])
+            # flat vol (not flat variance) outside the quoted tenors
+            w = np.where(T_GRID < tenors[0], rows[0, j] ** 2 * T_GRID, w)
+            w = np.where(T_GRID > tenors[-1], rows[-1, j] ** 2 * T_GRID, w)
+            grid[:, j] = np.sqrt(w / T_GRID)
+        return cls(grid)
+
+    def __call__(self, m, t):
+        x = np.clip((np.asarray(m, dtype=float) - self._m0) / self._dm, 0, len(M_GRID) - 1)
+        y = np.clip((np.asarray(t, dtype=float) - self._t0) / self._dt, 0, len(T_GRID) - 1)
+        i, j = np.minimum(y.astype(int), len(T_GRID) - 2), np.minimum(x.astype(int), len(M_GRID) - 2)
+        fy, fx = y - i, x - j
+        g = self.iv
+        return ((1 - fy) * ((1 - fx) * g[i, j] + fx * g[i, j + 1])
+                + fy * ((1 - fx) * g[i + 1, j] + fx * g[i + 1, j + 1]))
+
+    def atm(self, t):
+        return float(self(0.0, t))
+
+    def forward_atm(self):
+        """ATM forward vol for each simulated week, from the term structure."""
+        atm = np.array([self.atm(t) for t in T_GRID])
+        fwd_var = np.diff(atm ** 2 * T_GRID, prepend=0.0) / DT
+        # noisy or calendar-arbitraged quotes can make forward variance tiny or
+        # negative; never let a week fall below half the spot ATM vol
+        return np.sqrt(np.maximum(fwd_var, (0.5 * atm) ** 2))
 
 # pick the first expiry at least 7 days out if possible
 def pick_expiry(expiries):
@@ -41,91 +112,151 @@ def pick_expiry(expiries):
             return e
     return expiries[0]
 
-exp = pick_expiry(opts)
-chain = tkr.option_chain(exp).calls
-spot = float(tkr.fast_info.last_price or tkr.history(period="1d", interval="1m")["Close"].dropna().iloc[-1])
+def _smile(chain, spot, tenor):
+    """(tenor, log-moneyness, iv) from OTM quotes: puts below spot, calls above."""
+    pts = []
+    for side, otm in ((chain.calls, lambda k: k >= spot), (chain.puts, lambda k: k < spot)):
+        if side is None or side.empty or "impliedVolatility" not in side.columns:
+            continue
+        k = side["strike"].to_numpy(dtype=float)
+        iv = side["impliedVolatility"].to_numpy(dtype=float)
+        ok = np.isfinite(k) & np.isfinite(iv) & (iv > IV_MIN) & (iv < IV_MAX) & otm(k)
+        pts.append((np.log(k[ok] / spot), iv[ok]))
+    if not pts:
+        return None
+    m = np.concatenate([p[0] for p in pts])
+    iv = np.concatenate([p[1] for p in pts])
+    if len(m) < 3:
+        return None
+    order = np.argsort(m)
+    return tenor, m[order], iv[order]
 
-# choose ATM by nearest strike, prefer >= spot
-chain = chain.dropna(subset=["strike"]).copy()
-chain["dist"] = chain["strike"] - spot
-atm = chain[chain["dist"] >= 0].sort_values(["dist", "strike"]).head(1)
-if atm.empty:
-    atm = chain.reindex((chain["strike"] - spot).abs().sort_values().index).head(1)
+# ---------- pull spot and the IV surface ----------
+def load_market(symbol):
+    """Return (spot, IVSurface, annual drift, expiry used) for symbol.
+    Every listed expiry's chain goes into the surface."""
+    opts = cc_data.options(symbol)
+    if not opts:
+        sys.exit("No option expiries found for this ticker.")
 
-iv0 = float(atm["impliedVolatility"].iloc[0]) if "impliedVolatility" in atm.columns else np.nan
+    exp = pick_expiry(opts)
+    spot = float(cc_data.last_price(symbol) or cc_data.history(symbol, period="1d", interval="1m")["Close"].dropna().iloc[-1])
 
-# fallback IV from realized vol if IV missing
-hist = tkr.history(period="3y", interval="1d")["Close"].dropna()
-rv_annual = float(np.log(hist).diff().dropna().std() * np.sqrt(252)) if len(hist) > 30 else 0.25
-SIGMA0 = iv0 if np.isfinite(iv0) and iv0 > 0 else rv_annual
+    now = pd.Timestamp.today()
+    smiles = []
+    for e in opts:
+        tenor = ((pd.to_datetime(e) - now).total_seconds() / 86400.0 + 1.0) / 365.0  # to the close of expiry day
+        if tenor <= 0:
+            continue
+        try:
+            sm = _smile(cc_data.option_chain(symbol, e), spot, tenor)
+        except Exception as ex:
+            print(f"{symbol} {e}: chain unavailable ({ex})")
+            continue
+        if sm is not None:
+            smiles.append(sm)
 
-print(f"Using spot={spot:.2f}, base IV={SIGMA0:.3f}, expiry={exp}")
+    # fallback IV from realized vol if no usable IV quotes
+    hist = cc_data.history(symbol, period="3y", interval="1d")["Close"].dropna()
+    rv_annual = float(np.log(hist).diff().dropna().std() * np.sqrt(252)) if len(hist) > 30 else 0.25
+    surface = IVSurface.from_smiles(smiles) if smiles else IVSurface.flat(rv_annual)
 
-# optional drift from history, else neutral drift
-if len(hist) > 30:
-    mu_hist = float(np.log(hist).diff().dropna().mean() * 252.0)
-else:
-    mu_hist = 0.0
+    # optional drift from history, else neutral drift
+    if len(hist) > 30:
+        mu_hist = float(np.log(hist).diff().dropna().mean() * 252.0)
+    else:
+        mu_hist = 0.0
 
-# simple vol of vol to vary IV week to week
-vol_of_vol = 0.20  # 20% relative noise around base IV
+    return spot, surface, mu_hist, exp
 
 # ---------- simulate paths ----------
 def nearest_strike(x, step):
     return round(x / step) * step
 
-def run_path():
-    S = spot
-    eq = spot  # start with 1 share notionally for return math
-    sigma = SIGMA0
-    for _ in range(WEEKS):
-        # sell 1 ATM call for next week at mid theoretical using sigma
-        K = nearest_strike(S, STRIKE_STEP)
-        prem = bs_call_price(S, K, R, sigma, DT)
+def simulate(spot, surface, mu_hist, n_paths):
+    """Annual return [%] of n_paths simulated years of weekly rolls.
+    All paths step together. Week w's spot move uses the ATM forward vol
+    for that week; its call is priced at the surface vol for its moneyness
+    and a one-week tenor, shifted by the same term-structure level. Both
+    get the week's vol-of-vol jitter. surface may also be a plain IV."""
+    if not isinstance(surface, IVSurface):
+        surface = IVSurface.flat(surface)
+    fwd = surface.forward_atm()
+    atm_1w = surface.atm(DT)
+
+    S = np.full(n_paths, float(spot))
+    eq = S.copy()  # start with 1 share notionally for return math
+    jitter = np.ones(n_paths)
+    for w in range(WEEKS):
+        # sell 1 ATM call for next week at mid theoretical using the surface
+        K = np.maximum(np.round(S / STRIKE_STEP) * STRIKE_STEP, STRIKE_STEP)
+        level = jitter * fwd[w] / atm_1w
+        sigma_k = np.maximum(surface(np.log(K / S), DT) * level, 1e-4)
+        prem = bs_call_price_vec(S, K, R, sigma_k, DT)
 
         # simulate next week spot under GBM
-        z = np.random.normal()
-        S_next = S * math.exp((mu_hist - 0.5 * sigma * sigma) * DT + sigma * math.sqrt(DT) * z)
+        sigma = np.maximum(fwd[w] * jitter, 1e-4)
+        z = np.random.normal(size=n_paths)
+        S_next = S * np.exp((mu_hist - 0.5 * sigma * sigma) * DT + sigma * math.sqrt(DT) * z)
 
         # PnL for covered call per share
-        stock_pnl = S_next - S
-        call_pnl = prem - max(S_next - K, 0)
-        pnl = stock_pnl + call_pnl
-        eq += pnl
+        eq += (S_next - S) + prem - np.maximum(S_next - K, 0.0)
 
-        # update for next week
+        # update for next week; jitter IV within a band
         S = S_next
-        # jitter IV within a band
-        sigma = max(0.0001, SIGMA0 * (1.0 + vol_of_vol * np.random.normal(scale=0.5)))
+        jitter = np.maximum(1e-4, 1.0 + vol_of_vol * np.random.normal(scale=0.5, size=n_paths))
     # annual return percent relative to initial equity
     return 100.0 * (eq / spot - 1.0)
 
-rets = np.array([run_path() for _ in range(N_PATHS)])
-
-# ---------- summarize ----------
-p5, p50, p95 = np.percentile(rets, [5, 50, 95])
-print("\n=== 1-year simulated distribution ===")
-print(f"Mean return [%]:      {rets.mean():.2f}")
-print(f"Median [%]:           {p50:.2f}")
-print(f"5th percentile [%]:   {p5:.2f}")
-print(f"95th percentile [%]:  {p95:.2f}")
-print(f"Min [%]:              {rets.min():.2f}")
-print(f"Max [%]:              {rets.max():.2f}")
-print(f"Prob. of loss [%]:    {100.0 * (rets < 0).mean():.2f}")
-
-ans = input("Save histogram? [y/N]: ").strip().lower()
-if ans in ("y", "yes"):
-    try:
-        import matplotlib.pyplot as plt
-        plt.hist(rets, bins=50)
-        plt.title(f"{SYMBOL} weekly ATM CC, 1y Monte Carlo")
-        plt.xlabel("Annual return [%]")
-        plt.ylabel("Frequency")
-        plt.tight_layout()
-        out = f"{SYMBOL}_cc_forward_hist.png"
-        plt.savefig(out, dpi=120)
-        print(f"Saved {out}")
-    except Exception as e:
-        print("Plot unavailable. Install matplotlib with: pip install matplotlib")
-        print(e)
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Forward covered-call Monte Carlo.")
+    ap.add_argument("symbol", nargs="?", help="ticker (prompted for if omitted)")
+    ap.add_argument("--paths", type=int, help="number of scenarios (prompted for if omitted)")
+    ap.add_argument("--save", action=argparse.BooleanOptionalAction,
+                    help="save the histogram PNG (asked for only when run without arguments)")
+    ap.add_argument("--profile", choices=cc_prof.MODES, help="profile the run (default: CC_PROFILE)")
+    argv = sys.argv[1:] if argv is None else argv
+    args = ap.parse_args(argv)
+    SYMBOL = (args.symbol or input("Ticker: ")).strip().upper() or "AAPL"
+    N_PATHS = args.paths or int(input("Number of scenarios [e.g., 2000]: ") or "2000")
+    np.random.seed(42)
+
+    with cc_prof.profiled(f"montecarlo-{SYMBOL}-{N_PATHS}", args.profile):
+        spot, surface, mu_hist, exp = load_market(SYMBOL)
+        print(f"Using spot={spot:.2f}, 1w ATM IV={surface.atm(DT):.3f}, 3m={surface.atm(13 * DT):.3f}, "
+              f"1y={surface.atm(1.0):.3f}, 10% OTM 1w={float(surface(math.log(1.1), DT)):.3f}, expiry={exp}")
+
+        rets = simulate(spot, surface, mu_hist, N_PATHS)
+
+    # ---------- summarize ----------
+    p5, p50, p95 = np.percentile(rets, [5, 50, 95])
+    print("\n=== 1-year simulated distribution ===")
+    print(f"Mean return [%]:      {rets.mean():.2f}")
+    print(f"Median [%]:           {p50:.2f}")
+    print(f"5th percentile [%]:   {p5:.2f}")
+    print(f"95th percentile [%]:  {p95:.2f}")
+    print(f"Min [%]:              {rets.min():.2f}")
+    print(f"Max [%]:              {rets.max():.2f}")
+    print(f"Prob. of loss [%]:    {100.0 * (rets < 0).mean():.2f}")
+
+    save = args.save
+    if save is None:
+        # scripted runs must not block on stdin
+        save = not argv and input("Save histogram? [y/N]: ").strip().lower() in ("y", "yes")
+    if save:
+        try:
+            import matplotlib.pyplot as plt
+            plt.hist(rets, bins=50)
+            plt.title(f"{SYMBOL} weekly ATM CC, 1y Monte Carlo")
+            plt.xlabel("Annual return [%]")
+            plt.ylabel("Frequency")
+            plt.tight_layout()
+            out = f"{SYMBOL}_cc_forward_hist.png"
+            plt.savefig(out, dpi=120)
+            print(f"Saved {out}")
+        except Exception as e:
+            print("Plot unavailable. Install matplotlib with: pip install matplotlib")
+            print(e)
 
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,28 @@
-from flask import Flask, request, render_template_string
-import yfinance as yf
+from flask import Flask, Response, request, stream_with_context
+import gzip
+import hashlib
+import json
+import threading
+# pandas / numpy (and yfinance, via cc_data) load with this module on purpose:
+# under preload that happens once in the gunicorn master and the workers share
+# it; /healthz is answered by cc_wsgi without importing any of it
 import pandas as pd
 import numpy as np
 import time
 import datetime as dt  # if not already imported
+import os
+from collections import namedtuple
+import zlib
+
+import cc_archive
+import cc_data
+import cc_liquidity
+import cc_metrics
+import cc_pick
+import cc_prof
+import cc_sched
+import cc_universe
+from cc_results import ResultSet, FLOAT, BOOL, STR
 
 MIN_OI = 100          # minimum open interest
 MIN_VOL = 10          # minimum option volume
@@ -251,6 +270,16 @@ HTML = """
       font-size: 0.8rem;
     }
 
+    .notice {
+      margin-top: 10px;
+      padding: 8px 10px;
+      border-radius: 10px;
+      border: 1px solid rgba(234, 179, 8, 0.5);
+      background: rgba(113, 63, 18, 0.35);
+      color: #fde68a;
+      font-size: 0.8rem;
+    }
+
     table {
       width: 100%;
       border-collapse: collapse;
@@ -376,10 +405,12 @@ HTML = """
                 <input type="radio" name="universe" value="manual" {% if universe == 'manual' %}checked{% endif %}/>
                 Manual tickers
               </label>
-              <label class="radio-chip {% if universe == 'sp500' %}active{% endif %}">
-                <input type="radio" name="universe" value="sp500" {% if universe == 'sp500' %}checked{% endif %}/>
-                S&amp;P 500 list
+              {% for u in universes %}
+              <label class="radio-chip {% if universe == u %}active{% endif %}">
+                <input type="radio" name="universe" value="{{ u }}" {% if universe == u %}checked{% endif %}/>
+                {{ universe_labels.get(u, u) }}
               </label>
+              {% endfor %}
             </div>
           </div>
 
@@ -392,6 +423,15 @@ HTML = """
             </select>
           </div>
 
+          <div class="field" style="max-width:200px;">
+            <label>Sell</label>
+            <select name="side">
+              <option value="call" {% if side == 'call' %}selected{% endif %}>Covered calls</option>
+              <option value="put" {% if side == 'put' %}selected{% endif %}>Cash-secured puts</option>
+              <option value="both" {% if side == 'both' %}selected{% endif %}>Calls and puts</option>
+            </select>
+          </div>
+
           <div class="field" style="max-width:220px;">
             <label>Earnings before expiry</label>
             <select name="include_earn">
@@ -418,6 +458,9 @@ NVDA">{{ tickers }}</textarea>
         {% if error %}
         <div class="error">{{ error }}</div>
         {% endif %}
+        {% if notice %}
+        <div class="notice">{{ notice }}</div>
+        {% endif %}
       </form>
 
       {% if results %}
@@ -425,6 +468,7 @@ NVDA">{{ tickers }}</textarea>
         <thead>
           <tr>
             <th>Symbol</th>
+            <th>Side</th>
             <th>Spot</th>
             <th>Expiry</th>
             <th>Strike</th>
@@ -438,6 +482,7 @@ NVDA">{{ tickers }}</textarea>
           {% for r in results %}
           <tr>
             <td>{{ r["Symbol"] }}</td>
+            <td class="cell-muted">{{ r["Side"] }}</td>
             <td class="cell-muted">{{ "%.2f"|format(r["Spot"]) }}</td>
             <td class="cell-muted">{{ r["Expiry"] }}</td>
             <td>{{ "%.2f"|format(r["Strike"]) }}</td>
@@ -462,179 +507,59 @@ NVDA">{{ tickers }}</textarea>
 </html>
 """
 
+# compiled once; render_template_string would re-parse HTML on every request
+TEMPLATE = app.jinja_env.from_string(HTML)
+STREAM_CHUNK = 64         # template fragments per streamed chunk
+GZIP_HTML = os.environ.get("CC_GZIP_HTML", "1") == "1"
+
+RESULT_SCHEMA = {
+    "Symbol": STR,
+    "Side": STR,
+    "Spot": FLOAT,
+    "Expiry": STR,
+    "Strike": FLOAT,
+    "Mid": FLOAT,
+    "PremiumReturn": FLOAT,
+    "NextEarnings": STR,
+    "EarningsBeforeExpiry": BOOL,
+}
+
 MIN_OI = 1       # you can tighten these once everything works as expected
 MIN_VOL = 0
 ATM_TOL = 0.05   # 5 percent window around spot
 
 
-def mid_price(bid, ask, last):
-    vals = []
-    if pd.notna(bid) and bid > 0:
-        vals.append(float(bid))
-    if pd.notna(ask) and ask > 0:
-        vals.append(float(ask))
-    if pd.notna(last) and last > 0:
-        vals.append(float(last))
-    if pd.notna(bid) and pd.notna(ask) and bid > 0 and ask >= bid:
-        return 0.5 * (float(bid) + float(ask))
-    if vals:
-        return max(vals)
-    return np.nan
+# side -> chain sides fetched; "both" reads calls and puts from one request
+SIDES = {"call": ("calls",), "put": ("puts",), "both": ("calls", "puts")}
+# strike modes name the call side; itm calls pair with otm puts (strike <= spot)
+PUT_MODES = {"atm": "atm", "itm": "otm", "both": "both"}
 
 
-def pick_atm_row(calls_df: pd.DataFrame, spot: float) -> pd.Series | None:
-    if calls_df is None or calls_df.empty:
-        return None
+def pick_call(quotes, spot: float, mode: str) -> int | None:
+    """Index into quotes (cc_pick.Quotes) of the call to sell, or None."""
+    return cc_pick.pick(quotes, spot, mode, MIN_OI, MIN_VOL, ATM_TOL)
 
-    calls = calls_df.dropna(subset=["strike"]).copy()
-    if calls.empty:
-        return None
 
-    calls["abs_dist"] = (calls["strike"] - spot).abs()
-    calls["rel_dist"] = calls["abs_dist"] / spot
-
-    window = calls[calls["rel_dist"] <= ATM_TOL]
-    if window.empty:
-        window = calls
-
-    for _, r in window.sort_values(["abs_dist", "strike"]).iterrows():
-        oi_ok = pd.notna(r.get("openInterest")) and r.get("openInterest") >= MIN_OI
-        vol_ok = pd.notna(r.get("volume")) and r.get("volume") >= MIN_VOL
-        bid = r.get("bid"); ask = r.get("ask")
-        spread_ok = pd.notna(bid) and pd.notna(ask) and bid > 0 and ask >= bid
-        if oi_ok and vol_ok and spread_ok:
-            return r
-
-    for _, r in window.sort_values(["abs_dist", "strike"]).iterrows():
-        bid = r.get("bid"); ask = r.get("ask"); last = r.get("lastPrice")
-        if (
-            (pd.notna(bid) and bid > 0)
-            or (pd.notna(ask) and ask > 0)
-            or (pd.notna(last) and last > 0)
-        ):
-            return r
+def pick_put(quotes, spot: float, mode: str) -> int | None:
+    """Index into quotes (put side) of the cash-secured put to sell, or None."""
+    return cc_pick.pick_put(quotes, spot, PUT_MODES.get(mode, "atm"), MIN_OI, MIN_VOL, ATM_TOL)
 
-    return None
+# labels for the built-in universes; watchlists show their own name
+UNIVERSE_LABELS = {"sp500": "S&P 500", "nasdaq100": "Nasdaq-100", "etf": "ETFs"}
 
 
-def pick_itm_row(calls_df: pd.DataFrame, spot: float) -> pd.Series | None:
-    if calls_df is None or calls_df.empty:
-        return None
-
-    calls = calls_df.dropna(subset=["strike"]).copy()
-    if calls.empty:
-        return None
-
-    itm = calls[calls["strike"] <= spot].copy()
-    if itm.empty:
+def universe_tickers(name: str) -> tuple | None:
+    """Symbols of a cc_universe list, or None if there is no such universe."""
+    try:
+        return cc_universe.get(name)
+    except (KeyError, ValueError, OSError):
         return None
 
-    itm["under_dist"] = (spot - itm["strike"]).abs()
-    itm = itm.sort_values(["under_dist", "strike"], ascending=[True, False])
-
-    for _, r in itm.iterrows():
-        oi_ok = pd.notna(r.get("openInterest")) and r.get("openInterest") >= MIN_OI
-        vol_ok = pd.notna(r.get("volume")) and r.get("volume") >= MIN_VOL
-        bid = r.get("bid"); ask = r.get("ask")
-        spread_ok = pd.notna(bid) and pd.notna(ask) and bid > 0 and ask >= bid
-        if oi_ok and vol_ok and spread_ok:
-            return r
-
-    for _, r in itm.iterrows():
-        bid = r.get("bid"); ask = r.get("ask"); last = r.get("lastPrice")
-        if (
-            (pd.notna(bid) and bid > 0)
-            or (pd.notna(ask) and ask > 0)
-            or (pd.notna(last) and last > 0)
-        ):
-            return r
-
-    return None
-
 
-def pick_call_row(calls_df: pd.DataFrame, spot: float, mode: str) -> pd.Series | None:
-    if mode == "atm":
-        return pick_atm_row(calls_df, spot)
-    if mode == "itm":
-        return pick_itm_row(calls_df, spot)
-    if mode == "both":
-        cand = []
-        r1 = pick_atm_row(calls_df, spot)
-        if r1 is not None:
-            cand.append(r1)
-        r2 = pick_itm_row(calls_df, spot)
-        if r2 is not None:
-            cand.append(r2)
-        if not cand:
-            return None
-        best = None
-        best_ret = -1e9
-        for r in cand:
-            bid = float(r.get("bid") or float("nan"))
-            ask = float(r.get("ask") or float("nan"))
-            last = float(r.get("lastPrice") or float("nan"))
-            mid = mid_price(bid, ask, last)
-            if not np.isfinite(mid):
-                continue
-            strike = float(r["strike"])
-            prem_ret_pct = ((strike - spot) + mid) / spot * 100.0
-            if prem_ret_pct > best_ret:
-                best_ret = prem_ret_pct
-                best = r
-        return best
-    return pick_atm_row(calls_df, spot)
-
-def fetch_sp500_tickers() -> list:
-    """Return a fixed list of S&P 500 tickers (Yahoo Finance format)."""
-    return [
-        "AAPL","MSFT","AMZN","NVDA","GOOGL","META","BRK-B","LLY","TSLA","UNH",
-        "XOM","JPM","V","AVGO","PG","MA","HD","JNJ","COST","CVX","WMT",
-        "MRK","ABBV","PEP","KO","BAC","NFLX","PFE","ORCL","DIS",
-        "CRM","ABT","ACN","CSCO","TMO","MCD","LIN","AMD","WFC","INTU",
-        "COP","RTX","ADBE","PM","NKE","NEE","TXN","UPS","BMY",
-        "UNP","SPGI","CAT","AMAT","MS","LOW","HON","GS","IBM","INTC",
-        "QCOM","GE","AXP","BLK","CVS","NOW","DE","MDT","SBUX","C",
-        "AMGN","LMT","ISRG","ADI","MU","SYK","ELV","BKNG","GILD","PLD",
-        "TJX","PGR","TGT","MMC","CB","PNC","CI","MO","BDX","ZTS",
-        "DUK","SO","BSX","ADP","GM","EQIX","VRTX","MMC","SHW","AON",
-        "USB","REGN","ITW","CSX","PXD","DHR","SLB","EOG","ETN","EMR",
-        "NSC","CL","FDX","FIS","APD","SPG","COF","KDP","ROP",
-        "MPC","MSI","EXC","AIG","F","WELL","OXY","MAR","NOC","CME",
-        "CCI","MCO","D","VLO","ADM","ALL","TFC","ORLY","HUM","AEP",
-        "CMG","PSA","HAL","AFL","TRV","WM","KR","SRE","LRCX","CTAS",
-        "GIS","DLR","CNC","PH","ECL","PCAR","FTNT","PAYX","EW","HCA",
-        "MNST","AMP","RSG","PSX","CTVA","KLAC","OKE","KMB","ROST",
-        "IDXX","WMB","HPQ","CBRE","O","NEM","EA","A","PPG","AJG",
-        "MSCI","EIX","AME","KMI","TDG","MKC","VICI","FAST","PEG","ILMN",
-        "ODFL","VRSK","WEC","STZ","AVB","FISV","EXR","KEYS","CHTR","DLTR",
-        "ANET","PAYC","FITB","DFS","HES","ED","DHI","TT","NUE","BLL",
-        "ROK","AWK","MTB","YUM","MLM","CPRT","RF","WBD","OTIS","XYL",
-        "IR","ZBH","PRU","DOW","TEL","VMC","LEN","GWW","DTE","WST",
-        "NTRS","HBAN","NDAQ","HIG","STT","ES","CTSH","GLW","LH","CMS",
-        "TSN","TRMB","EFX","CAG","ALB","CDNS","NTAP","HPE","RMD","LUV",
-        "VTR","WRB","SWK","CINF","EQR","DG","MTD","STE","AVY",
-        "PKG","DRI","HWM","ETR","OMC","WAT","WBA","AKAM","IP","FANG",
-        "ROK","PPL","SYF","DVN","TTWO","HSY","AEE","CNP",
-        "CMS","INCY","TROW","CARR","IFF","MOS","EXPD","COO",
-        "HII","ZBRA","CMS","LYB","PWR","ATO","A","XYL","EXPE","MTB",
-        "LNT","ED","IRM","TECH","APA","CHD","HRL","CMS","UAL","LKQ",
-        "NVR","WRK","JNPR","WDC","CMA","HST","XRAY","BEN","KIM","NDSN",
-        "KEY","BIO","RJF","J","MAS","POOL","GNRC","LKQ","HOLX",
-        "TXT","HII","CLX","CF","LW","SWKS","DVA","CBOE","JKHY","CPT",
-        "REG","CPB","ESS","L","GL","PKG","JCI","K","WRB","ATO",
-        "PFG","FRT","SNA","MGM","NI","HII","HBAN","JKHY","AES",
-        "ROL","CINF","PKI","EVRG","LW","WRK","FDS","TAP","BAX",
-        "JKHY","LW","PKG","ROL","AIZ","MKTX","WYNN","BBY","KEYS","HAS",
-        "SJM","IFF","MHK","AOS","ALLE","WRB","ROL","LW","BEN","BIO",
-        "J","NRG","NDSN","TAP","BIO","ROL","LW","J","NDSN","AOS",
-        "YINN","SOXL","SOXS","SQQQ","TQQQ","TSLL","TSLQ","VXX","AMDL","NVDL","BABA"
-    ]
-
-
-def get_next_earnings(tkr: yf.Ticker) -> str | None:
+def get_next_earnings(symbol: str) -> str | None:
     """Return next earnings date as YYYY-MM-DD string if available."""
     try:
-        df = tkr.get_earnings_dates(limit=1)
+        df = cc_data.earnings_dates(symbol, limit=1)
         if df is not None and not df.empty:
             next_date = pd.to_datetime(df.index[0])
             return next_date.strftime("%Y-%m-%d")
@@ -643,159 +568,465 @@ def get_next_earnings(tkr: yf.Ticker) -> str | None:
     return None
 
 
-def scan_single(symbol, expiration, mode, include_earn_bef_exp):
-    print(f"Scanning {symbol} for {expiration} ({mode})")
+def scan_single(symbol, expiration, mode, include_earn_bef_exp, side="call"):
+    """Result rows for symbol (one per side with a pick), or None."""
+    print(f"Scanning {symbol} for {expiration} ({mode}, {side})")
+    t0 = time.perf_counter()
     try:
-        t = yf.Ticker(symbol)
-
-        # 1) Confirm expiration exists, with simple retry if rate limited
-        exps = None
-        for attempt in range(3):
-            try:
-                exps = list(t.options)
-                break
-            except Exception as e:
-                msg = str(e)
-                if "Too Many Requests" in msg:
-                    print(f"{symbol}: rate limited getting options list, retry {attempt+1}/3")
-                    time.sleep(3)
-                    continue
-                print(f"{symbol}: failed to get options list: {e}")
-                return None
+        res = _scan_single(symbol, expiration, mode, include_earn_bef_exp, side)
+        outcome = "ok" if res else "skipped"
+    except cc_data.DeadlineExceeded:
+        print(f"{symbol}: cancelled at the scan deadline")
+        res, outcome = None, "cancelled"
+    except Exception as e:
+        print(f"Error on {symbol}: {e}")
+        res, outcome = None, "error"
+    cc_metrics.observe("cc_phase_seconds", time.perf_counter() - t0, phase="symbol")
+    cc_metrics.inc("cc_symbols_total", outcome=outcome)
+    return res
 
-        if not exps:
-            print(f"{symbol}: no expirations returned after retries")
-            return None
 
-        print(f"{symbol} expirations: {exps[:10]} ... total={len(exps)}")
-        if expiration not in exps:
-            print(f"{symbol}: requested expiration {expiration} not in options list")
-            return None
+def _scan_single(symbol, expiration, mode, include_earn_bef_exp, side="call"):
+    # 0) Names whose chains never pass MIN_OI / MIN_VOL are not fetched at all
+    if cc_liquidity.should_skip(symbol, MIN_OI, MIN_VOL, sides=SIDES[side]):
+        print(f"{symbol}: below liquidity threshold, skipping")
+        return None
 
-        # 2) Spot price
-        hist = t.history(period="1d")
-        if hist.empty:
-            print(f"{symbol}: empty price history")
-            return None
-        spot = float(hist["Close"].iloc[-1])
-        print(f"{symbol}: spot={spot}")
-
-        # 3) Option chain
-        chain = t.option_chain(expiration)
-        calls = chain.calls
-        print(f"{symbol}: {len(calls)} calls rows")
-
-        # 4) Pick call row
-        row = pick_call_row(calls, spot, mode)
-        if row is None:
-            print(f"{symbol}: no call row selected")
+    # 1) Confirm expiration exists, with simple retry if rate limited
+    exps = None
+    for attempt in range(3):
+        try:
+            with cc_metrics.timed("options"):
+                exps = cc_data.options(symbol)
+            break
+        except cc_data.DeadlineExceeded:
+            raise
+        except Exception as e:
+            msg = str(e)
+            if "Too Many Requests" in msg:
+                print(f"{symbol}: rate limited getting options list, retry {attempt+1}/3")
+                cc_data.sleep(3)
+                continue
+            print(f"{symbol}: failed to get options list: {e}")
             return None
 
-        bid = float(row.get("bid") or float("nan"))
-        ask = float(row.get("ask") or float("nan"))
-        last = float(row.get("lastPrice") or float("nan"))
-        mid = mid_price(bid, ask, last)
-        if not np.isfinite(mid):
-            print(f"{symbol}: mid price not finite")
-            return None
+    if not exps:
+        print(f"{symbol}: no expirations returned after retries")
+        return None
 
-        strike = float(row["strike"])
-        prem_ret_pct = ((strike - spot) + mid) / spot * 100.0
+    print(f"{symbol} expirations: {exps[:10]} ... total={len(exps)}")
+    if expiration not in exps:
+        print(f"{symbol}: requested expiration {expiration} not in options list")
+        return None
 
-        # 5) Earnings info: always define defaults
-        next_earn_str = "N/A"
-        earn_before = False
-        try:
-            cal = t.get_earnings_dates(limit=4)
-            if cal is not None and not cal.empty:
-                next_earn_date = cal.index[0].to_pydatetime().date()
-                next_earn_str = next_earn_date.isoformat()
-                exp_date = dt.datetime.strptime(expiration, "%Y-%m-%d").date()
-                earn_before = next_earn_date <= exp_date
-
-                # If user chose to exclude earnings before expiry, skip
-                if not include_earn_bef_exp and earn_before:
-                    print(f"{symbol}: earnings before expiry, skipping due to setting")
-                    return None
-        except Exception as e:
-            print(f"{symbol}: earnings lookup error: {e}")
-
-        # 6) Build result dict
-        return {
-            "Symbol": symbol,
-            "Spot": round(spot, 2),
-            "Expiry": expiration,
-            "Strike": round(strike, 2),
-            "Mid": round(mid, 2),
-            "PremiumReturn": round(prem_ret_pct, 2),
-            "NextEarnings": next_earn_str,
-            "EarningsBeforeExpiry": earn_before,
-        }
+    # 2) Spot price
+    with cc_metrics.timed("spot"):
+        hist = cc_data.history(symbol, period="1d")
+    if hist.empty:
+        print(f"{symbol}: empty price history")
+        return None
+    spot = float(hist["Close"].iloc[-1])
+    print(f"{symbol}: spot={spot}")
+
+    # 3) Option chain, reduced straight away to the picker columns near spot.
+    #    Only the chain archive needs the full calls / puts frames; otherwise
+    #    the lean path never builds a frame or keeps a side the scan skips.
+    #    Calls and puts come from the same fetch.
+    sides = SIDES[side]
+    with cc_metrics.timed("chain"):
+        if cc_archive.ROOT:
+            chain = cc_data.option_chain(symbol, expiration)
+            cc_archive.append(symbol, expiration, chain, spot)
+            quotes = {s: cc_pick.reduce_calls(getattr(chain, s), spot, cc_data.CHAIN_WINDOW) for s in sides}
+            del chain
+        else:
+            quotes = {s: cc_pick.quotes_from_rows(rows, spot, cc_data.CHAIN_WINDOW)
+                      for s, rows in cc_data.option_rows(symbol, expiration, sides).items()}
+    for s, q in quotes.items():
+        print(f"{symbol}: {0 if q is None else len(q.strike)} {s} rows near spot")
+        cc_liquidity.observe(symbol, q, spot, s)
+
+    # 4) Pick and score each side: calls on spot, puts on the cash set aside
+    picks = []
+    for s, q in quotes.items():
+        with cc_metrics.timed("pick"):
+            i = pick_call(q, spot, mode) if s == "calls" else pick_put(q, spot, mode)
+        if i is None:
+            print(f"{symbol}: no {s[:-1]} row selected")
+            continue
+        mid = float(cc_pick.mids(q)[i])
+        if not np.isfinite(mid):
+            print(f"{symbol}: {s[:-1]} mid price not finite")
+            continue
+        strike = float(q.strike[i])
+        prem_ret_pct = ((strike - spot) + mid) / spot * 100.0 if s == "calls" else float(cc_pick.put_return(q, i))
+        picks.append(("Call" if s == "calls" else "Put", strike, mid, prem_ret_pct))
+    del quotes
+    if not picks:
+        return None
 
+    # 5) Earnings info: always define defaults
+    next_earn_str = "N/A"
+    earn_before = False
+    try:
+        with cc_metrics.timed("earnings"):
+            cal = cc_data.earnings_dates(symbol, limit=4)
+        if cal is not None and not cal.empty:
+            next_earn_date = cal.index[0].to_pydatetime().date()
+            next_earn_str = next_earn_date.isoformat()
+            exp_date = dt.datetime.strptime(expiration, "%Y-%m-%d").date()
+            earn_before = next_earn_date <= exp_date
+
+            # If user chose to exclude earnings before expiry, skip
+            if not include_earn_bef_exp and earn_before:
+                print(f"{symbol}: earnings before expiry, skipping due to setting")
+                return None
+    except cc_data.DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f"Error on {symbol}: {e}")
-        return None
+        print(f"{symbol}: earnings lookup error: {e}")
+
+    # 6) Build result dicts
+    return [{
+        "Symbol": symbol,
+        "Side": kind,
+        "Spot": round(spot, 2),
+        "Expiry": expiration,
+        "Strike": round(strike, 2),
+        "Mid": round(mid, 2),
+        "PremiumReturn": round(prem_ret_pct, 2),
+        "NextEarnings": next_earn_str,
+        "EarningsBeforeExpiry": earn_before,
+    } for kind, strike, mid, prem_ret_pct in picks]
 
 
 import time
 SLEEP_BETWEEN = 0.15  # seconds between tickers
 
+# all scans in this process share one fair-share scheduler (see cc_sched)
+SCHEDULER = cc_sched.Scheduler(cc_data.SCAN_WORKERS)
+
+# web scans return what they have after SCAN_DEADLINE seconds (0 = wait for all)
+# and cancel the rest, in-flight symbols included; with CC_SCAN_FINISH_LATE=1
+# the rest keeps running instead and lands in the scan cache
+SCAN_DEADLINE = float(os.environ.get("CC_SCAN_DEADLINE", "20"))
+FINISH_LATE = os.environ.get("CC_SCAN_FINISH_LATE", "0") == "1"
+
+cc_metrics.HELP.update({
+    "cc_scan_deadline_hits_total": "Scans that returned partial results at their deadline.",
+})
+
+# scanned / total count symbols finished vs asked for; late = finished after its deadline
+Scan = namedtuple("Scan", ["results", "finished_at", "scanned", "total", "late"])
+
+
+def _scan_unit(sym, expiration, mode, include_earn_bef_exp, side):
+    res = scan_single(sym, expiration, mode, include_earn_bef_exp, side)
+
+    # gentle delay between requests
+    cc_data.sleep(SLEEP_BETWEEN)
+    return res
+
+
+def submit_scan(tickers, expiration, mode, include_earn_bef_exp, deadline=None, side="call") -> cc_sched.Job:
+    """Queue one unit per symbol on the shared scheduler.
+    Each unit runs fetch -> reduce -> score -> record for its symbol, so
+    only the small records outlive a symbol, whatever the universe size.
+    Symbols another scan is already working on are shared, not refetched."""
+    args = {sym: (sym, expiration, mode, include_earn_bef_exp, side) for sym in tickers}
+    return SCHEDULER.submit({a: (_scan_unit, a) for a in args.values()}, deadline)
+
+
+def _collect(job, rows, until=None):
+    """Append the job's result records to rows; return how many units finished."""
+    n = 0
+    for _, res in job.results(until):
+        n += 1
+        if res:
+            rows.extend(res)
+    return n
+
+
+def _scan_done(rows, scanned, total, avoided0, late=False) -> Scan:
+    cc_liquidity.save()
+    cc_archive.flush()
+    print(f"[scan] {len({r['Symbol'] for r in rows})}/{total} symbols with results ({scanned} scanned), "
+          f"{cc_liquidity.avoided() - avoided0} chain fetches avoided by the liquidity prefilter")
+    return Scan(ResultSet.from_records(rows, RESULT_SCHEMA).sort("PremiumReturn"),
+                time.time(), scanned, total, late)
+
+
+def run_scan(tickers, expiration, mode, include_earn_bef_exp, profile=None,
+             deadline=None, finish_late=None, side="call") -> Scan:
+    """Scan tickers through the shared scheduler; results sorted by premium return.
+    side = call / put / both; with both, each symbol's calls and puts come from
+    one chain fetch and the Scan holds a row per side.
+    deadline (seconds) bounds the scan: the Scan then holds the symbols finished
+    in time (scanned < total) and the rest are cancelled, unless finish_late is
+    given, in which case they run on and finish_late(complete Scan) is called.
+    profile = sample / cprofile profiles this scan (see cc_prof; CC_PROFILE does it for all)."""
+    avoided0 = cc_liquidity.avoided()
+    until = time.monotonic() + deadline if deadline else None
+    rows = []
+    with cc_prof.profiled(f"scan-{expiration}-{mode}-{side}-{len(tickers)}", profile), \
+            cc_metrics.scan_memory() as mem:
+        job = submit_scan(tickers, expiration, mode, include_earn_bef_exp, until, side)
+        scanned = _collect(job, rows, until)
+    print(f"[scan] memory: {cc_metrics.format_memory(mem)}")
+    if scanned < job.size:
+        cc_metrics.inc("cc_scan_deadline_hits_total")
+        print(f"[scan] deadline of {deadline:g}s hit after {scanned}/{job.size} symbols")
+        if finish_late is None:
+            SCHEDULER.cancel(job)
+        else:
+            job.deadline = None   # its running and queued units may fetch on
+            threading.Thread(target=_run_late, name="cc-scan-late", daemon=True,
+                             args=(job, list(rows), scanned, avoided0, finish_late)).start()
+    return _scan_done(rows, scanned, job.size, avoided0)
+
+
+def _run_late(job, rows, scanned, avoided0, finish_late):
+    scanned += _collect(job, rows)
+    finish_late(_scan_done(rows, scanned, job.size, avoided0, late=True))
+
+
+SCAN_TTL = 300  # seconds a finished scan is served to API polls before rescanning
+_scans = {}     # (expiration, tickers, mode, side) -> Scan
+_scans_lock = threading.Lock()
+
+
+def cached_scan(tickers, expiration, mode, refresh=False, profile=None, deadline=None, side="call") -> Scan:
+    """Return a Scan, reusing a complete one younger than SCAN_TTL.
+    Scans always keep earnings names; callers filter EarningsBeforeExpiry themselves.
+    refresh rescans, except that a scan which finished after its deadline is
+    served once first. Asking for a profile always runs a fresh scan."""
+    key = (expiration, tuple(tickers), mode, side)
+    with _scans_lock:
+        hit = _scans.get(key)
+        if hit and hit.late:
+            _scans[key] = hit._replace(late=False)
+    if hit and (hit.late or not refresh) and not profile and time.time() - hit.finished_at < SCAN_TTL:
+        return hit
+
+    def store(scan):
+        with _scans_lock:
+            for k in [k for k, s in _scans.items() if scan.finished_at - s.finished_at > SCAN_TTL]:
+                del _scans[k]
+            _scans[key] = scan
+
+    scan = run_scan(tickers, expiration, mode, True, profile, deadline, store if FINISH_LATE else None, side)
+    if scan.scanned == scan.total:
+        store(scan)
+    return scan
+
+
+def _profile_mode():
+    """?profile=sample|cprofile, honoured only with ?token= (or X-Profile-Token)
+    matching CC_PROFILE_TOKEN; None otherwise."""
+    mode = request.args.get("profile", "").strip().lower()
+    if mode not in cc_prof.MODES:
+        return None
+    token = request.args.get("token") or request.headers.get("X-Profile-Token", "")
+    return mode if cc_prof.authorized(token) else None
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     expiration = ""
     mode = "atm"
+    side = "call"
     tickers_text = ""
     universe = "manual"
     include_earn = "yes"
     error = None
-    results = []
+    notice = None
+    results = ResultSet.empty(RESULT_SCHEMA)
 
     if request.method == "POST":
         expiration = request.form.get("expiration", "").strip()
         universe = request.form.get("universe", "manual")
         mode = request.form.get("mode", "atm").strip().lower()
+        side = request.form.get("side", "call").strip().lower()
         include_earn = request.form.get("include_earn", "yes")
         include_earn_bef_exp = (include_earn == "yes")
         tickers_text = request.form.get("tickers", "")
 
         if not expiration:
             error = "Expiration is required."
+        elif side not in SIDES:
+            error = "Side must be calls, puts or both."
         else:
-            if universe == "sp500":
-                tickers = fetch_sp500_tickers()
+            if universe != "manual":
+                tickers = universe_tickers(universe)
             else:
-                tickers = [t.strip().upper() for t in tickers_text.splitlines() if t.strip()]
+                tickers = cc_universe.clean(tickers_text.splitlines())
 
             if not tickers:
-                error = "Please enter at least one ticker or choose S and P 500."
+                error = "Please enter at least one ticker or choose a universe."
             else:
-                for sym in tickers:
-                    res = scan_single(sym, expiration, mode, include_earn_bef_exp)
-                    if res:
-                        results.append(res)
-
-                    # gentle delay between requests
-                    time.sleep(SLEEP_BETWEEN)
-
-                if not results:
-                    if universe == "sp500":
-                        error = "No valid options found for that date in the S and P 500."
-                    else:
-                        error = "No valid options found for the given date and tickers."
-                else:
-                    results.sort(key=lambda r: r["PremiumReturn"], reverse=True)
-
-    return render_template_string(
-        HTML,
+                try:
+                    scan = cached_scan(tickers, expiration, mode, refresh=True, profile=_profile_mode(),
+                                       deadline=SCAN_DEADLINE, side=side)
+                except cc_prof.Busy as e:
+                    scan, error = None, f"Not profiled: {e}."
+                if scan is not None:
+                    results = scan.results
+                    if scan.scanned < scan.total:
+                        notice = (f"{scan.scanned} of {scan.total} symbols scanned within "
+                                  f"{SCAN_DEADLINE:g} seconds; results are ranked from those.")
+                        if FINISH_LATE:
+                            notice += " The rest are still being scanned: scan again shortly for the full list."
+                    if not include_earn_bef_exp:
+                        results = results.filter(~results["EarningsBeforeExpiry"])
+
+                    if not results:
+                        if universe != "manual":
+                            error = f"No valid options found for that date in {UNIVERSE_LABELS.get(universe, universe)}."
+                        else:
+                            error = "No valid options found for the given date and tickers."
+
+    return stream_page(
         expiration=expiration,
         mode=mode,
+        side=side,
         tickers=tickers_text,
         universe=universe,
+        universes=cc_universe.names(),
+        universe_labels=UNIVERSE_LABELS,
         include_earn=include_earn,
         error=error,
+        notice=notice,
         results=results,
     )
 
 
+def _gzip_stream(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip framing
+    for i, chunk in enumerate(chunks):
+        data = z.compress(chunk.encode())
+        if i == 0:
+            data += z.flush(zlib.Z_SYNC_FLUSH)  # get the page head out now
+        if data:
+            yield data
+    yield z.flush()
+
+
+def stream_page(**ctx) -> Response:
+    """Stream the precompiled page; the head leaves before the table is rendered."""
+    chunks = TEMPLATE.stream(**ctx)
+    chunks.enable_buffering(STREAM_CHUNK)
+    if GZIP_HTML and "gzip" in request.headers.get("Accept-Encoding", ""):
+        resp = Response(stream_with_context(_gzip_stream(chunks)), mimetype="text/html")
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.vary.add("Accept-Encoding")
+        return resp
+    return Response(stream_with_context(chunks), mimetype="text/html")
+
+
+def _api_error(msg, status=400):
+    return Response(json.dumps({"error": msg}), status=status, mimetype="application/json")
+
+
+@app.route("/api/scan")
+def api_scan():
+    """JSON scan results with server-side filter / sort / paging.
+
+    Query: expiration (required), universe=manual|<cc_universe name>, tickers=AAPL,MSFT,
+    mode=atm|itm|both (otm = itm), side=call|put|both (puts: itm means otm,
+    PremiumReturn is mid / strike), include_earn=yes|no, min_premium, sort=<column>,
+    order=desc|asc, limit (<= 1000), offset, refresh=1 to force a rescan,
+    profile=sample|cprofile&token=<CC_PROFILE_TOKEN> to profile a fresh scan.
+    A scan stops waiting after SCAN_DEADLINE seconds; "scanned" < "symbols"
+    then marks partial results (poll again for the rest when FINISH_LATE).
+    Responses carry ETag / Last-Modified (304 when unchanged) and are
+    gzip-compressed when the client accepts it.
+    """
+    args = request.args
+    expiration = args.get("expiration", "").strip()
+    if not expiration:
+        return _api_error("expiration is required")
+    mode = args.get("mode", "atm").strip().lower()
+    mode = "itm" if mode == "otm" else mode
+    if mode not in PUT_MODES:
+        return _api_error("mode must be atm, itm (otm) or both")
+    side = args.get("side", "call").strip().lower()
+    if side not in SIDES:
+        return _api_error("side must be call, put or both")
+    universe = args.get("universe", "manual")
+    if universe != "manual":
+        tickers = universe_tickers(universe)
+        if tickers is None:
+            return _api_error(f"universe must be manual or one of {', '.join(cc_universe.names())}")
+    else:
+        tickers = cc_universe.clean(args.get("tickers", "").split(","))
+    if not tickers:
+        return _api_error("tickers or a universe is required")
+
+    sort = args.get("sort", "PremiumReturn")
+    if sort not in RESULT_SCHEMA:
+        return _api_error(f"sort must be one of {', '.join(RESULT_SCHEMA)}")
+    try:
+        limit = min(max(int(args.get("limit", 50)), 0), 1000)
+        offset = max(int(args.get("offset", 0)), 0)
+        min_premium = float(args["min_premium"]) if "min_premium" in args else None
+    except ValueError:
+        return _api_error("limit, offset and min_premium must be numbers")
+
+    try:
+        scan = cached_scan(tickers, expiration, mode, refresh=args.get("refresh") == "1",
+                           profile=_profile_mode(), deadline=SCAN_DEADLINE, side=side)
+    except cc_prof.Busy as e:
+        return _api_error(str(e), 409)
+    results, finished_at = scan.results, scan.finished_at
+    if args.get("include_earn", "yes") == "no":
+        results = results.filter(~results["EarningsBeforeExpiry"])
+    if min_premium is not None:
+        results = results.filter(results["PremiumReturn"] >= min_premium)
+    results = results.sort(sort, descending=args.get("order", "desc") != "asc")
+    page = results.take(slice(offset, offset + limit))
+
+    meta = json.dumps({
+        "expiration": expiration,
+        "mode": mode,
+        "side": side,
+        "scanned_at": dt.datetime.fromtimestamp(finished_at, dt.timezone.utc).isoformat(),
+        "total": len(results),
+        "scanned": scan.scanned,
+        "symbols": scan.total,
+        "offset": offset,
+        "limit": limit,
+    })
+    body = (meta[:-1] + ', "results": ' + page.to_json() + "}").encode()
+
+    resp = Response(body, mimetype="application/json")
+    resp.set_etag(hashlib.sha1(body).hexdigest(), weak=True)
+    resp.last_modified = dt.datetime.fromtimestamp(int(finished_at), dt.timezone.utc)
+    resp.cache_control.no_cache = True  # always revalidate, cheap when unchanged
+    resp.vary.add("Accept-Encoding")
+    resp.make_conditional(request)
+    if resp.status_code == 304:
+        return resp
+
+    if "gzip" in request.headers.get("Accept-Encoding", "") and len(body) > 512:
+        resp.set_data(gzip.compress(body, compresslevel=6))
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+
+def warm():
+    """Build read-only state once; under gunicorn preload this runs in the
+    master and forked workers share it copy-on-write. Never waits on the
+    network: without a stored S&P list the seed is served and the download
+    runs in the background. Expiry and earnings data are not prebuilt: they
+    change during the day and are fetched (and shared) per scan."""
+    cc_universe.get("sp500", wait=False)
+    ResultSet.empty(RESULT_SCHEMA).to_frame()  # first NumPy/pandas use pays one-off setup
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(cc_metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5001, debug=True)
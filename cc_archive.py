@@ -0,0 +1,196 @@
+# cc_archive.py
+# Append-only archive of every option chain the scanners fetch, so research
+# and backtests can run on real quotes without new upstream calls.
+#
+# Layout (CC_CHAIN_ARCHIVE=<dir>, off when unset):
+#   <dir>/<snapshot date, UTC>/<SYMBOL>/part-<epoch>-<pid>-<n>.npz
+# Each part is a compressed set of column arrays (calls and puts of one or
+# more expiries). Writers buffer chains in memory and write one part per
+# (date, symbol) every BATCH_ROWS rows and at exit; parts are never rewritten.
+#
+# Reading: ArchiveReader merges a partition's parts once into plain .npy
+# column files (<partition>/_cols, rebuilt when new parts appear), opens
+# them memory-mapped and sorted by (side, expiry, strike, ts), and answers
+# slices with searchsorted:
+#
+#   r = ArchiveReader()
+#   q = r.quotes("2025-10-17", "AAPL", "2025-10-24")            # calls, all strikes
+#   q = r.quotes("2025-10-17", "AAPL", "2025-10-24", strike=250)
+
+import atexit
+import glob
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.environ.get("CC_CHAIN_ARCHIVE", "")
+BATCH_ROWS = 50_000   # buffered rows before a flush
+
+CALL, PUT = 0, 1
+# archive column -> (yfinance column, dtype)
+_QUOTE_COLS = {
+    "strike": ("strike", np.float64),
+    "bid": ("bid", np.float32),
+    "ask": ("ask", np.float32),
+    "last": ("lastPrice", np.float32),
+    "volume": ("volume", np.float32),
+    "oi": ("openInterest", np.float32),
+    "iv": ("impliedVolatility", np.float32),
+}
+COLUMNS = ("ts", "expiry", "side", "spot") + tuple(_QUOTE_COLS)
+
+_lock = threading.Lock()
+_buf = []             # (date, symbol, {column: array})
+_buf_rows = 0
+_seq = 0
+
+
+def _days(date_str) -> int:
+    return int(np.datetime64(date_str, "D").astype(np.int64))
+
+
+# ---- writer ----
+def append(symbol: str, expiration: str, chain, spot: float, ts: float | None = None):
+    """Buffer one fetched chain (cc_data.Chain) for the archive; no-op when off."""
+    global _buf_rows
+    if not ROOT or chain is None:
+        return
+    ts = int(time.time() if ts is None else ts)
+    parts = []
+    for side, frame in ((CALL, chain.calls), (PUT, chain.puts)):
+        if frame is None or frame.empty:
+            continue
+        n = len(frame)
+        cols = {name: frame[src].to_numpy(dtype=dt, na_value=np.nan) if src in frame else np.full(n, np.nan, dt)
+                for name, (src, dt) in _QUOTE_COLS.items()}
+        cols.update(ts=np.full(n, ts, np.int64), expiry=np.full(n, _days(expiration), np.int32),
+                    side=np.full(n, side, np.int8), spot=np.full(n, spot, np.float64))
+        parts.append(cols)
+    if not parts:
+        return
+    cols = {k: np.concatenate([p[k] for p in parts]) for k in COLUMNS}
+    date = time.strftime("%Y-%m-%d", time.gmtime(ts))
+    with _lock:
+        _buf.append((date, symbol, cols))
+        _buf_rows += len(cols["ts"])
+        full = _buf_rows >= BATCH_ROWS
+    if full:
+        flush()
+
+
+def flush():
+    """Write buffered chains, one new compressed part per (date, symbol)."""
+    global _buf, _buf_rows, _seq
+    with _lock:
+        batch, _buf, _buf_rows = _buf, [], 0
+    groups = {}
+    for date, symbol, cols in batch:
+        groups.setdefault((date, symbol), []).append(cols)
+    for (date, symbol), chunks in groups.items():
+        d = os.path.join(ROOT, date, symbol)
+        os.makedirs(d, exist_ok=True)
+        with _lock:
+            _seq += 1
+            name = f"part-{int(time.time())}-{os.getpid()}-{_seq}"
+        tmp = os.path.join(d, name + ".tmp.npz")
+        np.savez_compressed(tmp, **{k: np.concatenate([c[k] for c in chunks]) for k in COLUMNS})
+        os.replace(tmp, os.path.join(d, name + ".npz"))
+
+
+atexit.register(flush)
+
+
+# ---- reader ----
+class ArchiveReader:
+    def __init__(self, root: str | None = None):
+        self.root = root or ROOT
+        if not self.root:
+            raise ValueError("no archive directory: pass root or set CC_CHAIN_ARCHIVE")
+        self._open = {}   # (date, symbol) -> (columns, key)
+
+    def dates(self) -> list:
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def symbols(self, date: str) -> list:
+        d = os.path.join(self.root, date)
+        return sorted(os.listdir(d)) if os.path.isdir(d) else []
+
+    def _load(self, date, symbol):
+        """Memory-mapped, sorted columns for one partition (None if absent)."""
+        if (date, symbol) in self._open:
+            return self._open[(date, symbol)]
+        d = os.path.join(self.root, date, symbol)
+        parts = sorted(glob.glob(os.path.join(d, "part-*.npz")))
+        parts = [p for p in parts if not p.endswith(".tmp.npz")]
+        if not parts:
+            return None
+        cache = os.path.join(d, "_cols")
+        stamp = "\n".join(os.path.basename(p) for p in parts)
+        try:
+            with open(os.path.join(cache, "parts.txt")) as f:
+                fresh = f.read() == stamp
+        except OSError:
+            fresh = False
+        if not fresh:
+            self._compact(parts, cache, stamp)
+        cols = {k: np.load(os.path.join(cache, k + ".npy"), mmap_mode="r") for k in COLUMNS}
+        # one int64 per row ordering (side, expiry); strikes are sorted within it
+        key = (cols["side"].astype(np.int64) << 32) | cols["expiry"].astype(np.int64)
+        self._open[(date, symbol)] = (cols, key)
+        return cols, key
+
+    @staticmethod
+    def _compact(parts, cache, stamp):
+        data = {k: [] for k in COLUMNS}
+        for p in parts:
+            with np.load(p) as z:
+                for k in COLUMNS:
+                    data[k].append(z[k])
+        data = {k: np.concatenate(v) for k, v in data.items()}
+        order = np.lexsort((data["ts"], data["strike"], data["expiry"], data["side"]))
+        os.makedirs(cache, exist_ok=True)
+        for k, v in data.items():
+            tmp = os.path.join(cache, f"{k}.{os.getpid()}.tmp.npy")
+            np.save(tmp, v[order])
+            os.replace(tmp, os.path.join(cache, k + ".npy"))
+        with open(os.path.join(cache, "parts.txt"), "w") as f:
+            f.write(stamp)
+
+    def expiries(self, date: str, symbol: str) -> list:
+        loaded = self._load(date, symbol)
+        if loaded is None:
+            return []
+        return [str(np.datetime64(int(e), "D")) for e in np.unique(loaded[0]["expiry"])]
+
+    def quotes(self, date: str, symbol: str, expiry: str, side: str = "C", strike: float | None = None) -> dict | None:
+        """{column: array} for one (date, symbol, expiry, side), sorted by strike then
+        snapshot time; only rows at `strike` if given. Arrays are mmap views."""
+        loaded = self._load(date, symbol)
+        if loaded is None:
+            return None
+        cols, key = loaded
+        k = ((PUT if side.upper().startswith("P") else CALL) << 32) | _days(expiry)
+        lo, hi = np.searchsorted(key, k, "left"), np.searchsorted(key, k, "right")
+        if strike is not None:
+            s = cols["strike"][lo:hi]
+            lo, hi = lo + np.searchsorted(s, strike, "left"), lo + np.searchsorted(s, strike, "right")
+        if lo == hi:
+            return None
+        return {c: v[lo:hi] for c, v in cols.items()}
+
+
+if __name__ == "__main__":
+    # python cc_archive.py [DIR]              list dates and symbol counts
+    # python cc_archive.py DIR DATE SYMBOL    expiries and rows for one partition
+    r = ArchiveReader(sys.argv[1] if len(sys.argv) > 1 else None)
+    if len(sys.argv) > 3:
+        date, symbol = sys.argv[2], sys.argv[3].upper()
+        for exp in r.expiries(date, symbol):
+            calls, puts = r.quotes(date, symbol, exp, "C"), r.quotes(date, symbol, exp, "P")
+            print(f"{exp}  calls={0 if calls is None else len(calls['ts'])}  puts={0 if puts is None else len(puts['ts'])}")
+    else:
+        for date in r.dates():
+            print(f"{date}  {len(r.symbols(date))} symbols")
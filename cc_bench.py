@@ -0,0 +1,311 @@
+# cc_bench.py
+# Offline benchmarks for the scan loop, chain parsing, the call picker, the
+# Monte Carlo simulation and the weekly backtest. Everything runs against cc_fake,
+# so numbers are repeatable and never touch Yahoo.
+#
+#   python cc_bench.py                     # run, compare with bench_baseline.json
+#   python cc_bench.py --latency 0.05      # inject 50ms per upstream call
+#   python cc_bench.py --update-baseline   # store this run as the new baseline
+#   python cc_bench.py scan --replay rec.sqlite   # scan a recorded archive (cc_data)
+#   python cc_bench.py chain --replay rec.sqlite  # chain parsing on recorded chains
+#
+# Exit status is 1 when any throughput falls more than --threshold below baseline.
+# Shared machines swing by up to 2x between runs, so take baselines from the
+# slowest of a few --update-baseline runs, not the fastest.
+
+import argparse
+import contextlib
+import gc
+import importlib
+import json
+import os
+import time
+
+import numpy as np
+
+import cc_data
+import cc_fake
+import cc_liquidity
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+
+@contextlib.contextmanager
+def _quiet():
+    """The scanners print per symbol; keep that out of the benchmark output."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _best_of(n, fn):
+    """Fastest of n timed runs of fn(); short CPU-bound cases are noisy."""
+    best = float("inf")
+    for _ in range(max(1, n)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _symbols(n):
+    return [f"SYM{i:03d}" for i in range(n)]
+
+
+# ---- cases: each returns {metric: value}, higher is better ----
+def _replay_universe(path):
+    """Symbols and the most common expiry among the chains recorded in path."""
+    cc_data.set_mode("replay", path)
+    chains = [(sym, a["expiration"]) for kind, sym, a in cc_data.archive_keys() if kind in ("chain", "rows")]
+    if not chains:
+        raise SystemExit(f"No option chains recorded in {path}")
+    exps = [e for _, e in chains]
+    expiration = max(set(exps), key=exps.count)
+    return sorted({sym for sym, e in chains if e == expiration}), expiration
+
+
+def bench_scan(args):
+    import cc_app
+    if args.replay:
+        syms, expiration = _replay_universe(args.replay)
+    else:
+        syms, expiration = _symbols(args.symbols), cc_fake.expiries()[1]
+    t0 = time.perf_counter()
+    with _quiet():
+        res = cc_app.run_scan(syms, expiration, "both", True).results
+    dt_s = time.perf_counter() - t0
+    print(f"scan       {len(syms)} symbols, {len(res)} results in {dt_s:.2f}s")
+    return {"scan_symbols_per_s": len(syms) / dt_s}
+
+
+def _yahoo_payloads(args):
+    """(options JSON text as Yahoo sends it, spot) per chain: the recorded
+    chains of --replay, else cc_fake's."""
+    if args.replay:
+        syms, expiration = _replay_universe(args.replay)
+        chains = []
+        for s in syms:
+            try:
+                ch = cc_data.option_chain(s, expiration)
+            except Exception:
+                continue
+            try:
+                spot = float(cc_data.history(s, period="1d")["Close"].iloc[-1])
+            except Exception:
+                spot = float(ch.calls["strike"].median())
+            rows = {}
+            for name, frame in (("calls", ch.calls), ("puts", ch.puts)):
+                frame = frame.assign(lastTradeDate=frame["lastTradeDate"].astype("int64") // 10**9)
+                rows[name] = [{k: v for k, v in r.items() if v == v} for r in frame.to_dict("records")]
+            chains.append((s, spot, rows))
+        if not chains:
+            raise SystemExit(f"No full option chains in {args.replay} (record with CC_CHAIN_ARCHIVE set)")
+    else:
+        expiration = cc_fake.expiries()[1]
+        chains = [(s, cc_fake.spot_for(s), cc_fake.chain_rows(s, expiration)) for s in _symbols(args.chains)]
+    epoch = int(np.datetime64(expiration, "s").astype(np.int64))
+    return [(json.dumps({"optionChain": {"result": [{
+        "underlyingSymbol": s, "expirationDates": [epoch], "quote": {"symbol": s, "regularMarketPrice": spot},
+        "options": [dict(expirationDate=epoch, **rows)]}]}}), spot) for s, spot, rows in chains]
+
+
+def bench_chain(args):
+    """Per-chain parse cost and memory, from the options JSON to picker-ready
+    Quotes: full (both sides as yfinance frames, then reduce_calls) vs lean
+    (cc_data.option_calls + quotes_from_rows around spot)."""
+    import tracemalloc
+
+    import yfinance as yf
+
+    import cc_pick
+    payloads = _yahoo_payloads(args)
+
+    def full(text, spot):
+        opt = json.loads(text)["optionChain"]["result"][0]["options"][0]
+        calls, puts = yf.Ticker._options2df(None, opt["calls"]), yf.Ticker._options2df(None, opt["puts"])
+        return cc_pick.reduce_calls(calls), calls, puts
+
+    def lean(text, spot):
+        opt = json.loads(text)["optionChain"]["result"][0]["options"][0]
+        rows = [{k: r[k] for k in cc_data.OPTION_FIELDS if k in r} for r in opt["calls"]]
+        return cc_pick.quotes_from_rows(rows, spot, cc_data.CHAIN_WINDOW), rows
+
+    def held(path, out):   # bytes a scan holds on to until the symbol is done
+        if path == "full":
+            return sum(int(f.memory_usage(deep=True).sum()) for f in out[1:])
+        return sum(a.nbytes for a in out[0])
+
+    out = {}
+    kb = sum(len(t) for t, _ in payloads) / len(payloads) / 1024
+    for name, fn in (("full", full), ("lean", lean)):
+        [fn(t, s) for t, s in payloads[:5]]   # warm-up
+        dt_s = _best_of(args.repeat, lambda: [fn(t, s) for t, s in payloads])
+        peak = kept = 0
+        for t, s in payloads[:50]:
+            tracemalloc.start()
+            r = fn(t, s)
+            peak += tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            kept += held(name, r)
+        n = min(50, len(payloads))
+        print(f"chain      {name:<4} {dt_s / len(payloads) * 1000:.2f} ms/chain, peak {peak / n / 1024:.0f} KB, "
+              f"held {kept / n / 1024:.1f} KB ({len(payloads)} chains, {kb:.0f} KB JSON each)")
+        out[f"chain_{name}_per_s"] = len(payloads) / dt_s
+    return out
+
+
+def bench_picker(args):
+    import cc_app
+    import cc_pick
+    expiration = cc_fake.expiries()[1]
+    chains = [(cc_fake.chain_frames(s, expiration)[0], cc_fake.spot_for(s)) for s in _symbols(args.chains)]
+    out = {}
+
+    def run(mode):  # reduce + pick, the per-chain work of a scan
+        return [cc_app.pick_call(cc_pick.reduce_calls(calls), spot, mode) for calls, spot in chains]
+
+    run("both")  # warm-up
+    for mode in ("atm", "itm", "both"):
+        dt_s = _best_of(args.repeat, lambda: run(mode))
+        print(f"picker     {mode:<4} {dt_s / len(chains) * 1000:.2f} ms/chain")
+        out[f"picker_{mode}_chains_per_s"] = len(chains) / dt_s
+    return out
+
+
+def bench_montecarlo(args):
+    mc = importlib.import_module("1forward_cc_montecarlo")
+    spot, sigma0, mu, _ = mc.load_market("SYM000")
+    np.random.seed(42)
+    dt_s = _best_of(args.repeat, lambda: mc.simulate(spot, sigma0, mu, args.paths))
+    print(f"montecarlo {args.paths} paths in {dt_s:.2f}s")
+    return {"montecarlo_paths_per_s": args.paths / dt_s}
+
+
+def bench_backtest(args):
+    weekly = importlib.import_module("1cc_weekly")
+    px = weekly.load_prices("SYM000", period="20y")
+    weeks = len(weekly.run_backtest(px)[0])
+    dt_s = _best_of(args.repeat, lambda: weekly.run_backtest(px))
+    print(f"backtest   {weeks} weeks in {dt_s:.2f}s")
+    return {"backtest_weeks_per_s": weeks / dt_s}
+
+
+def bench_render(args):
+    """Per-request HTML cost for a 500-row result page: render_template_string
+    (re-compiles HTML every call) vs the precompiled, streamed page."""
+    import cc_app
+    from flask import render_template_string
+    rows = [{
+        "Symbol": f"SYM{i:03d}", "Side": "Call", "Spot": 100.0 + i, "Expiry": "2025-11-14", "Strike": 100.0 + i,
+        "Mid": 1.23, "PremiumReturn": 1.5, "NextEarnings": "2025-11-01", "EarningsBeforeExpiry": i % 7 == 0,
+    } for i in range(args.rows)]
+    results = cc_app.ResultSet.from_records(rows, cc_app.RESULT_SCHEMA)
+    ctx = dict(expiration="2025-11-14", mode="atm", side="call", tickers="", universe="sp500",
+               universes=list(cc_app.UNIVERSE_LABELS), universe_labels=cc_app.UNIVERSE_LABELS,
+               include_earn="yes", error=None, results=results)
+    # many short runs: the best of them is stable even when the machine is
+    # busy for part of the case (a few long runs often all caught a slow patch)
+    n, runs = 5, 4 * args.repeat
+    out = {}
+    with cc_app.app.test_request_context("/"):
+        def before():
+            for _ in range(n):
+                render_template_string(cc_app.HTML, **ctx)
+
+        def after():
+            for _ in range(n):
+                b"".join(cc_app.stream_page(**ctx).iter_encoded())
+
+        for name, fn in (("render_string", before), ("render_stream", after)):
+            fn()  # warm-up
+            dt_s = _best_of(runs, fn)
+            print(f"render     {name:<14} {dt_s / n * 1000:.2f} ms/request ({args.rows} rows)")
+            out[f"{name}_per_s"] = n / dt_s
+
+        t0 = time.perf_counter()
+        next(cc_app.stream_page(**ctx).iter_encoded())
+        print(f"render     first chunk after {(time.perf_counter() - t0) * 1000:.2f} ms")
+    return out
+
+
+CASES = {
+    "scan": bench_scan,
+    "chain": bench_chain,
+    "picker": bench_picker,
+    "montecarlo": bench_montecarlo,
+    "backtest": bench_backtest,
+    "render": bench_render,
+}
+
+
+# ---- baseline handling ----
+def _load_baseline():
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(results, baseline, threshold) -> list:
+    """Return the metrics that fell more than threshold below baseline."""
+    failed = []
+    print(f"\n{'Metric':<32}{'Now':>12}{'Baseline':>12}{'Change':>10}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<32}{value:>12.2f}{'-':>12}{'-':>10}")
+            continue
+        change = value / base - 1.0
+        mark = ""
+        if change < -threshold:
+            failed.append(name)
+            mark = "  REGRESSED"
+        print(f"{name:<32}{value:>12.2f}{base:>12.2f}{change * 100:>9.1f}%{mark}")
+    return failed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline scanner / backtest / Monte Carlo benchmarks.")
+    ap.add_argument("cases", nargs="*", help=f"cases to run: {', '.join(CASES)} (default: all)")
+    ap.add_argument("--latency", type=float, default=0.0, help="injected upstream latency per call, seconds")
+    ap.add_argument("--symbols", type=int, default=40, help="symbols in the scan loop")
+    ap.add_argument("--chains", type=int, default=200, help="chains fed to the picker")
+    ap.add_argument("--rows", type=int, default=500, help="result rows in the render case")
+    ap.add_argument("--paths", type=int, default=500, help="Monte Carlo paths")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per CPU-bound case; the fastest counts")
+    ap.add_argument("--replay", metavar="ARCHIVE", help="scan a cc_data recorded archive instead of synthetic data")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed throughput drop vs baseline (0.25 = 25%%)")
+    ap.add_argument("--update-baseline", action="store_true", help="write this run as the baseline")
+    args = ap.parse_args(argv)
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(unknown)}")
+
+    cc_fake.LATENCY_S = args.latency
+    cc_fake.ILLIQUID_P = 0.0    # same synthetic workload the baseline was taken on
+    cc_liquidity.STORE = ""     # don't write liquidity profiles from benchmark runs
+    cc_data.use_source(cc_fake)
+    results = {}
+    for name in args.cases or CASES:
+        gc.collect()    # don't bill one case for the garbage of the previous one
+        results.update(CASES[name](args))
+
+    # baselines are only comparable at the same injected latency
+    key = f"replay={os.path.basename(args.replay)}" if args.replay else f"latency={args.latency:g}"
+    stored = _load_baseline()
+    if args.update_baseline:
+        stored.setdefault(key, {}).update({k: round(v, 3) for k, v in results.items()})
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {BASELINE_FILE} [{key}]")
+        return 0
+
+    failed = compare(results, stored.get(key, {}), args.threshold)
+    if failed:
+        print(f"\nThroughput regressed more than {args.threshold:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,576 @@
+# cc_data.py
+# Single place every script goes through for upstream market data:
+# options lists, option chains, price history, earnings dates, last price.
+#
+# Modes (CC_DATA_MODE):
+#   live    - call the source directly (default)
+#   record  - call the source and write every response to the archive
+#   replay  - serve everything from the archive, never touch the network
+# Source (CC_DATA_SOURCE): "yahoo" (yfinance, default) or "fake" (cc_fake).
+# Archive (CC_DATA_ARCHIVE): one sqlite file of zlib-compressed pickles.
+#
+# All Yahoo traffic shares one curl_cffi SESSION. curl_cffi keeps one curl
+# handle per thread, so each of the SCAN_WORKERS scan threads reuses its own
+# keep-alive connections instead of paying a TLS handshake per symbol.
+# How many of those threads may have a request in flight at once is decided
+# by an AIMD limiter (cc_limit) that backs off on 429s and latency spikes.
+#
+# Identical requests are coalesced (single flight): while one thread is
+# fetching a (kind, symbol, args) key, other threads asking for the same key
+# wait for it and share its result instead of calling upstream again. With
+# CC_SINGLEFLIGHT_DIR set (gunicorn.conf.py does), workers also coordinate
+# through per-key lock files there: the first takes an flock and fetches,
+# the others block on it and reuse its result file if it is younger than
+# SHARE_TTL seconds. Shared results are the same objects; treat them as
+# read-only. Each process sweeps the directory every SHARE_SWEEP_S seconds:
+# results past SHARE_TTL go, and so do stray .tmp files and lock files idle
+# for LOCK_IDLE_S (a lock is touched whenever it is taken, and one that is
+# held is never removed). Results are pickles, so the directory must be
+# private: it is created 0700 and sharing is turned off, with a warning, if
+# it is a symlink, not owned by this user or open to others.
+#
+# A thread working for a scan with a deadline runs inside deadline(...):
+# once it has passed, further fetches raise DeadlineExceeded instead of
+# going upstream, so a cancelled symbol stops at its next step. The
+# deadline is checked before a fetch and bounds every wait on the way: for
+# a limiter slot, for another thread's identical fetch, for another
+# worker's lock file; sleep() is the deadline-bounded time.sleep for
+# callers' own back-offs.
+#
+# option_rows() is the lean chain path the scanners use when no chain
+# archive is kept: only the sides of Yahoo's options JSON a scan needs
+# (calls, puts or both from the same request), only the picker fields, no
+# DataFrame (cc_pick.quotes_from_rows trims them to CHAIN_WINDOW around
+# spot). option_chain() still returns both full frames.
+
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import stat
+import threading
+import time
+import zlib
+from collections import namedtuple
+from contextlib import contextmanager
+
+import pandas as pd
+import yfinance as yf
+from curl_cffi import CurlOpt
+from curl_cffi import requests as curl_requests
+
+import cc_metrics
+from cc_limit import AIMDLimiter, Expired
+
+MODE = os.environ.get("CC_DATA_MODE", "live").strip().lower()
+ARCHIVE = os.environ.get("CC_DATA_ARCHIVE", "cc_data_archive.sqlite")
+
+SCAN_WORKERS = int(os.environ.get("CC_SCAN_WORKERS", "16"))  # scan threads = max in-flight requests
+HTTP_TIMEOUT = float(os.environ.get("CC_HTTP_TIMEOUT", "20"))  # seconds, whole request
+CONNECT_TIMEOUT = 5                                          # seconds, TCP + TLS setup
+MAX_CONNECTS = 4   # live connections kept per worker handle (query1/query2/fc/guce hosts)
+SHARE_DIR = os.environ.get("CC_SINGLEFLIGHT_DIR", "")  # "" = coalesce within this process only
+SHARE_TTL = float(os.environ.get("CC_SINGLEFLIGHT_TTL", "5"))  # seconds a shared result is reused
+SHARE_SWEEP_S = 60    # seconds between sweeps of SHARE_DIR by one process
+LOCK_IDLE_S = 3600    # lock files older than this are removed by the sweep
+TICKER_TTL = float(os.environ.get("CC_TICKER_TTL", "60"))  # seconds a yfinance Ticker (and its caches) is reused
+CHAIN_WINDOW = float(os.environ.get("CC_CHAIN_WINDOW", "0.25"))  # strikes kept, fraction of spot either side
+
+try:
+    import fcntl
+except ImportError:    # no flock on Windows: coalesce within the process only
+    fcntl = None
+
+Chain = namedtuple("Chain", ["calls", "puts"])
+
+# fields of a Yahoo option row option_rows() keeps (cc_pick's Quotes columns)
+OPTION_FIELDS = ("strike", "bid", "ask", "lastPrice", "openInterest", "volume", "impliedVolatility")
+
+cc_metrics.HELP.update({
+    "cc_upstream_calls_total": "Calls made to the market-data source.",
+    "cc_cache_hits_total": "Upstream calls served from a local cache or archive.",
+    "cc_coalesced_total": "Upstream calls avoided by sharing an identical in-flight fetch.",
+    "cc_deadline_cancels_total": "Fetches not started because their scan's deadline had passed.",
+})
+
+
+class DeadlineExceeded(Exception):
+    """The scan this fetch was for ran out of time."""
+
+
+# ---- shared HTTP session ----
+def make_session():
+    return curl_requests.Session(
+        impersonate="chrome",
+        timeout=HTTP_TIMEOUT,
+        curl_options={
+            CurlOpt.MAXCONNECTS: MAX_CONNECTS,
+            CurlOpt.CONNECTTIMEOUT: CONNECT_TIMEOUT,
+            CurlOpt.TCP_KEEPALIVE: 1,
+        },
+    )
+
+
+SESSION = make_session()
+
+
+def _make_limiter():
+    return AIMDLimiter(initial=min(4, SCAN_WORKERS), max_limit=SCAN_WORKERS)
+
+
+def _after_fork():
+    # Nothing made in the (preloaded) parent may be shared with a worker:
+    # curl handles and sockets, the sqlite connection, locks that another
+    # parent thread may have held at fork time, and the limiter's in-flight
+    # count and condition. Each worker starts its own.
+    global SESSION, LIMITER, _db, _db_lock, _tickers_lock, _flights_lock, _flights
+    SESSION = make_session()
+    LIMITER = _make_limiter()
+    _db = None
+    _db_lock = threading.Lock()
+    _tickers_lock = threading.Lock()
+    _tickers.clear()
+    _flights_lock = threading.Lock()
+    _flights = {}
+
+
+os.register_at_fork(after_in_child=_after_fork)
+LIMITER = _make_limiter()
+
+
+# ---- source selection ----
+_source = yf
+
+
+def use_source(source):
+    """Point all calls at a yfinance-like module (yf or cc_fake)."""
+    global _source
+    _source = source
+    _tickers.clear()
+
+
+def offline() -> bool:
+    """True when nothing reaches Yahoo or the web (replay mode or the fake source)."""
+    return MODE == "replay" or _source is not yf
+
+
+def set_mode(mode: str, archive: str | None = None):
+    global MODE, ARCHIVE, _db
+    if mode not in ("live", "record", "replay"):
+        raise ValueError(f"unknown data mode {mode!r}")
+    with _db_lock:
+        if _db is not None:
+            _db.commit()
+            _db.close()
+            _db = None
+    MODE = mode
+    ARCHIVE = archive or ARCHIVE
+
+
+if os.environ.get("CC_DATA_SOURCE", "yahoo").strip().lower() == "fake":
+    import cc_fake
+    _source = cc_fake
+
+
+_tickers = {}    # symbol -> (Ticker, time.monotonic() it was made)
+_tickers_lock = threading.Lock()
+
+
+def ticker(symbol: str):
+    """A Ticker per symbol, reused for TICKER_TTL seconds so one scan's options
+    and chain calls share yfinance's expiry map. yfinance caches expiries,
+    earnings and fast_info on the object, so it is never kept longer."""
+    now = time.monotonic()
+    with _tickers_lock:
+        hit = _tickers.get(symbol)
+        if hit is not None and now - hit[1] < TICKER_TTL:
+            return hit[0]
+        if len(_tickers) >= 1024:
+            for s in [s for s, (_, made) in _tickers.items() if now - made >= TICKER_TTL]:
+                del _tickers[s]
+        t = _source.Ticker(symbol, session=SESSION)
+        _tickers[symbol] = (t, now)
+        return t
+
+
+# ---- archive ----
+_db = None
+_db_lock = threading.Lock()
+
+
+def _conn():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(ARCHIVE, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=OFF")
+        _db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, blob BLOB)")
+    return _db
+
+
+def _archive_put(key, value):
+    blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 6)
+    with _db_lock:
+        _conn().execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, blob))
+
+
+def _archive_get(key):
+    with _db_lock:
+        row = _conn().execute("SELECT blob FROM responses WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        raise LookupError(f"not in archive {ARCHIVE}: {key}")
+    return pickle.loads(zlib.decompress(row[0]))
+
+
+def archive_keys() -> list:
+    """(kind, symbol, args) for every recorded response."""
+    with _db_lock:
+        keys = [k for (k,) in _conn().execute("SELECT key FROM responses")]
+    out = []
+    for k in keys:
+        kind, symbol, args = k.split("|", 2)
+        out.append((kind, symbol, json.loads(args)))
+    return out
+
+
+@atexit.register
+def _close():
+    with _db_lock:
+        if _db is not None:
+            _db.commit()
+
+
+# ---- single flight ----
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_flights = {}    # key -> _Flight currently being fetched in this process
+_flights_lock = threading.Lock()
+
+
+def _single_flight(key, kind, fn):
+    """Run fn() once per key at a time; concurrent callers share the outcome."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        cc_metrics.inc("cc_coalesced_total", kind=kind, scope="thread")
+        while not flight.done.wait(remaining()):
+            _check_deadline(kind, key.split("|", 2)[1])
+        if isinstance(flight.error, DeadlineExceeded):
+            # the leader's scan ran out of time, not necessarily ours
+            _check_deadline(kind, key.split("|", 2)[1])
+            return _single_flight(key, kind, fn)
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    try:
+        flight.value = _shared(key, kind, fn)
+        return flight.value
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+_swept = 0.0     # time.time() of this process's last sweep of SHARE_DIR
+
+
+def _sweep():
+    """Unlink shared results older than SHARE_TTL (never read again), and
+    lock and .tmp files older than LOCK_IDLE_S; a lock still held is kept."""
+    global _swept
+    now = time.time()
+    if now - _swept < SHARE_SWEEP_S:
+        return
+    _swept = now
+    try:
+        entries = list(os.scandir(SHARE_DIR))
+    except OSError:
+        return
+    for e in entries:
+        try:
+            age = now - e.stat().st_mtime
+            if age <= (SHARE_TTL if e.name.endswith(".pkl") else LOCK_IDLE_S):
+                continue
+            if not e.name.endswith(".lock"):
+                os.unlink(e.path)
+                continue
+            fd = os.open(e.path, os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)   # BlockingIOError if held
+                os.unlink(e.path)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+_share_ok = None   # SHARE_DIR checked and private to this user
+
+
+def _private_dir():
+    """Create SHARE_DIR 0700 and check no one else can plant pickles in it."""
+    global _share_ok
+    if _share_ok is None:
+        try:
+            os.makedirs(SHARE_DIR, mode=0o700, exist_ok=True)
+            st = os.lstat(SHARE_DIR)
+            _share_ok = stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+        except OSError:
+            _share_ok = False
+        if not _share_ok:
+            print(f"[data] {SHARE_DIR} is not a private directory of this user: "
+                  f"coalescing within this process only")
+    return _share_ok
+
+
+def _flock(f, kind, symbol):
+    # block on another worker's fetch only as long as this thread's deadline allows
+    if remaining() is None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return
+    pause = 0.01
+    while True:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            pass
+        _check_deadline(kind, symbol)
+        left = remaining()
+        time.sleep(pause if left is None else min(pause, left))
+        pause = min(pause * 2, 0.2)
+
+
+def _shared(key, kind, fn):
+    """Coalesce across worker processes through an flock'd file per key."""
+    if not SHARE_DIR or fcntl is None or not _private_dir():
+        return fn()
+    _sweep()
+    base = os.path.join(SHARE_DIR, hashlib.sha1(key.encode()).hexdigest())
+    while True:
+        lock = open(base + ".lock", "a+b")
+        try:
+            _flock(lock, kind, key.split("|", 2)[1])
+        except BaseException:
+            lock.close()
+            raise
+        try:
+            if os.fstat(lock.fileno()).st_ino == os.stat(base + ".lock").st_ino:
+                break
+        except OSError:
+            pass
+        lock.close()    # swept while we waited: lock the new file instead
+    with lock:
+        os.utime(base + ".lock")
+        try:
+            try:
+                if time.time() - os.path.getmtime(base + ".pkl") < SHARE_TTL:
+                    with open(base + ".pkl", "rb") as f:
+                        value = pickle.load(f)
+                    cc_metrics.inc("cc_coalesced_total", kind=kind, scope="process")
+                    return value
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            value = fn()
+            try:
+                tmp = f"{base}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, base + ".pkl")
+            except OSError as e:
+                print(f"[data] could not share {key}: {e}")
+            return value
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# ---- deadlines ----
+_local = threading.local()
+
+
+@contextmanager
+def deadline(get):
+    """Bound fetches on this thread by get(), a time.monotonic() deadline or None.
+    get is a callable, read before every fetch, so the deadline can still move."""
+    prev = getattr(_local, "deadline", None)
+    _local.deadline = get
+    try:
+        yield
+    finally:
+        _local.deadline = prev
+
+
+def current_deadline():
+    """This thread's deadline getter (see deadline()), or None; hand it to
+    deadline() on another thread doing work for this one."""
+    return getattr(_local, "deadline", None)
+
+
+def remaining():
+    """Seconds left before this thread's deadline (0 once passed), or None."""
+    get = getattr(_local, "deadline", None)
+    at = get() if get is not None else None
+    return None if at is None else max(0.0, at - time.monotonic())
+
+
+def sleep(seconds):
+    """time.sleep(seconds), cut short at this thread's deadline (the next
+    fetch then raises DeadlineExceeded)."""
+    left = remaining()
+    time.sleep(seconds if left is None else min(seconds, left))
+
+
+def _check_deadline(kind, symbol):
+    get = getattr(_local, "deadline", None)
+    at = get() if get is not None else None
+    if at is not None and time.monotonic() >= at:
+        cc_metrics.inc("cc_deadline_cancels_total", kind=kind)
+        raise DeadlineExceeded(f"deadline passed before {kind} fetch of {symbol}")
+
+
+def _fetch(kind, symbol, args, fn):
+    """Run fn() according to MODE. Upstream errors are recorded and replayed too."""
+    _check_deadline(kind, symbol)
+    key = f"{kind}|{symbol}|{json.dumps(args, sort_keys=True)}"
+    if MODE == "replay":
+        cc_metrics.inc("cc_cache_hits_total", kind=kind)
+        status, value = _archive_get(key)
+        if status == "err":
+            raise Exception(value)
+        return value
+    return _single_flight(key, kind, lambda: _upstream(key, kind, symbol, args, fn))
+
+
+def _latency_class(kind, symbol, args):
+    # what the limiter compares a fetch's latency with: kind plus whatever
+    # sizes the reply (bar period/interval, bulk quote batch size)
+    if "interval" in args:
+        return f"{kind}/{args['period']}/{args['interval']}"
+    if kind == "last_prices":
+        return f"{kind}/<{10 ** len(str(symbol.count(',') + 1))}"
+    return kind
+
+
+def _upstream(key, kind, symbol, args, fn):
+    try:
+        with LIMITER.slot(_latency_class(kind, symbol, args), getattr(_local, "deadline", None)):
+            cc_metrics.inc("cc_upstream_calls_total", kind=kind)
+            if MODE != "record":
+                return fn()
+            try:
+                value = fn()
+            except Exception as e:
+                _archive_put(key, ("err", str(e)))
+                raise
+    except Expired:
+        cc_metrics.inc("cc_deadline_cancels_total", kind=kind)
+        raise DeadlineExceeded(f"deadline passed waiting to fetch {kind} of {symbol}") from None
+    _archive_put(key, ("ok", value))
+    return value
+
+
+# ---- public calls ----
+def options(symbol: str) -> list:
+    """Available expiries, YYYY-MM-DD."""
+    return _fetch("options", symbol, {}, lambda: list(ticker(symbol).options or []))
+
+
+def option_chain(symbol: str, expiration: str) -> Chain:
+    def fn():
+        ch = ticker(symbol).option_chain(expiration)
+        return Chain(ch.calls, ch.puts)
+    return _fetch("chain", symbol, {"expiration": expiration}, fn)
+
+
+def option_rows(symbol: str, expiration: str, sides=("calls",)) -> dict:
+    """{side: rows} for sides of one chain ("calls" and / or "puts"), each row
+    a plain dict with only OPTION_FIELDS (missing fields stay missing). Both
+    sides come from one upstream request; the rest of the payload is dropped
+    as soon as the JSON is parsed. Feed the rows to cc_pick.quotes_from_rows."""
+    sides = tuple(sides)
+
+    def fn():
+        t = ticker(symbol)
+        if expiration not in t._expirations:
+            t._download_options()           # fills the expiry -> epoch map
+        if expiration not in t._expirations:
+            raise ValueError(f"Expiration `{expiration}` cannot be found.")
+        opt = t._download_options(t._expirations[expiration])
+        return {side: [{k: r[k] for k in OPTION_FIELDS if k in r} for r in opt.get(side) or []]
+                for side in sides}
+    try:
+        return _fetch("rows", symbol, {"expiration": expiration, "sides": list(sides)}, fn)
+    except LookupError:
+        if MODE != "replay":
+            raise
+    # archive recorded before option_rows existed: use its full chain
+    chain = option_chain(symbol, expiration)
+    return {side: [] if getattr(chain, side) is None else
+            getattr(chain, side).reindex(columns=list(OPTION_FIELDS)).to_dict("records") for side in sides}
+
+
+def option_calls(symbol: str, expiration: str) -> list:
+    """Call rows of one chain, see option_rows."""
+    return option_rows(symbol, expiration)["calls"]
+
+
+def history(symbol: str, period: str = "1d", interval: str = "1d") -> pd.DataFrame:
+    return _fetch("history", symbol, {"period": period, "interval": interval},
+                  lambda: ticker(symbol).history(period=period, interval=interval))
+
+
+def earnings_dates(symbol: str, limit: int = 4) -> pd.DataFrame | None:
+    return _fetch("earnings", symbol, {"limit": limit},
+                  lambda: ticker(symbol).get_earnings_dates(limit=limit))
+
+
+def last_price(symbol: str) -> float | None:
+    """fast_info last trade price, or None."""
+    # a fresh Ticker: fast_info keeps the first price it saw
+    return _fetch("last_price", symbol, {}, lambda: _source.Ticker(symbol, session=SESSION).fast_info.last_price)
+
+
+def last_prices(symbols) -> dict:
+    """{symbol: latest minute close} for many symbols in one yf.download call.
+    Symbols with no bar today (e.g. before the open) are left out."""
+    symbols = sorted(set(symbols))
+
+    def fn():
+        df = _source.download(symbols, period="1d", interval="1m", auto_adjust=False, group_by="column",
+                              progress=False, threads=True, session=SESSION, timeout=HTTP_TIMEOUT)
+        if df is None or df.empty:
+            return {}
+        close = df["Close"]
+        if isinstance(close, pd.Series):
+            close = close.to_frame(symbols[0])
+        last = close.ffill().iloc[-1]
+        return {str(s): float(v) for s, v in last.items() if pd.notna(v)}
+    return _fetch("last_prices", ",".join(symbols), {}, fn)
+
+
+def download(symbol: str, period: str, interval: str = "1d") -> pd.DataFrame:
+    """Daily (or other interval) OHLCV bars for one symbol, yf.download style."""
+    return _fetch("download", symbol, {"period": period, "interval": interval},
+                  lambda: _source.download(symbol, period=period, interval=interval,
+                                           auto_adjust=False, group_by="column", progress=False,
+                                           session=SESSION, timeout=HTTP_TIMEOUT))
+
+
+if MODE not in ("live", "record", "replay"):
+    raise SystemExit(f"CC_DATA_MODE must be live, record or replay, not {MODE!r}")
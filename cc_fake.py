@@ -0,0 +1,274 @@
+# cc_fake.py
+# Offline stand-in for the parts of yfinance the scanners use:
+# Ticker(...).options / .history / .option_chain / .get_earnings_dates / .fast_info
+# (plus the raw _download_options / _expirations pair cc_data.option_rows
+# reads) and yf.download(...). Data is synthetic but deterministic per symbol,
+# and every call can be slowed down or rate limited on purpose.
+#
+#   import cc_fake
+#   cc_fake.LATENCY_S = 0.05
+#   cc_app.yf = cc_fake        # scanner now runs fully offline
+#
+# The latency / 429 knobs also come from the environment (CC_FAKE_LATENCY_S,
+# CC_FAKE_JITTER, CC_FAKE_429_P), so a whole app started with
+# CC_DATA_SOURCE=fake can be slowed down from outside. share_counts() moves
+# the call counters into shared memory; processes forked afterwards (gunicorn
+# workers) add to the same counters, read back with counts().
+
+import multiprocessing
+import os
+import random
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# -------- knobs --------
+LATENCY_S = float(os.environ.get("CC_FAKE_LATENCY_S", "0"))       # mean injected latency per upstream call, s
+LATENCY_JITTER = float(os.environ.get("CC_FAKE_JITTER", "0.5"))   # +/- fraction of LATENCY_S
+RATE_LIMIT_P = float(os.environ.get("CC_FAKE_429_P", "0"))        # probability a call raises "Too Many Requests"
+N_EXPIRIES = 12       # weekly expiries served per symbol
+N_STRIKES = 80        # strikes per expiry
+ILLIQUID_P = 0.25     # share of symbols whose options barely trade
+TICK_S = float(os.environ.get("CC_FAKE_TICK_S", "0"))  # >0: intraday spot moves every few TICK_S seconds
+
+CALLS = 0             # upstream calls served, for reporting
+_calls_lock = threading.Lock()
+KINDS = ("options", "option_chain", "history", "earnings", "fast_info", "download")
+_shared = None        # multiprocessing.Array: calls per kind, then 429s per kind
+
+Options = namedtuple("Options", ["calls", "puts", "underlying"])
+
+_COLUMNS = [
+    "contractSymbol", "lastTradeDate", "strike", "lastPrice", "bid", "ask",
+    "change", "percentChange", "volume", "openInterest", "impliedVolatility",
+    "inTheMoney", "contractSize", "currency",
+]
+
+
+def _seed(*parts) -> int:
+    return zlib.crc32("|".join(str(p) for p in parts).encode())
+
+
+def _upstream(kind: str):
+    """Simulate one network round trip: count it, sleep, maybe rate limit."""
+    global CALLS
+    with _calls_lock:
+        CALLS += 1
+    limited = RATE_LIMIT_P > 0 and random.random() < RATE_LIMIT_P
+    if _shared is not None:
+        i = KINDS.index(kind)
+        with _shared.get_lock():
+            _shared[i] += 1
+            _shared[len(KINDS) + i] += limited
+    if LATENCY_S > 0:
+        time.sleep(max(0.0, LATENCY_S * (1.0 + LATENCY_JITTER * (2 * random.random() - 1))))
+    if limited:
+        raise Exception(f"Too Many Requests. Rate limited. Try after a while. ({kind})")
+
+
+def share_counts():
+    """Count calls in shared memory from now on, across this process and its forks."""
+    global _shared
+    if _shared is None:
+        _shared = multiprocessing.get_context("fork").Array("q", 2 * len(KINDS))
+
+
+def counts() -> dict:
+    """{kind: (calls, rate limited)} since share_counts()."""
+    if _shared is None:
+        return {}
+    with _shared.get_lock():
+        v = list(_shared)
+    return {k: (v[i], v[len(KINDS) + i]) for i, k in enumerate(KINDS)}
+
+
+def expiries(today=None) -> list:
+    """Next N_EXPIRIES Friday expiries as YYYY-MM-DD strings."""
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    first = today + pd.offsets.Week(weekday=4)
+    return [(first + pd.Timedelta(weeks=i)).strftime("%Y-%m-%d") for i in range(N_EXPIRIES)]
+
+
+def spot_for(symbol: str) -> float:
+    rng = np.random.default_rng(_seed("spot", symbol))
+    return float(np.round(rng.uniform(15, 600), 2))
+
+
+def live_spot(symbol: str) -> float:
+    """spot_for(symbol), or with TICK_S set a level that changes every 1-5 ticks
+    (a different pace per symbol), so only some names move at each poll."""
+    spot = spot_for(symbol)
+    if TICK_S <= 0:
+        return spot
+    pace = 1 + _seed("pace", symbol) % 5
+    step = int(time.time() // TICK_S) // pace
+    k = int(np.random.default_rng(_seed("live", symbol, step)).integers(-20, 21))
+    return round(spot * (1 + 0.001 * k), 2)
+
+
+def chain_frames(symbol: str, expiration: str, spot: float | None = None):
+    """Synthetic calls/puts frames with yfinance's column layout."""
+    spot = spot_for(symbol) if spot is None else spot
+    rng = np.random.default_rng(_seed("chain", symbol, expiration))
+    step = 0.5 if spot < 50 else (1.0 if spot < 200 else 5.0)
+    center = round(spot / step) * step
+    strikes = center + step * (np.arange(N_STRIKES) - N_STRIKES // 2)
+    strikes = strikes[strikes > 0]
+    dte = max((pd.Timestamp(expiration) - pd.Timestamp.today().normalize()).days, 1)
+    t = dte / 365.0
+    iv = rng.uniform(0.18, 0.7) * (1 + 0.3 * np.abs(np.log(strikes / spot)))
+    moneyness = np.log(spot / strikes)
+    oi = np.maximum(0, rng.normal(1500, 1200, len(strikes)) * np.exp(-8 * moneyness ** 2)).astype(int)
+    if np.random.default_rng(_seed("liq", symbol)).random() < ILLIQUID_P:
+        oi = (oi * 0.03).astype(int)
+    vol = np.maximum(0, oi * rng.uniform(0.0, 0.3, len(strikes))).astype(int)
+    ts = pd.Timestamp.now(tz="UTC").floor("min")
+
+    def side(is_call):
+        intrinsic = np.maximum(spot - strikes, 0) if is_call else np.maximum(strikes - spot, 0)
+        theo = intrinsic + spot * iv * np.sqrt(t) * 0.4 * np.exp(-0.5 * (moneyness / (iv * np.sqrt(t))) ** 2)
+        spread = np.maximum(0.01, theo * rng.uniform(0.02, 0.15, len(strikes)))
+        bid = np.round(np.maximum(theo - spread / 2, 0.0), 2)
+        ask = np.round(theo + spread / 2, 2)
+        kind = "C" if is_call else "P"
+        return pd.DataFrame({
+            "contractSymbol": [f"{symbol}{expiration.replace('-', '')[2:]}{kind}{int(k * 1000):08d}" for k in strikes],
+            "lastTradeDate": ts,
+            "strike": strikes,
+            "lastPrice": np.round(theo, 2),
+            "bid": bid,
+            "ask": ask,
+            "change": 0.0,
+            "percentChange": 0.0,
+            "volume": vol.astype(float),
+            "openInterest": oi.astype(float),
+            "impliedVolatility": iv,
+            "inTheMoney": (strikes < spot) if is_call else (strikes > spot),
+            "contractSize": "REGULAR",
+            "currency": "USD",
+        }, columns=_COLUMNS)
+
+    return side(True), side(False)
+
+
+def chain_rows(symbol: str, expiration: str) -> dict:
+    """chain_frames as Yahoo's raw options JSON: {"calls": [...], "puts": [...]},
+    one dict per contract, lastTradeDate in epoch seconds."""
+    out = {}
+    for name, frame in zip(("calls", "puts"), chain_frames(symbol, expiration)):
+        frame = frame.assign(lastTradeDate=frame["lastTradeDate"].astype("int64") // 10**9)
+        out[name] = frame.to_dict("records")
+    return out
+
+
+def _epoch(expiration: str) -> int:
+    return int(pd.Timestamp(expiration, tz="UTC").timestamp())
+
+
+def price_history(symbol: str, start, end) -> pd.DataFrame:
+    """Daily OHLCV as a geometric random walk ending near spot_for(symbol)."""
+    idx = pd.bdate_range(start, end)
+    rng = np.random.default_rng(_seed("hist", symbol))
+    rets = rng.normal(0.0003, 0.018, len(idx))
+    close = spot_for(symbol) * np.exp(np.cumsum(rets) - np.sum(rets))
+    open_ = close * (1 + rng.normal(0, 0.004, len(idx)))
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * 1.005,
+        "Low": np.minimum(open_, close) * 0.995,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, len(idx)),
+    }, index=idx)
+
+
+_PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 365,
+                "2y": 730, "3y": 1095, "5y": 1826, "10y": 3652, "20y": 7305}
+
+
+def _period_range(period):
+    end = pd.Timestamp.today().normalize()
+    return end - pd.Timedelta(days=_PERIOD_DAYS.get(period, 31)), end
+
+
+class _FastInfo:
+    def __init__(self, symbol):
+        self._symbol = symbol
+
+    @property
+    def last_price(self):
+        _upstream("fast_info")
+        return spot_for(self._symbol)
+
+
+class Ticker:
+    """Drop-in for yf.Ticker covering the calls the scanners make."""
+
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker.upper()
+
+    @property
+    def options(self):
+        _upstream("options")
+        return tuple(expiries())
+
+    @property
+    def fast_info(self):
+        return _FastInfo(self.ticker)
+
+    def history(self, period="1mo", interval="1d", **kwargs):
+        _upstream("history")
+        start, end = _period_range(period)
+        if interval == "1d" or period not in ("1d", "5d"):
+            h = price_history(self.ticker, start, end)
+            return h.iloc[-1:] if period == "1d" else h
+        # intraday: a handful of minute bars around the latest close
+        last = price_history(self.ticker, start, end).iloc[-1]
+        idx = pd.date_range(end + pd.Timedelta(hours=9.5), periods=30, freq="1min")
+        return pd.DataFrame({c: [last[c]] * len(idx) for c in ["Open", "High", "Low", "Close", "Volume"]}, index=idx)
+
+    def option_chain(self, date=None, tz=None):
+        _upstream("option_chain")
+        date = date or expiries()[0]
+        if date not in expiries():
+            raise ValueError(f"Expiration `{date}` cannot be found.")
+        calls, puts = chain_frames(self.ticker, date)
+        return Options(calls, puts, {"regularMarketPrice": spot_for(self.ticker)})
+
+    @property
+    def _expirations(self):
+        return {e: _epoch(e) for e in expiries()}
+
+    def _download_options(self, date=None):
+        _upstream("option_chain")
+        by_epoch = {v: k for k, v in self._expirations.items()}
+        expiration = expiries()[0] if date is None else by_epoch.get(date)
+        if expiration is None:
+            return {}
+        return dict(expirationDate=_epoch(expiration), **chain_rows(self.ticker, expiration),
+                    underlying={"regularMarketPrice": spot_for(self.ticker)})
+
+    def get_earnings_dates(self, limit=12):
+        _upstream("earnings")
+        rng = np.random.default_rng(_seed("earn", self.ticker))
+        nxt = pd.Timestamp.today().normalize() + pd.Timedelta(days=int(rng.integers(1, 90)))
+        idx = pd.DatetimeIndex([nxt - pd.Timedelta(days=91 * i) for i in range(limit)],
+                               name="Earnings Date").tz_localize("America/New_York")
+        return pd.DataFrame({"EPS Estimate": np.nan, "Reported EPS": np.nan, "Surprise(%)": np.nan}, index=idx)
+
+
+def download(tickers, period="1mo", interval="1d", **kwargs) -> pd.DataFrame:
+    """Drop-in for yf.download: daily bars for a single symbol, or the latest
+    minute bar of each symbol (live_spot) under yfinance's (Price, Ticker) columns."""
+    _upstream("download")
+    syms = [t.upper() for t in (tickers.split() if isinstance(tickers, str) else tickers)]
+    start, end = _period_range(period)
+    if interval == "1d" and len(syms) == 1:
+        return price_history(syms[0], start, end)
+    idx = pd.DatetimeIndex([pd.Timestamp.now().floor("min")], name="Datetime")
+    cols = pd.MultiIndex.from_product([["Open", "High", "Low", "Close", "Volume"], syms], names=["Price", "Ticker"])
+    spots = [live_spot(t) for t in syms]
+    return pd.DataFrame([spots * 4 + [0] * len(syms)], index=idx, columns=cols)
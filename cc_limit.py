@@ -0,0 +1,124 @@
+# cc_limit.py
+# Adaptive (AIMD) cap on in-flight upstream requests.
+# The limit grows by about one slot per window of healthy requests and is
+# cut by BETA on a 429, an upstream error burst or a latency spike, so a
+# scan runs as wide as Yahoo tolerates at that moment.
+#
+# Latency spikes are judged against a per-class baseline (the caller's kind,
+# e.g. "history/5y/1d", so slow downloads are not compared with quick ones).
+# Every completed call feeds it, spikes at SPIKE_WEIGHT: a burst barely moves
+# it, while a lasting shift becomes the new normal after a few dozen calls and
+# the limit grows back instead of being cut for good.
+#
+# A caller may pass a deadline to slot(): if it passes while the caller is
+# queued for a slot, slot() raises Expired instead of going upstream late.
+
+import threading
+import time
+from contextlib import contextmanager
+
+import cc_metrics
+
+TYPICAL_WEIGHT = 0.1   # EWMA weight of a healthy call's latency in the baseline
+SPIKE_WEIGHT = 0.05    # ...and of a spike's
+
+cc_metrics.HELP.update({
+    "cc_concurrency_limit": "Current adaptive cap on in-flight upstream requests.",
+    "cc_inflight_requests": "Upstream requests currently in flight.",
+    "cc_limit_decreases_total": "Multiplicative decreases of the concurrency limit, by reason.",
+})
+
+
+class Expired(Exception):
+    """The caller's deadline passed before it got an upstream slot."""
+
+
+class AIMDLimiter:
+    def __init__(self, initial=4, min_limit=1, max_limit=16, beta=0.5,
+                 spike_factor=3.0, spike_floor_s=0.5, error_rate_max=0.2):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.beta = beta                    # multiplicative decrease factor
+        self.spike_factor = spike_factor    # latency > factor * typical latency is a spike
+        self.spike_floor_s = spike_floor_s  # ...but never below this many seconds
+        self.error_rate_max = error_rate_max
+        self.inflight = 0
+        self._typical = {}                  # kind -> EWMA of completed-call latency
+        self._err_rate = 0.0                # EWMA of non-429 errors
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+        self._publish()
+
+    def _publish(self):
+        cc_metrics.set_gauge("cc_concurrency_limit", int(self.limit))
+        cc_metrics.set_gauge("cc_inflight_requests", self.inflight)
+
+    def acquire(self, deadline=None) -> bool:
+        """Take an in-flight slot; False if deadline() - a time.monotonic()
+        value or None, re-read on every wake-up - passes first."""
+        with self._cond:
+            while True:
+                at = deadline() if deadline is not None else None
+                left = None if at is None else at - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                if self.inflight < int(self.limit):
+                    break
+                self._cond.wait(left)
+            self.inflight += 1
+            self._publish()
+            return True
+
+    def release(self, kind, latency_s, ok=True, rate_limited=False):
+        with self._cond:
+            self.inflight -= 1
+            self._err_rate = 0.9 * self._err_rate + 0.1 * (0.0 if ok or rate_limited else 1.0)
+            typical = self._typical.get(kind)
+            spike = typical is not None and latency_s > max(self.spike_factor * typical, self.spike_floor_s)
+
+            if rate_limited:
+                self._decrease("429")
+            elif spike:
+                self._decrease("latency")
+            elif self._err_rate > self.error_rate_max:
+                self._decrease("errors")
+            elif ok:
+                # additive increase: about +1 per `limit` healthy requests
+                old = int(self.limit)
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                if int(self.limit) != old:
+                    print(f"[limit] healthy: concurrency {old} -> {int(self.limit)}")
+            if ok:
+                w = SPIKE_WEIGHT if spike else TYPICAL_WEIGHT
+                self._typical[kind] = latency_s if typical is None else (1 - w) * typical + w * latency_s
+            self._publish()
+            self._cond.notify_all()
+
+    def _decrease(self, reason):
+        # at most one cut per round trip of in-flight requests, so one burst of
+        # 429s from a single window does not collapse the limit to the floor
+        now = time.monotonic()
+        if self.limit <= self.min_limit or now - self._last_cut < max(self._typical.values(), default=0.5):
+            return
+        self._last_cut = now
+        old = int(self.limit)
+        self.limit = max(self.min_limit, self.limit * self.beta)
+        cc_metrics.inc("cc_limit_decreases_total", reason=reason)
+        print(f"[limit] {reason}: concurrency {old} -> {int(self.limit)}")
+
+    @contextmanager
+    def slot(self, kind, deadline=None):
+        """Hold one in-flight slot for an upstream call of the given kind
+        (its latency class, see the header); raise Expired if deadline (see acquire) passes before one is free."""
+        if not self.acquire(deadline):
+            raise Expired(kind)
+        t0 = time.perf_counter()
+        ok, limited = True, False
+        try:
+            yield
+        except Exception as e:
+            ok, limited = False, cc_metrics.is_rate_limit(e)
+            raise
+        finally:
+            self.release(kind, time.perf_counter() - t0, ok=ok, rate_limited=limited)
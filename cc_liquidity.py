@@ -0,0 +1,167 @@
+# cc_liquidity.py
+# Persisted per-symbol liquidity profile, so scans can skip names whose
+# chains never pass MIN_OI / MIN_VOL without downloading them first.
+#
+# Every chain side a scan looks at is summarised near the money (strikes
+# within NEAR_PCT of spot): the best open interest and volume there (what
+# the pickers' MIN_OI / MIN_VOL test needs) and the median relative spread.
+# Calls and puts have separate profiles. The last WINDOW observations per
+# symbol and side are kept in STORE (JSON), and the profile is their median.
+#
+#   cc_liquidity.observe("AAPL", puts, spot, "puts")  # after each chain fetch (frame or cc_pick.Quotes)
+#   if cc_liquidity.should_skip("AAPL", MIN_OI, MIN_VOL, sides=("calls", "puts")): ...
+#   cc_liquidity.save()                               # at the end of a scan
+#
+# save() merges: under an flock on STORE.lock it rereads the file, appends
+# only this process's new observations and replaces the file atomically, so
+# gunicorn workers saving at the same time keep each other's observations.
+#
+# Skipping is off unless CC_LIQ_SKIP is set: it is the fraction of
+# MIN_OI / MIN_VOL the typical near-money strike must reach (1.0 = skip
+# names whose typical best strike fails the filter). Profiles with fewer
+# than MIN_OBS observations or older than MAX_AGE_DAYS are never trusted,
+# so skipped names are re-checked from time to time. CC_LIQ_STORE="" keeps
+# profiles in memory only.
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import cc_metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process merge lock
+    fcntl = None
+
+STORE = os.environ.get("CC_LIQ_STORE", "cc_liquidity.json")
+SKIP_FACTOR = float(os.environ.get("CC_LIQ_SKIP", "0"))  # 0 = never skip
+NEAR_PCT = 0.05      # strikes within 5% of spot count as near the money
+WINDOW = 10          # observations kept per symbol
+MIN_OBS = 3          # observations needed before a profile is trusted
+MAX_AGE_DAYS = 7     # re-fetch names whose last observation is older than this
+
+cc_metrics.HELP.update({
+    "cc_liquidity_skips_total": "Symbols skipped by the liquidity prefilter.",
+    "cc_chain_fetches_avoided_total": "Option-chain requests avoided by the liquidity prefilter.",
+})
+
+_lock = threading.Lock()
+_profiles = None     # key -> {"oi": [...], "vol": [...], "spread": [...], "ts": epoch}
+_pending = {}        # key -> observations made here since the last save(), same shape
+
+
+def _key(symbol, side):
+    # calls keep the bare symbol, as stored before puts were profiled
+    return symbol if side == "calls" else f"{symbol}/{side}"
+
+
+def _read():
+    try:
+        with open(STORE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _load():
+    global _profiles
+    if _profiles is None:
+        _profiles = _read() if STORE else {}
+    return _profiles
+
+
+def _append(profiles, key, obs):
+    p = profiles.setdefault(key, {"oi": [], "vol": [], "spread": [], "ts": 0})
+    for k in ("oi", "vol", "spread"):
+        p[k] = (p[k] + obs[k])[-WINDOW:]
+    p["ts"] = max(p["ts"], obs["ts"])
+
+
+def observe(symbol: str, chain, spot: float, side: str = "calls"):
+    """Record one chain side's near-money liquidity for symbol."""
+    if chain is None or not spot or not np.isfinite(spot):
+        return
+    if hasattr(chain, "columns"):     # yfinance calls / puts frame
+        if chain.empty:
+            return
+        strike, oi, vol, bid, ask = (chain[c].to_numpy(dtype=float)
+                                     for c in ("strike", "openInterest", "volume", "bid", "ask"))
+    else:                             # cc_pick.Quotes
+        strike, oi, vol, bid, ask = chain.strike, chain.oi, chain.vol, chain.bid, chain.ask
+    near = np.abs(strike / spot - 1.0) <= NEAR_PCT
+    if not near.any():
+        return
+    oi, vol = np.nan_to_num(oi[near]), np.nan_to_num(vol[near])
+    bid, ask = bid[near], ask[near]
+    mid = (bid + ask) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = np.where((bid > 0) & (ask >= bid), (ask - bid) / mid, np.nan)
+    spread = float(np.nanmedian(rel)) if np.isfinite(rel).any() else None
+
+    obs = {"oi": [float(oi.max())], "vol": [float(vol.max())],
+           "spread": [] if spread is None else [round(spread, 4)], "ts": time.time()}
+    key = _key(symbol, side)
+    with _lock:
+        _append(_load(), key, obs)
+        _append(_pending, key, obs)
+
+
+def profile(symbol: str, side: str = "calls") -> dict | None:
+    """Median near-money {oi, vol, spread, n, age_days} of one side, or None if never seen."""
+    with _lock:
+        p = _load().get(_key(symbol, side))
+        if not p or not p["oi"]:
+            return None
+        return {
+            "oi": float(np.median(p["oi"])),
+            "vol": float(np.median(p["vol"])),
+            "spread": float(np.median(p["spread"])) if p["spread"] else None,
+            "n": len(p["oi"]),
+            "age_days": (time.time() - p["ts"]) / 86400,
+        }
+
+
+def should_skip(symbol: str, min_oi: float, min_vol: float, fetches: int = 1, sides=("calls",)) -> bool:
+    """True if skipping is on and, for every side to be scanned, symbol's
+    trusted profile is below the thresholds. fetches = chain requests the
+    caller would otherwise make, for the avoided count."""
+    if SKIP_FACTOR <= 0:
+        return False
+    for side in sides:
+        p = profile(symbol, side)
+        if p is None or p["n"] < MIN_OBS or p["age_days"] > MAX_AGE_DAYS:
+            return False
+        if p["oi"] >= SKIP_FACTOR * min_oi and p["vol"] >= SKIP_FACTOR * min_vol:
+            return False
+    cc_metrics.inc("cc_liquidity_skips_total")
+    cc_metrics.inc("cc_chain_fetches_avoided_total", fetches)
+    return True
+
+
+def avoided() -> int:
+    """Chain fetches avoided by should_skip in this process."""
+    return int(cc_metrics.value("cc_chain_fetches_avoided_total"))
+
+
+def save():
+    """Merge this process's new observations into STORE (see the header)."""
+    global _profiles
+    with _lock:
+        if not _pending or not STORE:
+            return
+        with open(STORE + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = _read()
+            for key, obs in _pending.items():
+                _append(merged, key, obs)
+            tmp = f"{STORE}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(merged, f, separators=(",", ":"))
+            os.replace(tmp, STORE)
+        _profiles = merged   # pick up the other workers' observations too
+        _pending.clear()
@@ -0,0 +1,258 @@
+# cc_live.py
+# Live premium-return feed over WebSockets. Runs as its own process next to
+# the Flask app (Procfile "live"):  python cc_live.py
+#
+# A client subscribes a watchlist to one expiry:
+#   -> {"subscribe": ["AAPL", "MSFT"], "expiry": "2025-11-21", "mode": "atm"}
+#   <- {"type": "snapshot", "rows": [{"Symbol": "AAPL", "Spot": ..., "Strike": ..., ...}]}
+#   <- {"type": "delta", "rows": [{"Symbol": "AAPL", "Expiry": ..., "Spot": 231.2, "PremiumReturn": 1.31}]}
+#   <- {"type": "delta", "rows": [{"Symbol": "AAPL", "Expiry": ..., "Cleared": true}]}   # nothing to sell now
+#   -> {"unsubscribe": ["MSFT"]}
+#
+# Symbols must be a list of ticker strings and expiry a YYYY-MM-DD date not
+# in the past; a connection may watch at most MAX_TOPICS topics in all.
+#
+# Every INTERVAL seconds the server fetches the spot of all subscribed symbols
+# in one bulk download and refreshes up to CHAIN_BATCH chains (stalest first;
+# chains cost one request each). Only (symbol, expiry, mode) topics whose
+# spot or chain quotes changed are re-picked, and clients get just the fields
+# that changed. Picking uses cc_app's rules, on chains already reduced to
+# cc_pick arrays, so a recompute costs microseconds.
+
+import asyncio
+import datetime as dt
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+import cc_app
+import cc_data
+import cc_pick
+
+HOST = os.environ.get("CC_LIVE_HOST", "0.0.0.0")
+PORT = int(os.environ.get("CC_LIVE_PORT", os.environ.get("PORT", "8765")))
+INTERVAL = float(os.environ.get("CC_LIVE_INTERVAL", "15"))       # seconds between polls
+CHAIN_BATCH = int(os.environ.get("CC_LIVE_CHAIN_BATCH", "50"))   # chain refreshes per poll
+MAX_TOPICS = 500    # (symbol, expiry, mode) topics per connection
+SYMBOL_RE = re.compile(r"[A-Z0-9][A-Z0-9.^=-]{0,11}")
+
+
+class Topic:
+    """One (symbol, expiry, mode) and the clients watching it."""
+    __slots__ = ("symbol", "expiry", "mode", "quotes", "chain_at", "row", "clients")
+
+    def __init__(self, symbol, expiry, mode):
+        self.symbol, self.expiry, self.mode = symbol, expiry, mode
+        self.quotes = None     # cc_pick.Quotes of the last chain
+        self.chain_at = 0.0    # monotonic time of the last chain refresh
+        self.row = None        # last computed row
+        self.clients = set()
+
+
+def _same_quotes(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return all(np.array_equal(x, y, equal_nan=True) for x, y in zip(a, b))
+
+
+def compute_row(topic, spot):
+    """Premium-return row for one topic at spot, or None if nothing can be sold."""
+    q = topic.quotes
+    if q is None or not spot:
+        return None
+    i = cc_app.pick_call(q, spot, topic.mode)
+    if i is None:
+        return None
+    mid = float(cc_pick.mids(q)[i])
+    if not np.isfinite(mid):
+        return None
+    strike = float(q.strike[i])
+    return {
+        "Symbol": topic.symbol,
+        "Expiry": topic.expiry,
+        "Spot": round(spot, 2),
+        "Strike": round(strike, 2),
+        "Mid": round(mid, 2),
+        "PremiumReturn": round(((strike - spot) + mid) / spot * 100.0, 2),
+    }
+
+
+def _symbols(value) -> list:
+    """Upper-cased, de-duplicated tickers from a JSON list of strings."""
+    if not isinstance(value, list) or not all(isinstance(s, str) for s in value):
+        raise ValueError("symbols must be a list of strings")
+    out = list(dict.fromkeys(s.strip().upper() for s in value if s.strip()))
+    bad = [s for s in out if not SYMBOL_RE.fullmatch(s)]
+    if bad:
+        raise ValueError(f"not a ticker: {bad[0][:20]!r}")
+    return out
+
+
+def _expiry(value) -> str:
+    """value if it is a YYYY-MM-DD date not in the past."""
+    if not isinstance(value, str) or not re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
+        raise ValueError("expiry must be a YYYY-MM-DD date")
+    if dt.date.fromisoformat(value) < dt.datetime.now(dt.timezone.utc).date():
+        raise ValueError(f"expiry {value} is in the past")
+    return value
+
+
+class LiveFeed:
+    def __init__(self):
+        self.topics = {}       # (symbol, expiry, mode) -> Topic
+        self.spots = {}        # symbol -> last spot
+        self.pool = ThreadPoolExecutor(max_workers=cc_data.SCAN_WORKERS)
+        self.wake = asyncio.Event()
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    # ---- subscriptions ----
+    def _watching(self, ws) -> int:
+        return sum(ws in t.clients for t in self.topics.values())
+
+    def subscribe(self, ws, symbols, expiry, mode):
+        new = [s for s in symbols if ws not in getattr(self.topics.get((s, expiry, mode)), "clients", ())]
+        if self._watching(ws) + len(new) > MAX_TOPICS:
+            raise ValueError(f"at most {MAX_TOPICS} topics per connection")
+        rows = []
+        for sym in symbols:
+            t = self.topics.get((sym, expiry, mode))
+            if t is None:
+                t = self.topics[(sym, expiry, mode)] = Topic(sym, expiry, mode)
+            t.clients.add(ws)
+            if t.row is not None:
+                rows.append(t.row)
+        self.wake.set()   # fetch new symbols now rather than at the next poll
+        return rows
+
+    def unsubscribe(self, ws, symbols=None):
+        for key, t in list(self.topics.items()):
+            if symbols is None or t.symbol in symbols:
+                t.clients.discard(ws)
+                if not t.clients:
+                    del self.topics[key]
+
+    # ---- polling ----
+    def _fetch_quotes(self, topic):
+        try:
+            return cc_pick.quotes_from_rows(cc_data.option_calls(topic.symbol, topic.expiry),
+                                            self.spots.get(topic.symbol), cc_data.CHAIN_WINDOW)
+        except Exception as e:
+            print(f"[live] {topic.symbol} {topic.expiry}: chain unavailable ({e})")
+            return topic.quotes
+
+    def _fetch_spot(self, symbol):
+        try:
+            return cc_data.last_price(symbol)
+        except Exception:
+            return None
+
+    async def poll(self):
+        t0 = time.perf_counter()
+        topics = list(self.topics.values())
+        symbols = sorted({t.symbol for t in topics})
+        if not symbols:
+            return
+
+        # 1) every spot in one bulk request; one-off fallback for names with no bar yet
+        try:
+            spots = await self._run(cc_data.last_prices, symbols)
+        except Exception as e:
+            print(f"[live] bulk spot fetch failed: {e}")
+            spots = {}
+        missing = [s for s in symbols if s not in spots and s not in self.spots]
+        for s, p in zip(missing, await asyncio.gather(*(self._run(self._fetch_spot, s) for s in missing))):
+            if p:
+                spots[s] = float(p)
+        moved = {s for s, p in spots.items() if self.spots.get(s) != p}
+        self.spots.update(spots)
+
+        # 2) refresh the stalest chains, keep only the ones whose quotes changed
+        due = sorted(topics, key=lambda t: t.chain_at)[:CHAIN_BATCH]
+        fresh = await asyncio.gather(*(self._run(self._fetch_quotes, t) for t in due))
+        dirty = {id(t): t for t in topics if t.symbol in moved}
+        now = time.monotonic()
+        for t, q in zip(due, fresh):
+            t.chain_at = now
+            if not _same_quotes(q, t.quotes):
+                t.quotes = q
+                dirty[id(t)] = t
+
+        # 3) recompute dirty topics, collect per-client deltas
+        out = {}
+        for t in dirty.values():
+            row = compute_row(t, self.spots.get(t.symbol))
+            if row == t.row:
+                continue
+            if row is None:
+                # the old strike no longer qualifies: clients must drop the row, not keep it
+                delta = {"Cleared": True}
+            else:
+                delta = {k: v for k, v in row.items() if t.row is None or t.row.get(k) != v}
+            delta.update(Symbol=t.symbol, Expiry=t.expiry)
+            t.row = row
+            for ws in t.clients:
+                out.setdefault(ws, []).append(delta)
+
+        for ws, rows in out.items():
+            try:
+                await ws.send(json.dumps({"type": "delta", "rows": rows}))
+            except ConnectionClosed:
+                pass
+        print(f"[live] {len(symbols)} symbols, {len(moved)} spots moved, {len(due)} chains fetched, "
+              f"{len(dirty)} recomputed, {sum(len(r) for r in out.values())} deltas to {len(out)} clients "
+              f"in {time.perf_counter() - t0:.2f}s")
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"[live] poll failed: {e}")
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    # ---- connections ----
+    async def handler(self, ws):
+        try:
+            async for msg in ws:
+                try:
+                    req = json.loads(msg)
+                    if "subscribe" in req:
+                        symbols = _symbols(req["subscribe"])
+                        mode = str(req.get("mode", "atm")).lower()
+                        if mode not in ("atm", "itm", "both"):
+                            raise ValueError("mode must be atm, itm or both")
+                        rows = self.subscribe(ws, symbols, _expiry(req.get("expiry")), mode)
+                        await ws.send(json.dumps({"type": "snapshot", "rows": rows}))
+                    elif "unsubscribe" in req:
+                        self.unsubscribe(ws, set(_symbols(req["unsubscribe"])))
+                    else:
+                        raise ValueError("expected subscribe or unsubscribe")
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    await ws.send(json.dumps({"type": "error", "error": str(e)}))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.unsubscribe(ws)
+
+
+async def main():
+    feed = LiveFeed()
+    async with serve(feed.handler, HOST, PORT):
+        print(f"[live] listening on ws://{HOST}:{PORT} (poll every {INTERVAL:g}s)")
+        await feed.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,330 @@
+# cc_loadtest.py
+# End-to-end load test of the web scanner: starts cc_app under gunicorn
+# (same gunicorn.conf.py as production) on the fake market-data source, then
+# drives N simulated users against it and reports latency percentiles,
+# throughput, worker saturation and upstream calls.
+#
+#   python cc_loadtest.py --users 20 --duration 60
+#   python cc_loadtest.py --users 50 --workers 4 --latency 0.08 --rate-limit 0.02
+#   python cc_loadtest.py --users 10 --max-p95 25 --json load.json   # CI gate
+#
+# Each user loops: think (exponential, mean --think s), then one scan -
+# an S&P 500 scan with probability --sp500-share, else 5-25 random S&P names -
+# sent as the page form (POST /) or, with probability --api-share, as a
+# GET /api/scan poll. Upstream latency and 429s are injected by cc_fake
+# (CC_FAKE_LATENCY_S / CC_FAKE_429_P); its call counters and per-worker busy
+# time live in shared memory, so every gunicorn worker reports into this
+# process. A worker is busy while it has at least one request in flight;
+# overlapping requests on one worker count once, so saturation (busy
+# worker-seconds / (workers x wall)) never exceeds 100%.
+#
+# Exit status is 1 if --max-p95 / --max-error-rate are given and exceeded.
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MAX_SLOTS = 64   # worker processes tracked, respawned ones included
+
+# busy: [requests in flight, peak in flight], shared with the workers
+# slots: per worker process [requests in flight, busy since, busy seconds]
+_busy = None
+_slots = None
+_next_slot = None
+_slot = (None, None)   # (pid, slot index) of this process
+
+
+class _Body:
+    """WSGI body wrapper: the worker stays busy until the body is sent."""
+
+    def __init__(self, body, t0):
+        self.body, self.t0 = body, t0
+
+    def __iter__(self):
+        yield from self.body
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            _end(self.t0)
+
+
+def _my_slot():
+    global _slot
+    if _slot[0] != os.getpid():
+        with _next_slot.get_lock():
+            _slot = (os.getpid(), _next_slot.value % MAX_SLOTS)
+            _next_slot.value += 1
+    return 3 * _slot[1]
+
+
+def _begin():
+    i, now = _my_slot(), time.monotonic()
+    with _busy.get_lock():
+        _busy[0] += 1
+        _busy[1] = max(_busy[1], _busy[0])
+        _slots[i] += 1
+        if _slots[i] == 1:
+            _slots[i + 1] = now
+    return now
+
+
+def _end(t0):
+    i, now = _my_slot(), time.monotonic()
+    with _busy.get_lock():
+        _busy[0] -= 1
+        _slots[i] -= 1
+        if _slots[i] == 0:
+            _slots[i + 2] += now - _slots[i + 1]
+
+
+def _busy_state():
+    """(busy worker-seconds so far, workers busy right now)."""
+    now = time.monotonic()
+    with _busy.get_lock():
+        per = [_slots[i:i + 3] for i in range(0, 3 * MAX_SLOTS, 3)]
+    return (sum(b + (now - since if n > 0 else 0.0) for n, since, b in per),
+            sum(n > 0 for n, _, _ in per))
+
+
+def _instrument(app):
+    def wrapped(environ, start_response):
+        if environ.get("PATH_INFO") == "/healthz":
+            return app(environ, start_response)
+        t0 = _begin()
+        try:
+            body = app(environ, start_response)
+        except BaseException:
+            _end(t0)
+            raise
+        return _Body(body, t0)
+    return wrapped
+
+
+def _serve(port, workers):
+    from gunicorn.app.base import Application
+
+    class Server(Application):
+        def init(self, parser, opts, args):
+            pass
+
+        def load_config(self):
+            self.load_config_from_file(os.path.join(HERE, "gunicorn.conf.py"))
+            self.cfg.set("bind", f"127.0.0.1:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("loglevel", "warning")
+
+        def load(self):
+            import cc_wsgi
+            return _instrument(cc_wsgi.app)
+
+    import contextlib
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        Server().run()
+
+
+# ---- simulated users ----
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []      # (kind, seconds, ok, partial)
+
+    def add(self, kind, seconds, ok, partial):
+        with self.lock:
+            self.samples.append((kind, seconds, ok, partial))
+
+
+def _user(uid, base, args, universe, expiration, stop, stats):
+    import requests
+
+    rng = random.Random(uid)
+    http = requests.Session()
+    while not stop.is_set():
+        if stop.wait(rng.expovariate(1.0 / args.think) if args.think > 0 else 0):
+            break
+        sp500 = rng.random() < args.sp500_share
+        tickers = [] if sp500 else rng.sample(universe, rng.randint(5, 25))
+        api = rng.random() < args.api_share
+        kind = f"{'sp500' if sp500 else 'manual'}/{'api' if api else 'page'}"
+        t0 = time.perf_counter()
+        ok = partial = False
+        try:
+            if api:
+                params = {"expiration": expiration, "limit": 50}
+                params.update({"universe": "sp500"} if sp500 else {"tickers": ",".join(tickers)})
+                r = http.get(f"{base}/api/scan", params=params, timeout=args.timeout)
+                ok = r.status_code == 200
+                if ok:
+                    d = r.json()
+                    partial = d.get("scanned", 0) < d.get("symbols", 0)
+            else:
+                form = {"expiration": expiration, "mode": "atm", "include_earn": "yes",
+                        "universe": "sp500" if sp500 else "manual", "tickers": "\n".join(tickers)}
+                r = http.post(f"{base}/", data=form, timeout=args.timeout)
+                ok = r.status_code == 200
+                partial = ok and 'class="notice"' in r.text
+        except Exception:
+            ok = False
+        stats.add(kind, time.perf_counter() - t0, ok, partial)
+
+
+def _wait_ready(base, proc, timeout=120):
+    import requests
+
+    t_end = time.monotonic() + timeout
+    while time.monotonic() < t_end:
+        if not proc.is_alive():
+            raise SystemExit("server exited during startup")
+        try:
+            if requests.get(f"{base}/healthz", timeout=1).json().get("ready"):
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("server not ready in time")
+
+
+def _pct(a, q):
+    return float(np.percentile(a, q)) if len(a) else float("nan")
+
+
+def report(stats, wall, workers, upstream, busy_samples, busy_s, load_s, peak):
+    """busy_samples / busy_s cover the load phase (load_s seconds); requests
+    still finishing after it count towards throughput and latency only."""
+    s = stats.samples
+    lat = np.array([x[1] for x in s])
+    ok = sum(x[2] for x in s)
+    out = {
+        "requests": len(s),
+        "errors": len(s) - ok,
+        "error_rate": (len(s) - ok) / len(s) if s else 0.0,
+        "partial": sum(x[3] for x in s),
+        "throughput_rps": len(s) / wall,
+        "p50_s": _pct(lat, 50), "p95_s": _pct(lat, 95), "p99_s": _pct(lat, 99),
+        "by_kind": {},
+        "workers": workers,
+        "saturation": busy_s / (workers * load_s),
+        "saturated_share": float(np.mean(np.array(busy_samples) >= workers)) if busy_samples else 0.0,
+        "peak_in_flight": int(peak),
+        "upstream_calls": {k: c for k, (c, _) in upstream.items() if c},
+        "upstream_429s": sum(r for _, r in upstream.values()),
+    }
+    for kind in sorted({x[0] for x in s}):
+        a = np.array([x[1] for x in s if x[0] == kind])
+        out["by_kind"][kind] = {"n": len(a), "p50_s": _pct(a, 50), "p95_s": _pct(a, 95), "p99_s": _pct(a, 99)}
+    calls = sum(out["upstream_calls"].values())
+
+    print(f"\n{'Requests':<16}{'N':>6}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}")
+    for kind, k in out["by_kind"].items():
+        print(f"{kind:<16}{k['n']:>6}{k['p50_s']:>9.2f}{k['p95_s']:>9.2f}{k['p99_s']:>9.2f}")
+    print(f"{'all':<16}{len(s):>6}{out['p50_s']:>9.2f}{out['p95_s']:>9.2f}{out['p99_s']:>9.2f}")
+    print(f"\nthroughput    {out['throughput_rps']:.2f} req/s over {wall:.0f}s, "
+          f"{out['errors']} errors ({out['error_rate']:.1%}), {out['partial']} partial (deadline) results")
+    print(f"saturation    {out['saturation']:.0%} of {workers} workers busy on average, "
+          f"all busy {out['saturated_share']:.0%} of the time, peak {out['peak_in_flight']} requests in flight")
+    print(f"upstream      {calls} calls ({calls / max(1, len(s)):.0f} per request), "
+          f"{out['upstream_429s']} injected 429s: "
+          + ", ".join(f"{k}={v}" for k, v in out["upstream_calls"].items()))
+    return out
+
+
+def main(argv=None):
+    global _busy, _slots, _next_slot
+    ap = argparse.ArgumentParser(description="Load-test cc_app under gunicorn on the fake data source.")
+    ap.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    ap.add_argument("--duration", type=float, default=60, help="seconds of load after ramp-up")
+    ap.add_argument("--ramp", type=float, default=5, help="seconds over which users start")
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "2")),
+                    help="gunicorn workers (default: WEB_CONCURRENCY or 2)")
+    ap.add_argument("--port", type=int, default=5055)
+    ap.add_argument("--latency", type=float, default=0.05, help="injected upstream latency per call, seconds")
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="probability an upstream call gets a 429")
+    ap.add_argument("--sp500-share", type=float, default=0.1, help="share of scans over the S&P 500")
+    ap.add_argument("--api-share", type=float, default=0.3, help="share of requests sent to /api/scan")
+    ap.add_argument("--think", type=float, default=2.0, help="mean think time between a user's requests, s")
+    ap.add_argument("--timeout", type=float, default=120, help="client timeout per request, s")
+    ap.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    ap.add_argument("--max-p95", type=float, help="fail if overall p95 latency exceeds this many seconds")
+    ap.add_argument("--max-error-rate", type=float, help="fail if the error rate exceeds this share")
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="cc_loadtest-")
+    os.environ.update({
+        "CC_DATA_SOURCE": "fake",
+        "CC_FAKE_LATENCY_S": str(args.latency),
+        "CC_FAKE_429_P": str(args.rate_limit),
+        "CC_LIQ_STORE": "",                   # no liquidity skips learned from synthetic data
+        "CC_CHAIN_ARCHIVE": "",
+        "CC_UNIVERSE_DIR": os.path.join(tmp, "universes"),
+        "CC_SINGLEFLIGHT_DIR": os.path.join(tmp, "singleflight"),
+    })
+    import cc_fake
+    import cc_universe
+
+    cc_fake.share_counts()
+    ctx = multiprocessing.get_context("fork")
+    _busy = ctx.Array("d", 2)
+    _slots = ctx.Array("d", 3 * MAX_SLOTS, lock=False)   # guarded by _busy's lock
+    _next_slot = ctx.Value("i", 0)
+    universe = list(cc_universe.get("sp500"))
+    expiration = cc_fake.expiries()[1]
+    base = f"http://127.0.0.1:{args.port}"
+
+    server = ctx.Process(target=_serve, args=(args.port, args.workers), name="cc-loadtest-server")
+    server.start()
+    try:
+        _wait_ready(base, server)
+        print(f"[load] {args.users} users, {args.workers} workers, {args.latency * 1000:g} ms upstream latency, "
+              f"{args.rate_limit:.0%} 429s, {args.duration:g}s")
+        before = cc_fake.counts()
+        stats, stop = Stats(), threading.Event()
+        users = [threading.Thread(target=_user, args=(i, base, args, universe, expiration, stop, stats), daemon=True)
+                 for i in range(args.users)]
+        t0 = time.perf_counter()
+        for i, u in enumerate(users):
+            u.start()
+            time.sleep(args.ramp / max(1, args.users))
+        busy0, _ = _busy_state()
+        samples = []     # workers busy, every 0.2 s
+        while time.perf_counter() - t0 < args.ramp + args.duration:
+            time.sleep(0.2)
+            samples.append(_busy_state()[1])
+        busy_s, load_s = _busy_state()[0] - busy0, time.perf_counter() - t0
+        stop.set()
+        for u in users:
+            u.join(args.timeout)
+        wall = time.perf_counter() - t0
+        after = cc_fake.counts()
+        upstream = {k: (after[k][0] - before[k][0], after[k][1] - before[k][1]) for k in after}
+        out = report(stats, wall, args.workers, upstream, samples, busy_s, load_s, _busy[1])
+    finally:
+        server.terminate()
+        server.join(30)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(out, f, indent=2)
+    failed = []
+    if args.max_p95 is not None and out["p95_s"] > args.max_p95:
+        failed.append(f"p95 {out['p95_s']:.2f}s > {args.max_p95:g}s")
+    if args.max_error_rate is not None and out["error_rate"] > args.max_error_rate:
+        failed.append(f"error rate {out['error_rate']:.1%} > {args.max_error_rate:.1%}")
+    if failed:
+        print(f"\nLoad test failed: {'; '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
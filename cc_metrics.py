@@ -0,0 +1,221 @@
+# cc_metrics.py
+# Lightweight, thread-safe counters / gauges / histograms for the scanners.
+# cc_app exposes them at /metrics (Prometheus text format);
+# 1cc_scanner prints a per-phase summary at the end of a run.
+
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:    # Windows: no getrusage, peak RSS is reported as 0
+    resource = None
+
+TRACEMALLOC = os.environ.get("CC_TRACEMALLOC") == "1"   # traced-allocation peak per scan (slow)
+
+# histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "cc_phase_seconds": "Wall time of one scan phase for one symbol.",
+    "cc_phase_errors_total": "Exceptions raised inside a scan phase.",
+    "cc_rate_limited_total": "Upstream 'Too Many Requests' responses seen inside a scan phase.",
+    "cc_symbols_total": "Symbols scanned, by outcome.",
+    "cc_scan_peak_rss_bytes": "Process peak resident set size at the end of the last scan.",
+    "cc_scan_gc_collections": "Generation-0 GC collections during the last scan (allocation churn).",
+    "cc_scan_allocated_blocks": "Net Python memory blocks allocated by the last scan.",
+    "cc_scan_traced_peak_bytes": "Peak traced Python allocation during the last scan (CC_TRACEMALLOC=1).",
+}
+
+_lock = threading.Lock()
+_counters = {}   # (name, labels) -> float
+_gauges = {}     # (name, labels) -> float
+_hists = {}      # (name, labels) -> {"buckets": [...], "sum": s, "count": n, "max": m}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1.0, **labels):
+    k = _key(name, labels)
+    with _lock:
+        _counters[k] = _counters.get(k, 0.0) + value
+
+
+def value(name, **labels) -> float:
+    """Current value of one counter (0 if never incremented)."""
+    with _lock:
+        return _counters.get(_key(name, labels), 0.0)
+
+
+def set_gauge(name, value, **labels):
+    k = _key(name, labels)
+    with _lock:
+        _gauges[k] = float(value)
+
+
+def observe(name, seconds, **labels):
+    k = _key(name, labels)
+    with _lock:
+        h = _hists.get(k)
+        if h is None:
+            h = _hists[k] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0, "max": 0.0}
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le:
+                h["buckets"][i] += 1
+        h["sum"] += seconds
+        h["count"] += 1
+        h["max"] = max(h["max"], seconds)
+
+
+def is_rate_limit(exc) -> bool:
+    return "Too Many Requests" in str(exc) or "Rate limited" in str(exc)
+
+
+@contextmanager
+def timed(phase: str):
+    """Time one scan phase; count errors and rate limits, then re-raise."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        inc("cc_phase_errors_total", phase=phase)
+        if is_rate_limit(e):
+            inc("cc_rate_limited_total", phase=phase)
+        raise
+    finally:
+        observe("cc_phase_seconds", time.perf_counter() - t0, phase=phase)
+
+
+def _peak_rss() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024   # Linux reports KiB
+
+
+@contextmanager
+def scan_memory():
+    """Measure memory over one scan; yields a dict filled in on exit and
+    published as the cc_scan_* gauges. Peak RSS is the process high-water
+    mark, so rss_growth is how far this scan pushed it."""
+    stats = {}
+    rss0 = _peak_rss()
+    gen0 = gc.get_stats()[0]["collections"]
+    blocks0 = sys.getallocatedblocks()
+    if TRACEMALLOC:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    try:
+        yield stats
+    finally:
+        stats["peak_rss"] = _peak_rss()
+        stats["rss_growth"] = stats["peak_rss"] - rss0
+        stats["gc_collections"] = gc.get_stats()[0]["collections"] - gen0
+        stats["allocated_blocks"] = sys.getallocatedblocks() - blocks0
+        set_gauge("cc_scan_peak_rss_bytes", stats["peak_rss"])
+        set_gauge("cc_scan_gc_collections", stats["gc_collections"])
+        set_gauge("cc_scan_allocated_blocks", stats["allocated_blocks"])
+        if TRACEMALLOC:
+            stats["traced_peak"] = tracemalloc.get_traced_memory()[1]
+            set_gauge("cc_scan_traced_peak_bytes", stats["traced_peak"])
+
+
+def format_memory(stats) -> str:
+    line = (f"peak RSS {stats['peak_rss'] / 2**20:.0f} MB (+{stats['rss_growth'] / 2**20:.1f} MB), "
+            f"{stats['gc_collections']} gen-0 GCs, {stats['allocated_blocks']:+d} blocks")
+    if "traced_peak" in stats:
+        line += f", traced peak {stats['traced_peak'] / 2**20:.1f} MB"
+    return line
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _hists.clear()
+
+
+# ---- output ----
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render() -> str:
+    """Return all metrics in Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        hists = sorted((k, dict(v, buckets=list(v["buckets"]))) for k, v in _hists.items())
+
+    out = []
+    seen = set()
+
+    def header(name, kind):
+        if name in seen:
+            return
+        seen.add(name)
+        if name in HELP:
+            out.append(f"# HELP {name} {HELP[name]}")
+        out.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), v in counters:
+        header(name, "counter")
+        out.append(f"{name}{_fmt_labels(labels)} {v:g}")
+    for (name, labels), v in gauges:
+        header(name, "gauge")
+        out.append(f"{name}{_fmt_labels(labels)} {v:g}")
+    for (name, labels), h in hists:
+        header(name, "histogram")
+        for le, n in zip(BUCKETS, h["buckets"]):
+            out.append(f"{name}_bucket{_fmt_labels(labels, [('le', f'{le:g}')])} {n}")
+        out.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {h['count']}")
+        out.append(f"{name}_sum{_fmt_labels(labels)} {h['sum']:.6f}")
+        out.append(f"{name}_count{_fmt_labels(labels)} {h['count']}")
+    return "\n".join(out) + "\n"
+
+
+def _bucket_quantile(h, q):
+    """Upper bucket bound holding the q-quantile (same estimate Prometheus makes)."""
+    if not h["count"]:
+        return float("nan")
+    target = q * h["count"]
+    for le, n in zip(BUCKETS, h["buckets"]):
+        if n >= target:
+            return min(le, h["max"])
+    return h["max"]
+
+
+def format_summary() -> str:
+    """Per-phase table: calls, errors, rate limits, mean / p95 / max latency."""
+    with _lock:
+        phases = {dict(labels).get("phase"): h for (name, labels), h in _hists.items()
+                  if name == "cc_phase_seconds"}
+        errors = {dict(labels).get("phase"): v for (name, labels), v in _counters.items()
+                  if name == "cc_phase_errors_total"}
+        limited = {dict(labels).get("phase"): v for (name, labels), v in _counters.items()
+                   if name == "cc_rate_limited_total"}
+        others = sorted((name, labels, v) for (name, labels), v in _counters.items()
+                        if name not in ("cc_phase_errors_total", "cc_rate_limited_total"))
+
+    lines = [f"{'Phase':<12}{'Calls':>8}{'Errors':>8}{'429s':>6}{'Mean ms':>10}{'p95 ms':>10}{'Max ms':>10}{'Total s':>10}"]
+    for phase, h in sorted(phases.items(), key=lambda kv: -kv[1]["sum"]):
+        mean = h["sum"] / h["count"] if h["count"] else float("nan")
+        lines.append(
+            f"{phase:<12}{h['count']:>8}{int(errors.get(phase, 0)):>8}{int(limited.get(phase, 0)):>6}"
+            f"{mean * 1000:>10.1f}{_bucket_quantile(h, 0.95) * 1000:>10.1f}"
+            f"{h['max'] * 1000:>10.1f}{h['sum']:>10.2f}"
+        )
+    for name, labels, v in others:
+        lines.append(f"{name}{_fmt_labels(labels)} = {v:g}")
+    return "\n".join(lines)
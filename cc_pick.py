@@ -0,0 +1,150 @@
+# cc_pick.py
+# Array-based covered-call strike pickers.
+# A chain is reduced once to the columns the pickers read (Quotes, plain
+# float arrays); picking is then a couple of masks and one lexsort instead
+# of DataFrame copies, sorts and iterrows. With spot and window given, only
+# strikes within window (a fraction of spot) of spot are kept.
+#
+#   q = reduce_calls(chain.calls)            # the DataFrame can be freed now
+#   q = quotes_from_rows(cc_data.option_calls(sym, exp), spot, window=0.25)   # no DataFrame at all
+#   i = pick(q, spot, "both", min_oi=1, min_vol=0, atm_tol=0.05)
+#   strike, mid = q.strike[i], mids(q)[i]
+#
+# Rules (same as the original DataFrame pickers):
+#   atm  - strikes within atm_tol of spot (all strikes if none are), nearest
+#          first, ties to the lower strike
+#   itm  - strikes at or below spot, nearest first
+#   both - whichever of the two has the higher premium return
+# Each takes the first strike with OI >= min_oi, volume >= min_vol and a
+# valid spread (bid > 0, ask >= bid); failing that, the first with any price.
+#
+# Cash-secured puts (pick_put, on the put side of the same chain) use the
+# same rules with otm - strikes at or below spot - in place of itm, and
+# rank by premium return on the collateral: mid / strike.
+
+from collections import namedtuple
+
+import numpy as np
+
+Quotes = namedtuple("Quotes", ["strike", "bid", "ask", "last", "oi", "vol", "iv"], defaults=(None,))
+
+# yfinance / Yahoo option fields, in Quotes order
+COLUMNS = ("strike", "bid", "ask", "lastPrice", "openInterest", "volume", "impliedVolatility")
+
+
+def _keep(strike, spot, window):
+    """Rows with a strike, within window (fraction of spot) of spot if given.
+    A window holding no strike at all keeps every strike."""
+    keep = ~np.isnan(strike)
+    if spot and window:
+        near = keep & (np.abs(strike / spot - 1.0) <= window)
+        if near.any():
+            keep = near
+    return keep
+
+
+def reduce_calls(calls, spot=None, window=None) -> Quotes | None:
+    """Copy the picker columns of a yfinance calls (or puts) frame into float arrays."""
+    if calls is None or calls.empty:
+        return None
+    cols = [calls[c].to_numpy(dtype=float, na_value=np.nan) if c in calls else np.full(len(calls), np.nan)
+            for c in COLUMNS]
+    keep = _keep(cols[0], spot, window)
+    if not keep.any():
+        return None
+    return Quotes(*(c[keep] for c in cols))
+
+
+def quotes_from_rows(rows, spot=None, window=None) -> Quotes | None:
+    """Quotes straight from Yahoo's raw option rows (list of dicts, as in the
+    v7 options JSON); missing fields become NaN. Only the strikes are read
+    before the window is applied."""
+    if not rows:
+        return None
+    nan = float("nan")
+    strike = np.array([r.get("strike", nan) for r in rows], dtype=float)
+    keep = np.flatnonzero(_keep(strike, spot, window))
+    if not len(keep):
+        return None
+    rows = [rows[i] for i in keep]
+    return Quotes(strike[keep], *(np.array([r.get(c, nan) for r in rows], dtype=float) for c in COLUMNS[1:]))
+
+
+def mids(q: Quotes) -> np.ndarray:
+    """Bid/ask midpoint where the spread is valid, else the highest positive price."""
+    spread_ok = (q.bid > 0) & (q.ask >= q.bid)
+    best = np.fmax(np.fmax(np.where(q.bid > 0, q.bid, np.nan), np.where(q.ask > 0, q.ask, np.nan)),
+                   np.where(q.last > 0, q.last, np.nan))
+    return np.where(spread_ok, 0.5 * (q.bid + q.ask), best)
+
+
+def premium_return(q: Quotes, i: int, spot: float) -> float:
+    """((strike - spot) + mid) / spot, in percent."""
+    return ((q.strike[i] - spot) + mids(q)[i]) / spot * 100.0
+
+
+def put_return(q: Quotes, i: int) -> float:
+    """mid / strike (premium on the cash set aside), in percent."""
+    return mids(q)[i] / q.strike[i] * 100.0
+
+
+def _first(q: Quotes, order, min_oi, min_vol) -> int | None:
+    if len(order) == 0:
+        return None
+    bid, ask = q.bid[order], q.ask[order]
+    for ok in ((q.oi[order] >= min_oi) & (q.vol[order] >= min_vol) & (bid > 0) & (ask >= bid),
+               (bid > 0) | (ask > 0) | (q.last[order] > 0)):
+        if ok.any():
+            return int(order[np.argmax(ok)])
+    return None
+
+
+def pick_atm(q: Quotes, spot: float, min_oi, min_vol, atm_tol) -> int | None:
+    dist = np.abs(q.strike - spot)
+    idx = np.flatnonzero(dist / spot <= atm_tol)
+    if len(idx) == 0:
+        idx = np.arange(len(q.strike))
+    order = idx[np.lexsort((q.strike[idx], dist[idx]))]
+    return _first(q, order, min_oi, min_vol)
+
+
+def pick_itm(q: Quotes, spot: float, min_oi, min_vol) -> int | None:
+    idx = np.flatnonzero(q.strike <= spot)
+    order = idx[np.lexsort((-q.strike[idx], spot - q.strike[idx]))]
+    return _first(q, order, min_oi, min_vol)
+
+
+def pick(q: Quotes | None, spot: float, mode: str, min_oi=1, min_vol=0, atm_tol=0.05) -> int | None:
+    """Index into q of the call to sell for mode atm / itm / both, or None."""
+    if q is None:
+        return None
+    if mode == "itm":
+        return pick_itm(q, spot, min_oi, min_vol)
+    if mode != "both":
+        return pick_atm(q, spot, min_oi, min_vol, atm_tol)
+    best, best_ret = None, -1e9
+    for i in (pick_atm(q, spot, min_oi, min_vol, atm_tol), pick_itm(q, spot, min_oi, min_vol)):
+        if i is None:
+            continue
+        ret = premium_return(q, i, spot)
+        if np.isfinite(ret) and ret > best_ret:
+            best, best_ret = i, ret
+    return best
+
+
+def pick_put(q: Quotes | None, spot: float, mode: str, min_oi=1, min_vol=0, atm_tol=0.05) -> int | None:
+    """Index into q (put quotes) of the put to sell for mode atm / otm / both, or None."""
+    if q is None:
+        return None
+    if mode == "otm":
+        return pick_itm(q, spot, min_oi, min_vol)   # at or below spot: out of the money for a put
+    if mode != "both":
+        return pick_atm(q, spot, min_oi, min_vol, atm_tol)
+    best, best_ret = None, -1e9
+    for i in (pick_atm(q, spot, min_oi, min_vol, atm_tol), pick_itm(q, spot, min_oi, min_vol)):
+        if i is None:
+            continue
+        ret = put_return(q, i)
+        if np.isfinite(ret) and ret > best_ret:
+            best, best_ret = i, ret
+    return best
@@ -0,0 +1,190 @@
+# cc_prof.py
+# Opt-in profiling of one scan, backtest or Monte Carlo run.
+#
+#   with cc_prof.profiled("scan-2025-11-21-atm"):   # mode from CC_PROFILE
+#       run_scan(...)
+#
+# Modes (CC_PROFILE env var, --profile on the scripts, ?profile= on cc_app):
+#   sample   - samples every thread's stack each SAMPLE_S seconds and writes
+#              folded stacks (<name>-<time>.folded) for flamegraph.pl,
+#              speedscope or inferno; shows network waits as well as CPU
+#   cprofile - deterministic cProfile of the calling thread plus any work run
+#              through cc_prof.call() with the session's collector (the
+#              cc_sched units its scan submitted), merged into one
+#              <name>-<time>.prof for snakeviz / flameprof / pstats.
+#              On Python 3.12+ one profiler sees every thread, so call()
+#              adds none and the file covers all threads of the process.
+# Only one cprofile session runs per process; a second raises Busy (cc_app
+# answers 409). If another tool already holds the 3.12+ profiler, the session
+# samples instead. Files go to CC_PROFILE_DIR (default "profiles").
+
+import cProfile
+import hmac
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+MODE = os.environ.get("CC_PROFILE", "").strip().lower()
+DIR = os.environ.get("CC_PROFILE_DIR", "profiles")
+TOKEN = os.environ.get("CC_PROFILE_TOKEN", "")   # required for cc_app's ?profile=
+SAMPLE_S = 0.005
+MODES = ("sample", "cprofile")
+
+# Python 3.12+ runs cProfile on sys.monitoring: one profiler per process, and
+# it sees every thread, so the session's own profiler covers the workers.
+ONE_PROFILER = sys.version_info >= (3, 12)
+
+_session = threading.Lock()  # held by the running cprofile session
+_local = threading.local()   # .collector: this thread's cprofile session
+
+
+class Busy(RuntimeError):
+    """A cprofile session is already running in this process."""
+
+
+class _Collector:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profiles = []
+
+
+class _Sampler(threading.Thread):
+    def __init__(self):
+        super().__init__(name="cc-prof-sampler", daemon=True)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(SAMPLE_S):
+            self.samples += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                if tid not in names:
+                    # worker threads collapse into one lane: cc-sched-3 -> cc-sched
+                    names = {t.ident: re.sub(r"[-_]\d+$", "", t.name) for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def mode_for(flag=None) -> str:
+    """Profiling mode from an explicit flag, else CC_PROFILE; "" means off."""
+    mode = (flag or MODE or "").strip().lower()
+    if mode and mode not in MODES:
+        raise ValueError(f"profile mode must be one of {', '.join(MODES)}, not {mode!r}")
+    return mode
+
+
+def authorized(token: str) -> bool:
+    """True if token matches CC_PROFILE_TOKEN (never when that is unset)."""
+    return bool(TOKEN) and hmac.compare_digest(token or "", TOKEN)
+
+
+def _path(name, ext):
+    os.makedirs(DIR, exist_ok=True)
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+    return os.path.join(DIR, f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}.{ext}")
+
+
+@contextmanager
+def profiled(name: str, mode: str | None = None):
+    """Profile the block if mode (or CC_PROFILE) asks for it; print the file written.
+    Raises Busy if mode is cprofile and a cprofile session is already running."""
+    mode = mode_for(mode)
+    if not mode:
+        yield
+    elif mode == "sample":
+        with _sampled(name):
+            yield
+    else:
+        if not _session.acquire(blocking=False):
+            raise Busy("a cprofile session is already running in this process")
+        try:
+            with _cprofiled(name):
+                yield
+        finally:
+            _session.release()
+
+
+@contextmanager
+def _sampled(name):
+    t0 = time.perf_counter()
+    sampler = _Sampler()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        path = _path(name, "folded")
+        with open(path, "w") as f:
+            for stack, n in sampler.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        print(f"[profile] {sampler.samples} samples over {time.perf_counter() - t0:.1f}s -> {path}")
+
+
+@contextmanager
+def _cprofiled(name):
+    t0 = time.perf_counter()
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError as e:
+        # 3.12+: another tool (python -m cProfile, a debugger) holds sys.monitoring
+        print(f"[profile] cProfile unavailable ({e}); sampling instead")
+        with _sampled(name):
+            yield
+        return
+
+    collector = _local.collector = _Collector()
+    try:
+        yield
+    finally:
+        prof.disable()
+        _local.collector = None
+        stats = pstats.Stats(prof)
+        with collector.lock:
+            for p in collector.profiles:
+                stats.add(p)
+        path = _path(name, "prof")
+        stats.dump_stats(path)
+        merged = "all threads" if ONE_PROFILER else f"{len(collector.profiles)} worker tasks merged"
+        print(f"[profile] cProfile of {time.perf_counter() - t0:.1f}s, {merged} -> {path}")
+
+
+def current():
+    """Collector of the cprofile session this thread opened, else None.
+    Capture it where work is handed off and pass it to call()."""
+    return getattr(_local, "collector", None)
+
+
+def call(collector, fn, *args):
+    """fn(*args), under its own cProfile merged into collector's session
+    (for work done on other threads than the one that opened it); just
+    fn(*args) when collector is None."""
+    if collector is None or ONE_PROFILER:
+        return fn(*args)
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        return fn(*args)
+    finally:
+        prof.disable()
+        with collector.lock:
+            collector.profiles.append(prof)
@@ -0,0 +1,124 @@
+# cc_results.py
+# Columnar container for scan results: one NumPy array per column,
+# vectorized filter / sort / slice, and CSV / Parquet / JSON export
+# straight from the arrays (no per-row dicts).
+#
+#   rs = ResultSet.from_records(rows, RESULT_SCHEMA)
+#   rs = rs.filter(~rs["EarningsBeforeExpiry"]).sort("PremiumReturn")
+#   rs.to_csv("out.csv"); rs.to_parquet("out.parquet"); rs.to_json()
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# schema = {column: dtype}; use object for strings, bool for flags
+FLOAT, INT, BOOL, STR = np.float64, np.int64, np.bool_, object
+
+_FILL = {FLOAT: np.nan, INT: 0, BOOL: False, STR: None}
+
+
+class ResultSet:
+    def __init__(self, columns: dict):
+        self._cols = {k: np.asarray(v) for k, v in columns.items()}
+        lens = {len(v) for v in self._cols.values()}
+        if len(lens) > 1:
+            raise ValueError(f"columns have different lengths: {sorted(lens)}")
+        self._n = lens.pop() if lens else 0
+
+    @classmethod
+    def from_records(cls, records, schema: dict) -> "ResultSet":
+        """Build the column arrays in one pass over a list of result dicts."""
+        cols = {}
+        for name, dtype in schema.items():
+            fill = _FILL.get(dtype)
+            vals = [r.get(name, fill) for r in records]
+            if dtype is FLOAT:
+                vals = [np.nan if v is None else v for v in vals]
+            cols[name] = np.array(vals, dtype=dtype) if vals else np.empty(0, dtype=dtype)
+        return cls(cols)
+
+    @classmethod
+    def empty(cls, schema: dict) -> "ResultSet":
+        return cls({name: np.empty(0, dtype=dtype) for name, dtype in schema.items()})
+
+    # ---- access ----
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self._cols[name]
+
+    @property
+    def columns(self) -> list:
+        return list(self._cols)
+
+    def __iter__(self):
+        """Row dicts, built lazily; meant for templates, not for bulk work."""
+        lists = {k: v.tolist() for k, v in self._cols.items()}
+        for i in range(self._n):
+            yield {k: v[i] for k, v in lists.items()}
+
+    # ---- vectorized ops, each returns a new ResultSet ----
+    def take(self, idx) -> "ResultSet":
+        return ResultSet({k: v[idx] for k, v in self._cols.items()})
+
+    def filter(self, mask) -> "ResultSet":
+        return self.take(np.asarray(mask, dtype=bool))
+
+    def sort(self, by: str, descending: bool = True) -> "ResultSet":
+        """Stable sort on one column; NaN always last."""
+        col = self._cols[by]
+        if col.dtype.kind == "f":
+            key = -col if descending else col
+            order = np.argsort(np.where(np.isnan(key), np.inf, key), kind="stable")
+        elif descending:
+            # a stable sort of the reversed column, read backwards: largest
+            # first, equal keys still in input order
+            order = (len(col) - 1 - np.argsort(col[::-1], kind="stable"))[::-1]
+        else:
+            order = np.argsort(col, kind="stable")
+        return self.take(order)
+
+    def head(self, n: int) -> "ResultSet":
+        return self.take(slice(0, n))
+
+    def select(self, names) -> "ResultSet":
+        return ResultSet({k: self._cols[k] for k in names})
+
+    # ---- export ----
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self._cols, copy=False)
+
+    def to_csv(self, path_or_buf=None, **kwargs):
+        return self.to_frame().to_csv(path_or_buf, index=False, **kwargs)
+
+    def to_columns_json(self) -> dict:
+        """{column: [values...]} with NaN as null; cheap to serialize."""
+        out = {}
+        for k, v in self._cols.items():
+            if v.dtype.kind == "f":
+                out[k] = [None if x != x else x for x in v.tolist()]
+            else:
+                out[k] = v.tolist()
+        return out
+
+    def to_json(self, path=None, orient="records") -> str | None:
+        """records: [{col: val}, ...]; columns: {col: [vals]}."""
+        if orient == "columns":
+            text = json.dumps(self.to_columns_json())
+        else:
+            text = self.to_frame().to_json(orient="records")
+        if path is None:
+            return text
+        with open(path, "w") as f:
+            f.write(text)
+        return None
+
+    def to_parquet(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from e
+        pq.write_table(pa.table({k: v for k, v in self._cols.items()}), path)
@@ -0,0 +1,196 @@
+# cc_sched.py
+# One scan scheduler per process, shared by every cc_app request.
+# Jobs (one per scan) are split into per-symbol units that all go through the
+# same worker threads, so concurrent scans share one upstream budget:
+#
+#   - dedup: a unit (same key, e.g. symbol/expiry/mode) already queued or
+#     running for another job is shared, not run again
+#   - fairness: workers take units round-robin across jobs, and jobs with at
+#     most SMALL_JOB units left go ahead of larger ones, so a 5-ticker request
+#     is not stuck behind an S&P scan
+#
+#   job = SCHEDULER.submit({key: (fn, args), ...})
+#   for key, result in job.results(): ...
+#
+# A job may carry a deadline (time.monotonic()): results(until=...) stops
+# waiting there, cancel(job) drops its queued units, and units run under
+# cc_data.deadline() with the latest deadline of the jobs that want them,
+# so a unit only stops fetching once no waiting job has time left.
+#
+# Queue depth, active jobs, per-unit wait and per-job time are in cc_metrics.
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cc_data
+import cc_metrics
+import cc_prof
+
+SMALL_JOB = int(os.environ.get("CC_SCHED_SMALL_JOB", "25"))  # units left for the fast lane
+
+cc_metrics.HELP.update({
+    "cc_sched_queue_depth": "Scan units waiting for a worker.",
+    "cc_sched_active_jobs": "Scan jobs with units still queued or running.",
+    "cc_sched_wait_seconds": "Time a scan unit waited in the queue before a worker took it.",
+    "cc_sched_job_seconds": "Wall time of a whole scan job, by size class.",
+    "cc_sched_deduped_total": "Scan units shared with an identical unit of another job.",
+    "cc_sched_cancelled_total": "Queued scan units dropped because their job was cancelled.",
+})
+
+_QUEUED, _RUNNING, _DONE = range(3)
+
+
+class _Unit:
+    __slots__ = ("key", "fn", "args", "prof", "state", "jobs", "queued_at")
+
+    def __init__(self, key, fn, args, prof=None):
+        self.key, self.fn, self.args = key, fn, args
+        self.prof = prof             # cc_prof collector of the submitting session
+        self.state = _QUEUED
+        self.jobs = []
+        self.queued_at = time.perf_counter()
+
+    @property
+    def deadline(self):
+        """Latest deadline of the jobs waiting on this unit; None if one has none."""
+        ds = [j.deadline for j in self.jobs]
+        return None if not ds or None in ds else max(ds)
+
+
+class Job:
+    def __init__(self, n, deadline=None):
+        self.size = n
+        self.deadline = deadline     # time.monotonic() value, None = no limit
+        self.pending = deque()       # units this job may still dispatch
+        self.remaining = n           # units not finished yet
+        self.delivered = 0           # results handed out by results()
+        self.started = time.perf_counter()
+        self._done = queue.Queue()   # (key, result) as units finish
+
+    @property
+    def size_class(self):
+        return "small" if self.size <= SMALL_JOB else "large"
+
+    def results(self, until=None):
+        """Yield (key, result) for every unit of the job as it finishes, or only
+        until the time.monotonic() value until. Calling again resumes."""
+        while self.delivered < self.size:
+            try:
+                item = self._done.get(timeout=None if until is None else max(0.0, until - time.monotonic()))
+            except queue.Empty:
+                return
+            self.delivered += 1
+            yield item
+
+
+class Scheduler:
+    def __init__(self, workers):
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._jobs = deque()         # active jobs, in round-robin order
+        self._units = {}             # key -> _Unit not finished yet
+        self._queued = 0
+        self._pid = None
+
+    def _start(self):
+        # (re)start the workers in this process; threads do not survive fork
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"cc-sched-{i}", daemon=True).start()
+
+    def _publish(self):
+        cc_metrics.set_gauge("cc_sched_queue_depth", self._queued)
+        cc_metrics.set_gauge("cc_sched_active_jobs", len(self._jobs))
+
+    def submit(self, work: dict, deadline=None) -> Job:
+        """work = {key: (fn, args)}; fn(*args) runs once per key across all jobs."""
+        job = Job(len(work), deadline)
+        prof = cc_prof.current()
+        with self._cond:
+            self._start()
+            for key, (fn, args) in work.items():
+                unit = self._units.get(key)
+                if unit is None:
+                    unit = self._units[key] = _Unit(key, fn, args, prof)
+                    self._queued += 1
+                else:
+                    cc_metrics.inc("cc_sched_deduped_total")
+                unit.jobs.append(job)
+                if unit.state == _QUEUED:
+                    job.pending.append(unit)
+            if job.size:
+                self._jobs.append(job)
+            self._publish()
+            self._cond.notify_all()
+        return job
+
+    def cancel(self, job):
+        """Stop dispatching job's units. Queued units no other job wants are
+        dropped; running ones stop at their next fetch once past the deadline."""
+        with self._cond:
+            dropped = 0
+            for unit in job.pending:
+                if unit.state != _QUEUED or job not in unit.jobs:
+                    continue
+                unit.jobs.remove(job)
+                if not unit.jobs:
+                    unit.state = _DONE
+                    del self._units[unit.key]
+                    self._queued -= 1
+                    dropped += 1
+            job.pending.clear()
+            if job in self._jobs:
+                self._jobs.remove(job)
+            cc_metrics.inc("cc_sched_cancelled_total", dropped)
+            self._publish()
+
+    def _next(self):
+        """Next queued unit: first small job in round-robin order, else first job."""
+        for job in self._jobs:
+            while job.pending and job.pending[0].state != _QUEUED:
+                job.pending.popleft()   # already taken through another job sharing it
+        jobs = [j for j in self._jobs if j.pending]
+        if not jobs:
+            return None
+        job = next((j for j in jobs if j.remaining <= SMALL_JOB), jobs[0])
+        # rotate so the next pick starts after this job
+        self._jobs.remove(job)
+        self._jobs.append(job)
+        return job.pending.popleft()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                unit = self._next()
+                while unit is None:
+                    self._cond.wait()
+                    unit = self._next()
+                unit.state = _RUNNING
+                self._queued -= 1
+                self._publish()
+            cc_metrics.observe("cc_sched_wait_seconds", time.perf_counter() - unit.queued_at)
+            try:
+                with cc_data.deadline(lambda: unit.deadline):
+                    result = cc_prof.call(unit.prof, unit.fn, *unit.args)
+            except Exception as e:
+                print(f"[sched] {unit.key}: {e}")
+                result = None
+            self._finish(unit, result)
+
+    def _finish(self, unit, result):
+        with self._cond:
+            unit.state = _DONE
+            del self._units[unit.key]
+            for job in unit.jobs:
+                job.remaining -= 1
+                job._done.put((unit.key, result))
+                if job.remaining == 0 and job in self._jobs:   # not cancelled
+                    self._jobs.remove(job)
+                    cc_metrics.observe("cc_sched_job_seconds", time.perf_counter() - job.started,
+                                       size=job.size_class)
+            self._publish()
@@ -0,0 +1,159 @@
+# cc_spot.py
+# Spot price with hedged requests across the three sources the scanners use:
+#   fast_info  - last trade (cc_data.last_price)
+#   intraday   - latest 1-minute close (empty before the open)
+#   daily      - last daily close of the past 5 days (works off-hours)
+#
+# get(symbol) starts with the source that last gave this symbol a price
+# (fast_info first for new symbols). If that source has not answered within
+# its recent p95 latency, the next source is started in parallel, and so on;
+# the first valid price wins. A failed or empty source starts the next one
+# straight away. Slow sources are never cancelled, their answer is dropped.
+#
+# Hedging costs an extra upstream call only for requests already in a
+# source's slowest 5%, so the added load is about 5% per hedged level.
+#
+# Sources run on their own pool under the caller's cc_data.deadline(), and
+# get() stops waiting at it (DeadlineExceeded). Per-symbol winners are an
+# LRU of MAX_SYMBOLS names; latencies keep the last WINDOW per source.
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+import cc_data
+import cc_metrics
+
+HEDGE_DEFAULT_S = float(os.environ.get("CC_SPOT_HEDGE_S", "0.5"))  # delay until a source has history
+HEDGE_MIN_S = 0.05     # never hedge sooner than this
+HEDGE_MAX_S = 3.0      # ...or later than this
+WINDOW = 200           # latencies kept per source for the p95
+MIN_SAMPLES = 20       # before this many, use HEDGE_DEFAULT_S
+MAX_SYMBOLS = 5000     # symbols whose last winning source is remembered
+
+cc_metrics.HELP.update({
+    "cc_spot_seconds": "Wall time to resolve one spot price, all sources included.",
+    "cc_spot_hedges_total": "Spot sources started because the previous one was slower than its p95.",
+    "cc_spot_wins_total": "Spot prices resolved, by the source that answered first.",
+})
+
+
+def _valid(v):
+    return v is not None and np.isfinite(v) and v > 0
+
+
+def _last_close(df):
+    if df is None or df.empty:
+        return None
+    close = df["Close"].dropna()
+    return float(close.iloc[-1]) if len(close) else None
+
+
+SOURCES = {
+    "fast_info": lambda s: cc_data.last_price(s),
+    "intraday": lambda s: _last_close(cc_data.history(s, period="1d", interval="1m")),
+    "daily": lambda s: _last_close(cc_data.history(s, period="5d", interval="1d")),
+}
+
+_lock = threading.Lock()
+_latency = {name: deque(maxlen=WINDOW) for name in SOURCES}   # seconds of successful calls
+_winner = OrderedDict()   # symbol -> source that last answered first, LRU
+_pool = None
+_pool_pid = None
+
+
+def _executor():
+    # own pool, so hedges never wait behind the scan workers that call get();
+    # recreated after fork like cc_sched's workers
+    global _pool, _pool_pid
+    with _lock:
+        if _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=2 * cc_data.SCAN_WORKERS, thread_name_prefix="cc-spot")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def hedge_delay(source: str) -> float:
+    """Seconds to wait on source before starting the next one: its recent p95."""
+    with _lock:
+        lat = list(_latency[source])
+    if len(lat) < MIN_SAMPLES:
+        return HEDGE_DEFAULT_S
+    return min(HEDGE_MAX_S, max(HEDGE_MIN_S, float(np.percentile(lat, 95))))
+
+
+def _order(symbol):
+    first = _winner.get(symbol)
+    names = list(SOURCES)
+    if first in SOURCES:
+        names.remove(first)
+        names.insert(0, first)
+    return names
+
+
+def _timed(name, symbol, deadline):
+    t0 = time.perf_counter()
+    with cc_data.deadline(deadline):
+        v = SOURCES[name](symbol)
+    if _valid(v):
+        with _lock:
+            _latency[name].append(time.perf_counter() - t0)
+        return float(v)
+    return None
+
+
+def get(symbol: str) -> float | None:
+    """Spot price of symbol from whichever source answers first, or None."""
+    t0 = time.perf_counter()
+    pool = _executor()
+    with _lock:
+        todo = deque(_order(symbol))
+    running = {}     # future -> source name
+    deadline = cc_data.current_deadline()
+
+    def start(hedge=False):
+        name = todo.popleft()
+        running[pool.submit(_timed, name, symbol, deadline)] = name
+        if hedge:
+            cc_metrics.inc("cc_spot_hedges_total", source=name)
+        return name
+
+    newest = start()
+    price = None
+    while running:
+        timeout, left = hedge_delay(newest) if todo else None, cc_data.remaining()
+        if left is not None and (timeout is None or left < timeout):
+            timeout = left
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            if cc_data.remaining() == 0:
+                cc_metrics.observe("cc_spot_seconds", time.perf_counter() - t0)
+                raise cc_data.DeadlineExceeded(f"deadline passed waiting for the spot of {symbol}")
+            if todo:
+                newest = start(hedge=True)   # the newest source is in its slow tail
+            continue
+        for fut in done:
+            name = running.pop(fut)
+            try:
+                v = fut.result()
+            except Exception:
+                v = None
+            if v is not None:
+                price = v
+                with _lock:
+                    _winner[symbol] = name
+                    _winner.move_to_end(symbol)
+                    if len(_winner) > MAX_SYMBOLS:
+                        _winner.popitem(last=False)
+                cc_metrics.inc("cc_spot_wins_total", source=name)
+                break
+        if price is not None:
+            break
+        if todo:
+            newest = start()             # a source failed: no point waiting out its delay
+    cc_metrics.observe("cc_spot_seconds", time.perf_counter() - t0)
+    return price
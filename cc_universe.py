@@ -0,0 +1,299 @@
+# cc_universe.py
+# Named symbol universes shared by cc_app and 1cc_scanner.
+#
+#   cc_universe.get("sp500")        # tuple of unique Yahoo-style symbols
+#   cc_universe.names()             # ["etf", "nasdaq100", "sp500", <watchlists>]
+#   cc_universe.save_watchlist("mine", ["AAPL", "msft", "BRK.B"])
+#
+# Each universe is one JSON file in CC_UNIVERSE_DIR (default "universes"):
+# symbols, a version that goes up whenever the list changes (with the names
+# added / removed by that change), and the ETag / Last-Modified of the source.
+# Index universes are refreshed at most every REFRESH_S seconds with a
+# conditional GET of a CSV / JSON source (no HTML parsing); a 304 just
+# restamps the file. Refreshes of a stored list run in the background, so
+# get() never waits on the network once a list exists; until the first
+# successful download the built-in seed list is served. get(name, wait=False)
+# does not wait for that first download either (cc_app.warm in the gunicorn
+# master): it serves the seed and downloads in the background. Lists are cached in
+# memory and reloaded only when their file changes (one stat per get()).
+#
+#   python cc_universe.py                        list universes
+#   python cc_universe.py show NAME
+#   python cc_universe.py refresh [NAME ...]     force a conditional refresh
+#   python cc_universe.py watch NAME SYM ...     create / replace a watchlist
+#   python cc_universe.py drop NAME              delete a watchlist
+
+import csv
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import cc_data
+
+DIR = os.environ.get("CC_UNIVERSE_DIR", "universes")
+REFRESH_S = 86400       # index lists are revalidated at most daily
+RETRY_S = 3600          # ...or hourly while only the seed list is stored
+HTTP_TIMEOUT = 10
+
+# ---- seeds: served until the first download succeeds ----
+_SP500_SEED = (
+    "AAPL MSFT AMZN NVDA GOOGL META BRK-B LLY TSLA UNH XOM JPM V AVGO PG MA HD JNJ COST CVX WMT "
+    "MRK ABBV PEP KO BAC NFLX PFE ORCL DIS CRM ABT ACN CSCO TMO MCD LIN AMD WFC INTU COP RTX ADBE "
+    "PM NKE NEE TXN UPS BMY UNP SPGI CAT AMAT MS LOW HON GS IBM INTC QCOM GE AXP BLK CVS NOW DE "
+    "MDT SBUX C AMGN LMT ISRG ADI MU SYK ELV BKNG GILD PLD TJX PGR TGT MMC CB PNC CI MO BDX ZTS "
+    "DUK SO BSX ADP GM EQIX VRTX SHW AON USB REGN ITW CSX PXD DHR SLB EOG ETN EMR NSC CL FDX FIS "
+    "APD SPG COF KDP ROP MPC MSI EXC AIG F WELL OXY MAR NOC CME CCI MCO D VLO ADM ALL TFC ORLY "
+    "HUM AEP CMG PSA HAL AFL TRV WM KR SRE LRCX CTAS GIS DLR CNC PH ECL PCAR FTNT PAYX EW HCA "
+    "MNST AMP RSG PSX CTVA KLAC OKE KMB ROST IDXX WMB HPQ CBRE O NEM EA A PPG AJG MSCI EIX AME "
+    "KMI TDG MKC VICI FAST PEG ILMN ODFL VRSK WEC STZ AVB FISV EXR KEYS CHTR DLTR ANET PAYC FITB "
+    "DFS HES ED DHI TT NUE BLL ROK AWK MTB YUM MLM CPRT RF WBD OTIS XYL IR ZBH PRU DOW TEL VMC "
+    "LEN GWW DTE WST NTRS HBAN NDAQ HIG STT ES CTSH GLW LH CMS TSN TRMB EFX CAG ALB CDNS NTAP "
+    "HPE RMD LUV VTR WRB SWK CINF EQR DG MTD STE AVY PKG DRI HWM ETR OMC WAT WBA AKAM IP FANG "
+    "PPL SYF DVN TTWO HSY AEE CNP INCY TROW CARR IFF MOS EXPD COO HII ZBRA LYB PWR ATO EXPE LNT "
+    "IRM TECH APA CHD HRL UAL LKQ NVR WRK JNPR WDC CMA HST XRAY BEN KIM NDSN KEY BIO RJF J MAS "
+    "POOL GNRC HOLX TXT CLX CF LW SWKS DVA CBOE JKHY CPT REG CPB ESS L GL JCI K PFG FRT SNA MGM "
+    "NI AES ROL PKI EVRG FDS TAP BAX AIZ MKTX WYNN BBY HAS SJM MHK AOS ALLE NRG"
+).split()
+
+_NASDAQ100_SEED = (
+    "AAPL MSFT NVDA AMZN META AVGO GOOGL GOOG TSLA COST NFLX AMD PEP ADBE CSCO TMUS LIN INTU QCOM "
+    "TXN AMGN ISRG CMCSA BKNG HON AMAT VRTX ADP PANW ADI MU GILD SBUX LRCX MELI INTC KLAC MDLZ "
+    "CTAS REGN SNPS CDNS PYPL ASML MAR CRWD ORLY CEG MRVL FTNT ADSK ABNB PDD DASH WDAY CSX ROP "
+    "NXPI CHTR MNST PCAR AEP TTD CPRT KDP PAYX FANG ROST ODFL FAST KHC BKR DDOG AZN EA VRSK CTSH "
+    "XEL EXC GEHC CCEP LULU IDXX TEAM ZS ON CSGP ANSS DXCM TTWO CDW BIIB MDB WBD GFS ILMN ARM APP "
+    "PLTR MSTR AXON SHOP"
+).split()
+
+# liquid optionable ETFs, including the leveraged ones the web app always scanned
+_ETF_SEED = (
+    "SPY QQQ IWM DIA EEM EFA GLD SLV TLT HYG LQD XLF XLE XLK XLV XLI XLP XLU XLY XLB XLC XLRE "
+    "XBI SMH KRE GDX ARKK USO UNG FXI EWZ VXX TQQQ SQQQ SOXL SOXS TSLL TSLQ YINN AMDL NVDL"
+).split()
+
+
+def _rows_csv(text, column="Symbol"):
+    return [row.get(column, "") for row in csv.DictReader(io.StringIO(text))]
+
+
+def _rows_nasdaq(text):
+    return [row.get("symbol", "") for row in json.loads(text)["data"]["data"]["rows"]]
+
+
+# name -> (url or None, parser, seed, minimum size of a believable download)
+SOURCES = {
+    "sp500": ("https://raw.githubusercontent.com/datasets/s-and-p-500-companies/main/data/constituents.csv",
+              _rows_csv, _SP500_SEED, 450),
+    "nasdaq100": ("https://api.nasdaq.com/api/quote/list-type/nasdaq100", _rows_nasdaq, _NASDAQ100_SEED, 90),
+    "etf": (None, None, _ETF_SEED, 0),
+}
+
+_lock = threading.Lock()
+_cache = {}            # name -> (file mtime_ns, record)
+_refreshing = set()    # names with a background refresh running
+
+
+def clean(symbols) -> list:
+    """Upper-case, Yahoo-style ('.' -> '-'), de-duplicated in order."""
+    seen, out = set(), []
+    for s in symbols:
+        s = str(s).strip().replace(".", "-").upper()
+        if s and s not in seen and s != "SYMBOL":
+            seen.add(s)
+            out.append(s)
+    return out
+
+
+def _path(name):
+    return os.path.join(DIR, f"{name}.json")
+
+
+def _check_name(name):
+    if not re.fullmatch(r"[a-z0-9][a-z0-9_-]{0,39}", name or ""):
+        raise ValueError(f"bad universe name {name!r}: use a-z, 0-9, '-' and '_'")
+
+
+def _write(rec):
+    os.makedirs(DIR, exist_ok=True)
+    tmp = f"{_path(rec['name'])}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(rec, f, indent=1)
+    os.replace(tmp, _path(rec["name"]))
+
+
+def _load(name):
+    """Stored record of name (reread only when its file changed), or None."""
+    try:
+        mtime = os.stat(_path(name)).st_mtime_ns
+    except OSError:
+        return None
+    hit = _cache.get(name)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with open(_path(name)) as f:
+        rec = json.load(f)
+    rec["symbols"] = tuple(rec["symbols"])
+    _cache[name] = (mtime, rec)
+    return rec
+
+
+def _store(name, symbols, source, old=None, **extra):
+    """Write a record, bumping the version only when the symbols changed."""
+    now = time.time()
+    rec = {"name": name, "source": source, "version": 1, "fetched_at": now, "changed_at": now,
+           "added": [], "removed": [], "etag": None, "last_modified": None, "symbols": list(symbols)}
+    if old:
+        rec.update(version=old["version"], changed_at=old["changed_at"],
+                   added=old.get("added", []), removed=old.get("removed", []))
+        if list(old["symbols"]) != rec["symbols"]:
+            prev, cur = set(old["symbols"]), set(rec["symbols"])
+            rec.update(version=old["version"] + 1, changed_at=now,
+                       added=sorted(cur - prev), removed=sorted(prev - cur))
+            print(f"[universe] {name} v{rec['version']}: {len(cur)} symbols, "
+                  f"+{len(rec['added'])} -{len(rec['removed'])}")
+    rec.update(extra)
+    _write(rec)
+    rec["symbols"] = tuple(rec["symbols"])
+    _cache[name] = (os.stat(_path(name)).st_mtime_ns, rec)
+    return rec
+
+
+def _stale(rec) -> bool:
+    return time.time() - rec["fetched_at"] >= (RETRY_S if rec["source"] == "seed" else REFRESH_S)
+
+
+def refresh(name: str, force: bool = False) -> dict | None:
+    """Revalidate an index universe against its source (conditional GET).
+    Returns the stored record; on any failure the previous list is kept."""
+    url, parse, seed, min_size = SOURCES[name]
+    old = _load(name)
+    if url is None:
+        return old if old and old["symbols"] == tuple(seed) else _store(name, seed, "builtin", old)
+    if old and not force and not _stale(old):
+        return old
+    if cc_data.offline():
+        return old or _store(name, seed, "seed")
+    headers = {}
+    if old and old.get("etag"):
+        headers["If-None-Match"] = old["etag"]
+    if old and old.get("last_modified"):
+        headers["If-Modified-Since"] = old["last_modified"]
+    try:
+        resp = cc_data.SESSION.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+        if resp.status_code == 304 and old:
+            return _store(name, old["symbols"], old["source"], old,
+                          etag=old.get("etag"), last_modified=old.get("last_modified"))
+        resp.raise_for_status()
+        symbols = clean(parse(resp.text))
+        if len(symbols) < min_size:
+            raise ValueError(f"only {len(symbols)} symbols in the download")
+        return _store(name, symbols, url, old,
+                      etag=resp.headers.get("ETag"), last_modified=resp.headers.get("Last-Modified"))
+    except Exception as e:
+        print(f"[universe] {name}: refresh failed, keeping {'stored' if old else 'seed'} list ({e})")
+        if old:
+            # retry after another REFRESH_S rather than on every get()
+            return _store(name, old["symbols"], old["source"], old,
+                          etag=old.get("etag"), last_modified=old.get("last_modified"))
+        return _store(name, seed, "seed")
+
+
+def _refresh_bg(name):
+    try:
+        refresh(name)
+    finally:
+        with _lock:
+            _refreshing.discard(name)
+
+
+def _start_refresh(name):
+    with _lock:
+        start = name not in _refreshing
+        _refreshing.add(name)
+    if start:
+        threading.Thread(target=_refresh_bg, args=(name,), name="cc-universe", daemon=True).start()
+
+
+def _after_fork():
+    # a refresh running in the parent is not running here
+    global _lock
+    _lock = threading.Lock()
+    _refreshing.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get(name: str, wait: bool = True) -> tuple:
+    """Symbols of a universe or watchlist; KeyError if there is no such name,
+    ValueError if name is not a valid universe name. With wait=False a first
+    use serves the seed and downloads in the background."""
+    _check_name(name)
+    if name in SOURCES and SOURCES[name][0] is None:
+        return refresh(name)["symbols"]   # built-in list: stored, versioned, no download
+    rec = _load(name)
+    if rec is None:
+        if name not in SOURCES:
+            raise KeyError(f"unknown universe {name!r}")
+        if wait or cc_data.offline():
+            return refresh(name)["symbols"]   # first use: download (or seed) once
+        _start_refresh(name)
+        return tuple(SOURCES[name][2])
+    if name in SOURCES and _stale(rec) and not cc_data.offline():
+        _start_refresh(name)
+    return rec["symbols"]
+
+
+def names() -> list:
+    """Built-in universes plus stored watchlists."""
+    try:
+        stored = {f[:-5] for f in os.listdir(DIR) if f.endswith(".json")}
+    except OSError:
+        stored = set()
+    return sorted(set(SOURCES) | stored)
+
+
+def save_watchlist(name: str, symbols) -> tuple:
+    """Create or replace a user watchlist; returns its cleaned symbols."""
+    _check_name(name)
+    if name in SOURCES:
+        raise ValueError(f"{name!r} is a built-in universe")
+    symbols = clean(symbols)
+    if not symbols:
+        raise ValueError("a watchlist needs at least one symbol")
+    return tuple(_store(name, symbols, "watchlist", _load(name))["symbols"])
+
+
+def drop_watchlist(name: str):
+    _check_name(name)
+    if name in SOURCES:
+        raise ValueError(f"{name!r} is a built-in universe")
+    os.remove(_path(name))
+    _cache.pop(name, None)
+
+
+if __name__ == "__main__":
+    cmd, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("list", [])
+    if cmd == "list":
+        for n in names():
+            rec = _load(n)
+            if rec is None:
+                print(f"{n:<12} (not downloaded yet)")
+            else:
+                print(f"{n:<12} v{rec['version']:<4} {len(rec['symbols']):>5} symbols  {rec['source']}  "
+                      f"checked {time.strftime('%Y-%m-%d %H:%M', time.localtime(rec['fetched_at']))}")
+    elif cmd == "show":
+        print(" ".join(get(args[0])))
+    elif cmd == "refresh":
+        for n in args or list(SOURCES):
+            rec = refresh(n, force=True)
+            print(f"{n}: v{rec['version']}, {len(rec['symbols'])} symbols")
+    elif cmd == "watch":
+        print(f"{args[0]}: {len(save_watchlist(args[0], args[1:]))} symbols")
+    elif cmd == "drop":
+        drop_watchlist(args[0])
+    else:
+        sys.exit(f"unknown command {cmd!r}: use list, show, refresh, watch or drop")
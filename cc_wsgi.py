@@ -0,0 +1,81 @@
+# cc_wsgi.py
+# WSGI entry point for gunicorn (see gunicorn.conf.py and Procfile).
+# /healthz answers straight away without importing pandas, yfinance or Flask;
+# every other path is handed to cc_app once it has been imported.
+#
+# With preload (CC_PRELOAD=1, set by gunicorn.conf.py) cc_app is imported and
+# warmed once in the master; workers fork with it already in memory and share
+# those pages copy-on-write. Without preload each worker imports cc_app in a
+# background thread and passes health checks in the meantime; if that fails
+# it is logged, shown by /healthz and in the 503s, and retried with back-off.
+
+import json
+import os
+import threading
+import time
+import traceback
+
+STARTUP = {
+    "preload": os.environ.get("CC_PRELOAD") == "1",
+    "import_s": None,   # time to import cc_app (pandas, yfinance, Flask, ...)
+    "warm_s": None,     # time to build the shared read-only state
+    "error": None,      # why the last attempt to load cc_app failed
+}
+_ready = threading.Event()
+_app = None
+
+
+def _load():
+    global _app
+    t0 = time.perf_counter()
+    import cc_app
+    import cc_metrics
+    STARTUP["import_s"] = round(time.perf_counter() - t0, 3)
+
+    t0 = time.perf_counter()
+    cc_app.warm()
+    STARTUP["warm_s"] = round(time.perf_counter() - t0, 3)
+
+    cc_metrics.HELP["cc_startup_seconds"] = "Time spent importing / warming cc_app at startup."
+    cc_metrics.set_gauge("cc_startup_seconds", STARTUP["import_s"], stage="import")
+    cc_metrics.set_gauge("cc_startup_seconds", STARTUP["warm_s"], stage="warm")
+    print(f"[startup] cc_app imported in {STARTUP['import_s']}s, warmed in {STARTUP['warm_s']}s "
+          f"(pid {os.getpid()}, preload={STARTUP['preload']})")
+    _app = cc_app.app
+    STARTUP["error"] = None
+    _ready.set()
+
+
+def _load_until_ready():
+    pause = 1
+    while True:
+        try:
+            _load()
+            return
+        except Exception as e:
+            STARTUP["error"] = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+            print(f"[startup] loading cc_app failed (pid {os.getpid()}), retrying in {pause}s: {STARTUP['error']}")
+            time.sleep(pause)
+            pause = min(pause * 2, 30)
+
+
+def _respond(start_response, status, payload):
+    body = json.dumps(payload).encode()
+    start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+    return [body]
+
+
+def app(environ, start_response):
+    if environ.get("PATH_INFO") == "/healthz":
+        return _respond(start_response, "200 OK", dict(STARTUP, ready=_ready.is_set(), pid=os.getpid()))
+    if not _ready.wait(timeout=60):
+        return _respond(start_response, "503 Service Unavailable",
+                        {"error": "starting up", "last_failure": STARTUP["error"]})
+    return _app(environ, start_response)
+
+
+if STARTUP["preload"]:
+    _load()
+else:
+    threading.Thread(target=_load_until_ready, name="cc_app-import", daemon=True).start()
@@ -0,0 +1,34 @@
+# gunicorn.conf.py
+# Loaded automatically by `gunicorn cc_wsgi:app` (see Procfile).
+# Preload cc_app in the master so workers fork with pandas / yfinance / the
+# compiled template already in memory, then freeze the GC so collections in
+# the workers don't touch (and un-share) those copy-on-write pages.
+
+import gc
+import os
+import time
+
+preload_app = os.environ.get("CC_PRELOAD", "1") == "1"
+os.environ["CC_PRELOAD"] = "1" if preload_app else "0"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+
+# let workers share in-flight upstream fetches (see cc_data single flight);
+# per user, since cc_data only trusts a directory private to it
+os.environ.setdefault("CC_SINGLEFLIGHT_DIR", os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"cc_singleflight-{os.getuid()}"))
+
+_forked_at = {}
+
+
+def when_ready(server):
+    gc.freeze()
+    server.log.info(f"preload={preload_app}, {gc.get_freeze_count()} objects frozen for copy-on-write sharing")
+
+
+def pre_fork(server, worker):
+    _forked_at["t"] = time.perf_counter()
+
+
+def post_worker_init(worker):
+    worker.log.info(f"worker {worker.pid} ready {(time.perf_counter() - _forked_at.get('t', time.perf_counter())) * 1000:.0f} ms after fork")
@@ -0,0 +1,44 @@
+# test_cc_limit.py
+# python -m pytest -q test_cc_limit.py
+
+import itertools
+
+import cc_data
+import cc_limit
+
+
+def _calls(lim, kind, latency_s, n):
+    for _ in range(n):
+        assert lim.acquire()
+        lim.release(kind, latency_s)
+
+
+def test_latency_regime_shift_recovers(monkeypatch):
+    # a clock that moves on every read, so cuts are never suppressed as one burst
+    clock = itertools.count(0, 1.0)
+    monkeypatch.setattr(cc_limit.time, "monotonic", lambda: next(clock))
+    lim = cc_limit.AIMDLimiter(initial=12, max_limit=16)
+    _calls(lim, "chain", 0.1, 100)
+    assert int(lim.limit) == 16
+
+    _calls(lim, "chain", 0.6, 20)     # upstream is now 6x slower for good
+    assert int(lim.limit) < 16        # the shift is first taken as a spike...
+    _calls(lim, "chain", 0.6, 400)
+    assert int(lim.limit) == 16       # ...then becomes the baseline
+    assert abs(lim._typical["chain"] - 0.6) < 0.01
+
+
+def test_one_spike_barely_moves_the_baseline():
+    lim = cc_limit.AIMDLimiter(initial=4, max_limit=16)
+    _calls(lim, "chain", 0.1, 50)
+    _calls(lim, "chain", 5.0, 1)
+    assert lim._typical["chain"] < 0.4
+
+
+def test_latency_classes_split_by_reply_size():
+    minute = cc_data._latency_class("history", "AAPL", {"period": "1d", "interval": "1m"})
+    years = cc_data._latency_class("history", "AAPL", {"period": "5y", "interval": "1d"})
+    assert minute != years
+    assert cc_data._latency_class("options", "AAPL", {}) == "options"
+    assert (cc_data._latency_class("last_prices", "A,B", {})
+            != cc_data._latency_class("last_prices", ",".join(["X"] * 200), {}))
@@ -0,0 +1,35 @@
+# test_cc_prof.py
+# python -m pytest -q test_cc_prof.py   (fake data source, no network)
+
+import os
+
+os.environ.setdefault("CC_DATA_SOURCE", "fake")
+
+import pytest
+
+import cc_app
+import cc_data
+import cc_prof
+
+
+@pytest.fixture(autouse=True)
+def _profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cc_prof, "DIR", str(tmp_path))
+    monkeypatch.setattr(cc_app, "SLEEP_BETWEEN", 0)
+
+
+def test_profiled_scan_returns_results(tmp_path):
+    expiry = cc_data.options("AAPL")[0]
+    scan = cc_app.run_scan(["AAPL", "MSFT", "NVDA"], expiry, "atm", True, profile="cprofile")
+    assert scan.scanned == scan.total == 3
+    assert len(scan.results) == 3
+    assert list(tmp_path.glob("scan-*.prof"))
+
+
+def test_second_cprofile_session_is_busy():
+    with cc_prof.profiled("outer", "cprofile"):
+        with pytest.raises(cc_prof.Busy):
+            with cc_prof.profiled("inner", "cprofile"):
+                pass
+    with cc_prof.profiled("again", "cprofile"):
+        pass
@@ -0,0 +1,33 @@
+# test_cc_results.py
+# python -m pytest -q test_cc_results.py
+
+import numpy as np
+
+from cc_results import ResultSet, BOOL, FLOAT, STR
+
+SCHEMA = {"Symbol": STR, "Premium": FLOAT, "Flag": BOOL, "Side": STR}
+
+
+def _rs():
+    return ResultSet.from_records([
+        {"Symbol": "A", "Premium": 1.0, "Flag": True, "Side": "call"},
+        {"Symbol": "B", "Premium": 2.0, "Flag": False, "Side": "put"},
+        {"Symbol": "C", "Premium": 1.0, "Flag": True, "Side": "call"},
+        {"Symbol": "D", "Premium": np.nan, "Flag": False, "Side": "put"},
+        {"Symbol": "E", "Premium": 2.0, "Flag": True, "Side": "call"},
+    ], SCHEMA)
+
+
+def _symbols(rs):
+    return [r["Symbol"] for r in rs]
+
+
+def test_descending_ties_keep_input_order():
+    assert _symbols(_rs().sort("Premium")) == ["B", "E", "A", "C", "D"]
+    assert _symbols(_rs().sort("Side")) == ["B", "D", "A", "C", "E"]
+    assert _symbols(_rs().sort("Flag")) == ["A", "C", "E", "B", "D"]
+
+
+def test_ascending_ties_keep_input_order():
+    assert _symbols(_rs().sort("Premium", descending=False)) == ["A", "C", "B", "E", "D"]
+    assert _symbols(_rs().sort("Side", descending=False)) == ["A", "C", "E", "B", "D"]